@@ -0,0 +1,174 @@
+# Copyright (C) 2011 Richard Lincoln
+#
+# PYPOWER is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published
+# by the Free Software Foundation, either version 3 of the License,
+# or (at your option) any later version.
+#
+# PYPOWER is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with PYPOWER. If not, see <http://www.gnu.org/licenses/>.
+
+"""Per-call time of C{opf_hessfcn}, with and without its index map.
+
+Run from the top level directory of the source tree with::
+
+    PYTHONPATH=. python benchmarks/bench_opf_hessfcn.py
+"""
+
+import sys
+
+from time import time
+
+from numpy import zeros, ones, exp, arange, r_, flatnonzero as find
+from numpy.random import RandomState
+from scipy.sparse import vstack, hstack, csr_matrix as sparse
+
+from pypower.case9 import case9
+from pypower.case14 import case14
+from pypower.case30 import case30
+from pypower.case57 import case57
+from pypower.case118 import case118
+from pypower.case300 import case300
+from pypower.ppoption import ppoption
+from pypower.ext2int import ext2int
+from pypower.opf_setup import opf_setup
+from pypower.makeYbus import makeYbus
+from pypower.polycost import polycost
+from pypower.dSbr_dV import dSbr_dV
+from pypower.d2Sbus_dV2 import d2Sbus_dV2
+from pypower.d2ASbr_dV2 import d2ASbr_dV2
+from pypower.opf_hessfcn import opf_hessfcn
+from pypower.opf_hessidx import opf_hessidx
+
+from pypower.idx_brch import F_BUS, T_BUS, RATE_A
+from pypower.idx_cost import MODEL, POLYNOMIAL
+
+
+def bench_opf_hessfcn(cases=None, ncalls=20):
+    """Prints the time per call of C{opf_hessfcn} on the shipped cases.
+
+    Compares the evaluation on the index map of L{opf_hessidx} with
+    L{hessfcn_stacked}, the Hessian built from the second derivative
+    functions and stacked as by C{opf_hessfcn} before the index map was
+    introduced, at a random point with apparent power flow limits. The
+    time taken to build the index map, once per OPF model, is also shown.
+    Returns a list of C{(name, before, after, index map)} times in
+    seconds.
+    """
+    if cases is None:
+        cases = [case9, case14, case30, case57, case118, case300]
+    ppopt = ppoption(VERBOSE=0, OUT_ALL=0, OPF_FLOW_LIM=0)
+    rs = RandomState(42)
+
+    sys.stdout.write('\n%-10s %10s %10s %12s\n' %
+                     ('case', 'before', 'after', 'index map'))
+    times = []
+    for case in cases:
+        om = opf_setup(ext2int(case()), ppopt)
+        om.build_cost_params()
+        ppc = om.get_ppc()
+        bus, branch = ppc['bus'], ppc['branch']
+        il = find((branch[:, RATE_A] != 0) & (branch[:, RATE_A] < 1e10))
+        Ybus, Yf, Yt = makeYbus(ppc['baseMVA'], bus, branch)
+        Yf, Yt = Yf[il, :], Yt[il, :]
+
+        nb, nx = bus.shape[0], om.getN('var')
+        x = 0.9 + 0.2 * rs.rand(nx)
+        lmbda = {'eqnonlin': rs.randn(2 * nb),
+                 'ineqnonlin': rs.rand(2 * len(il))}
+
+        t0 = time()
+        hidx = opf_hessidx(om, Ybus, Yf, Yt, il)
+        tidx = time() - t0
+
+        t0 = time()
+        for _ in range(ncalls):
+            hessfcn_stacked(x, lmbda, om, Ybus, Yf, Yt, il)
+        before = (time() - t0) / ncalls
+
+        t0 = time()
+        for _ in range(ncalls):
+            opf_hessfcn(x, lmbda, om, Ybus, Yf, Yt, ppopt, il, 1.0, hidx)
+        after = (time() - t0) / ncalls
+
+        name = case.__name__
+        sys.stdout.write('%-10s %7.2f ms %7.2f ms %9.2f ms\n' %
+                         (name, 1e3 * before, 1e3 * after, 1e3 * tidx))
+        times.append((name, before, after, tidx))
+
+    return times
+
+
+def hessfcn_stacked(x, lmbda, om, Ybus, Yf, Yt, il):
+    """Hessian of the Lagrangian with polynomial costs and apparent power
+    flow limits, built from L{d2Sbus_dV2} and L{d2ASbr_dV2} and stacked
+    with C{vstack}/C{hstack} on every call, as before L{opf_hessidx}.
+    """
+    ppc = om.get_ppc()
+    baseMVA, gen, branch, gencost = \
+        ppc['baseMVA'], ppc['gen'], ppc['branch'], ppc['gencost']
+    vv, _, _, _ = om.get_idx()
+    nb = Ybus.shape[0]
+    ng = gen.shape[0]
+    nxyz = len(x)
+    nl2 = len(il)
+    nxtra = nxyz - 2 * nb
+
+    Pg = x[vv['i1']['Pg']:vv['iN']['Pg']]
+    V = x[vv['i1']['Vm']:vv['iN']['Vm']] * \
+        exp(1j * x[vv['i1']['Va']:vv['iN']['Va']])
+
+    ## costs
+    pcost = gencost[arange(ng), :]
+    d2f_dPg2 = zeros(ng)
+    ipolp = find(pcost[:, MODEL] == POLYNOMIAL)
+    d2f_dPg2[ipolp] = \
+        baseMVA**2 * polycost(pcost[ipolp, :], Pg[ipolp] * baseMVA, 2)
+    i = r_[arange(vv['i1']['Pg'], vv['iN']['Pg']),
+           arange(vv['i1']['Qg'], vv['iN']['Qg'])]
+    d2f = sparse((r_[d2f_dPg2, zeros(ng)], (i, i)), (nxyz, nxyz))
+
+    ## power balance constraints
+    lamP, lamQ = lmbda['eqnonlin'][:nb], lmbda['eqnonlin'][nb:]
+    Gpaa, Gpav, Gpva, Gpvv = d2Sbus_dV2(Ybus, V, lamP)
+    Gqaa, Gqav, Gqva, Gqvv = d2Sbus_dV2(Ybus, V, lamQ)
+    d2G = vstack([
+            hstack([
+                vstack([hstack([Gpaa, Gpav]),
+                        hstack([Gpva, Gpvv])]).real +
+                vstack([hstack([Gqaa, Gqav]),
+                        hstack([Gqva, Gqvv])]).imag,
+                sparse((2 * nb, nxtra))]),
+            hstack([sparse((nxtra, 2 * nb)), sparse((nxtra, nxtra))])
+        ], 'csr')
+
+    ## branch flow constraints
+    muF, muT = lmbda['ineqnonlin'][:nl2], lmbda['ineqnonlin'][nl2:]
+    f = branch[il, F_BUS].astype(int)
+    t = branch[il, T_BUS].astype(int)
+    Cf = sparse((ones(nl2), (arange(nl2), f)), (nl2, nb))
+    Ct = sparse((ones(nl2), (arange(nl2), t)), (nl2, nb))
+    dSf_dVa, dSf_dVm, dSt_dVa, dSt_dVm, Sf, St = \
+        dSbr_dV(branch[il, :], Yf, Yt, V)
+    Hfaa, Hfav, Hfva, Hfvv = d2ASbr_dV2(dSf_dVa, dSf_dVm, Sf, Cf, Yf, V, muF)
+    Htaa, Htav, Htva, Htvv = d2ASbr_dV2(dSt_dVa, dSt_dVm, St, Ct, Yt, V, muT)
+    d2H = vstack([
+            hstack([
+                vstack([hstack([Hfaa, Hfav]),
+                        hstack([Hfva, Hfvv])]) +
+                vstack([hstack([Htaa, Htav]),
+                        hstack([Htva, Htvv])]),
+                sparse((2 * nb, nxtra))]),
+            hstack([sparse((nxtra, 2 * nb)), sparse((nxtra, nxtra))])
+        ], 'csr')
+
+    return d2f + d2G + d2H
+
+
+if __name__ == '__main__':
+    bench_opf_hessfcn()
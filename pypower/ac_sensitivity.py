@@ -0,0 +1,200 @@
+# Copyright (C) 2011 Richard Lincoln
+#
+# PYPOWER is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published
+# by the Free Software Foundation, either version 3 of the License,
+# or (at your option) any later version.
+#
+# PYPOWER is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with PYPOWER. If not, see <http://www.gnu.org/licenses/>.
+
+"""AC power flow sensitivities from a factored Jacobian.
+"""
+
+from numpy import ones, zeros, arange, asarray, r_, flatnonzero as find
+from scipy.sparse import csr_matrix as sparse, hstack, vstack
+
+from pypower.lufactor import lufactor
+from pypower.makeJidx import makeJidx
+from pypower.makeJac import makeJac
+from pypower.dSbus_dV import dSbus_dV
+from pypower.dSbr_dV import dSbr_dV
+
+
+class ac_sensitivity(object):
+    """AC power flow sensitivities from a factored Jacobian.
+
+    Computes the sensitivities of the solution of an AC power flow, in
+    internal indexing, to the real and reactive power injections at
+    selected buses, by forward and back substitutions with the factors of
+    the power flow Jacobian. The factors returned by L{newtonpf} (or by
+    L{runpf} in C{results['newton']}) can be reused::
+
+        V, success, i, info = newtonpf(Ybus, Sbus, V0, ref, pv, pq, ppopt)
+        s = ac_sensitivity(Ybus, V, info['ref'], info['pv'], info['pq'],
+                           info['lu'], Yf, Yt, branch)
+        dVa, dVm = s.dV_dP(inj, buses)
+        dSf, dSt = s.dSbr_dP(inj, branches)
+        lf = s.loss_factors()
+
+    Those are the factors of the Jacobian of the last iteration, evaluated
+    one Newton step before the solution, so the sensitivities are accurate
+    to within the size of that step. L{newtonpf} returns C{None} instead
+    when it has no such factors: if the last iteration reused older factors
+    (C{PF_NR_REUSE}), if generator Q limits changed the bus types after it,
+    or if C{V0} had already converged. If C{lu} is C{None}, or has not
+    been factored, the Jacobian is evaluated at C{V} and factored.
+
+    Each method takes the buses C{inj} where the injection changes and the
+    buses or branches observed (all by default) and returns matrices with
+    one row per observed element and one column per injection. The slack
+    taken up by the reference bus, injections at the reference bus and
+    reactive injections at PV buses have no effect on the voltages. Each
+    product of sensitivities is computed either with one solve per
+    injection bus or, if there are fewer observed quantities, with one
+    transposed solve per quantity.
+
+    @see: L{newtonpf}, L{makeJac}
+    """
+
+    def __init__(self, Ybus, V, ref, pv, pq, lu=None, Yf=None, Yt=None,
+                 branch=None):
+        self.Ybus = Ybus
+        self.V = V
+        self.ref = asarray(ref, int)
+        self.Yf, self.Yt, self.branch = Yf, Yt, branch
+        nb = len(V)
+
+        ## positions of the angles (and P mismatches) and of the magnitudes
+        ## (and Q mismatches) of each bus in the Newton state vector
+        pvpq = r_[pv, pq].astype(int)
+        self._pvpq, self._pq = pvpq, asarray(pq, int)
+        self._ia = -ones(nb, int)
+        self._im = -ones(nb, int)
+        self._ia[pvpq] = arange(len(pvpq))
+        self._im[pq] = len(pvpq) + arange(len(pq))
+        self._nx = len(pvpq) + len(pq)
+
+        #: L{lufactor} object holding the factors of the Jacobian
+        self.lu = lu
+        if lu is None or not lu.nfactor:
+            Jidx = makeJidx(Ybus, pv, pq)
+            self.lu = lufactor().factor(makeJac(Ybus, V, Jidx))
+
+    def dV_dP(self, inj=None, buses=None):
+        """Returns the sensitivities of the voltage angles (radians) and
+        magnitudes (p.u.) of C{buses} to the real power injections (p.u.)
+        at C{inj}.
+        """
+        return self._dV(self._ia, inj, buses)
+
+    def dV_dQ(self, inj=None, buses=None):
+        """Returns the sensitivities of the voltage angles (radians) and
+        magnitudes (p.u.) of C{buses} to the reactive power injections
+        (p.u.) at C{inj}.
+        """
+        return self._dV(self._im, inj, buses)
+
+    def dSbr_dP(self, inj=None, branches=None):
+        """Returns the sensitivities of the complex power flows at the
+        "from" and "to" ends of C{branches} to the real power injections
+        at C{inj}, all in p.u.
+        """
+        return self._dSbr(self._ia, inj, branches)
+
+    def dSbr_dQ(self, inj=None, branches=None):
+        """Returns the sensitivities of the complex power flows at the
+        "from" and "to" ends of C{branches} to the reactive power
+        injections at C{inj}, all in p.u.
+        """
+        return self._dSbr(self._im, inj, branches)
+
+    def loss_factors(self, inj=None):
+        """Returns the marginal loss factors of the buses C{inj}, the
+        changes in total real power losses per unit real power injection
+        at each bus, balanced by the reference bus (zero there).
+        """
+        inj = self._buses(inj)
+        dS_dVm, dS_dVa = dSbus_dV(self.Ybus, self.V)
+        g = self._grad(dS_dVa.tocsr()[self.ref, :],
+                       dS_dVm.tocsr()[self.ref, :]).real
+        g = sparse(g.sum(0))
+
+        ## losses = sum of all injections, of which the reference bus
+        ## injection is a function of the state
+        lf = 1 + self._sens(g, self._ia[inj])[0]
+        lf[self._ia[inj] < 0] = 0
+        return lf
+
+    def _buses(self, b):
+        return arange(len(self.V)) if b is None else asarray(b, int)
+
+    def _dV(self, pos, inj, buses):
+        """Sensitivities of the voltages to injections at mismatch
+        positions C{pos[inj]}.
+        """
+        buses = self._buses(buses)
+        inj = self._buses(inj)
+        nb, nx = len(buses), self._nx
+        Ga = _select(self._ia[buses], nx)
+        Gm = _select(self._im[buses], nx)
+        S = self._sens(vstack([Ga, Gm]).tocsr(), pos[inj])
+        return S[:nb], S[nb:]
+
+    def _dSbr(self, pos, inj, branches):
+        """Sensitivities of the branch flows to injections at mismatch
+        positions C{pos[inj]}.
+        """
+        if branches is None:
+            branches = arange(self.branch.shape[0])
+        branches = asarray(branches, int)
+        inj = self._buses(inj)
+        n = len(branches)
+        dSf_dVa, dSf_dVm, dSt_dVa, dSt_dVm, _, _ = \
+            dSbr_dV(self.branch[branches], self.Yf[branches], self.Yt[branches],
+                    self.V)
+        Gf = self._grad(dSf_dVa, dSf_dVm)
+        Gt = self._grad(dSt_dVa, dSt_dVm)
+        G = vstack([Gf.real, Gf.imag, Gt.real, Gt.imag]).tocsr()
+        S = self._sens(G, pos[inj])
+        return S[:n] + 1j * S[n:2*n], S[2*n:3*n] + 1j * S[3*n:]
+
+    def _grad(self, dX_dVa, dX_dVm):
+        """Derivatives w.r.t. the Newton state vector, from those w.r.t. all
+        voltage angles and magnitudes.
+        """
+        return hstack([sparse(dX_dVa)[:, self._pvpq],
+                       sparse(dX_dVm)[:, self._pq]]).tocsr()
+
+    def _sens(self, G, pos):
+        """Returns C{G * inv(J) * E}, where the columns of C{E} are unit
+        vectors at the positions C{pos} (zero columns where C{pos < 0}).
+        """
+        pos = asarray(pos, int)
+        S = zeros((G.shape[0], len(pos)))
+        k = find(pos >= 0)
+        if len(k) == 0 or G.shape[0] == 0:
+            return S
+        if G.shape[0] < len(k):
+            ## one transposed solve per observed quantity
+            Y = self.lu.solve(G.T.toarray(), True)
+            S[:, k] = Y[pos[k], :].T
+        else:
+            ## one solve per injection
+            E = zeros((self._nx, len(k)))
+            E[pos[k], arange(len(k))] = 1
+            S[:, k] = G * self.lu.solve(E)
+        return S
+
+
+def _select(pos, nx):
+    """Sparse matrix selecting the elements C{pos} of a vector of length
+    C{nx}, with zero rows where C{pos < 0}.
+    """
+    i = find(pos >= 0)
+    return sparse((ones(len(i)), (i, pos[i])), (len(pos), nx))
@@ -23,9 +23,11 @@ example::
 
 from __future__ import absolute_import
 
+from .ac_sensitivity import ac_sensitivity
 from .add_userfcn import add_userfcn
 from .bustypes import bustypes
 from .case118 import case118
+from .casehash import casehash
 from .case14 import case14
 from .case24_ieee_rts import case24_ieee_rts
 from .case300 import case300
@@ -38,6 +40,7 @@ from .case57 import case57
 from .case6ww import case6ww
 from .case9 import case9
 from .case9Q import case9Q
+from .cpf import cpf
 from .cplex_options import cplex_options
 from .d2AIbr_dV2 import d2AIbr_dV2
 from .d2ASbr_dV2 import d2ASbr_dV2
@@ -53,8 +56,11 @@ from .dSbr_dV import dSbr_dV
 from .dSbus_dV import dSbus_dV
 from .ext2int import ext2int
 from .fairmax import fairmax
+from .find_islands import find_islands
 from .fdpf import fdpf
+from .fdpf_cache import fdpf_cache
 from .gausspf import gausspf
+from .gscolor import gscolor
 from .get_reorder import get_reorder
 from .hasPQcap import hasPQcap
 from .int2ext import int2ext
@@ -62,30 +68,40 @@ from .ipoptopf_solver import ipoptopf_solver
 from .ipopt_options import ipopt_options
 from .isload import isload
 from .loadcase import loadcase
+from .lodf_chunks import lodf_chunks
+from .lufactor import lufactor
 from .makeAang import makeAang
 from .makeApq import makeApq
 from .makeAvl import makeAvl
 from .makeAy import makeAy
 from .makeBdc import makeBdc
 from .makeB import makeB
+from .makeJac import makeJac
+from .makeJidx import makeJidx
 from .makeLODF import makeLODF
 from .makePTDF import makePTDF
 from .makeSbus import makeSbus
 from .makeYbus import makeYbus
+from .memmap_sink import memmap_sink
 from .modcost import modcost
 from .mosek_options import mosek_options
 from .newtonpf import newtonpf
+from .newtonpf_batch import newtonpf_batch
 from .opf_args import opf_args
 from .opf_consfcn import opf_consfcn
+from .opf_considx import opf_considx
 from .opf_costfcn import opf_costfcn
 from .opf_execute import opf_execute
 from .opf_hessfcn import opf_hessfcn
+from .opf_hessidx import opf_hessidx
 from .opf_model import opf_model
 from .opf import opf
 from .opf_setup import opf_setup
 from .pfsoln import pfsoln
 from .pipsopf_solver import pipsopf_solver
 from .pips import pips
+from .pips_kkt import pips_kkt
+from .pips_linsolver import pips_linsolver
 from .pipsver import pipsver
 from .poly2pwl import poly2pwl
 from .polycost import polycost
@@ -99,16 +115,24 @@ from .qps_mosek import qps_mosek
 from .qps_pips import qps_pips
 from .qps_pypower import qps_pypower
 from .remove_userfcn import remove_userfcn
+from .runcontingency import runcontingency
+from .runcpf import runcpf
 from .rundcopf import rundcopf
 from .rundcpf import rundcpf
+from .rundcpf_series import rundcpf_series
 from .runduopf import runduopf
 from .runopf import runopf
 from .runopf_w_res import runopf_w_res
 from .runpf import runpf
+from .runpf_islands import runpf_islands
+from .runpf_batch import runpf_batch
 from .runuopf import runuopf
 from .run_userfcn import run_userfcn
 from .savecase import savecase
 from .scale_load import scale_load
+from .scenario_pool import scenario_pool
+from .screen_n2 import screen_n2
+from .sensitivity_model import sensitivity_model
 from .set_reorder import set_reorder
 from .toggle_iflims import toggle_iflims
 from .toggle_reserves import toggle_reserves
@@ -116,6 +140,8 @@ from .total_load import total_load
 from .totcost import totcost
 from .uopf import uopf
 from .update_mupq import update_mupq
+from .warmstart_cache import warmstart_cache
+from .ybus_model import ybus_model
 
 from .t.test_pypower import test_pypower
 from .t.t_case30_userfcns import t_case30_userfcns
@@ -0,0 +1,50 @@
+# Copyright (C) 2011 Richard Lincoln
+#
+# PYPOWER is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published
+# by the Free Software Foundation, either version 3 of the License,
+# or (at your option) any later version.
+#
+# PYPOWER is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with PYPOWER. If not, see <http://www.gnu.org/licenses/>.
+
+"""Hashes the network topology and parameters of a case.
+"""
+
+from hashlib import sha1
+
+from numpy import ascontiguousarray
+
+from pypower.idx_bus import BUS_I, BUS_TYPE, GS, BS
+from pypower.idx_brch import F_BUS, T_BUS, BR_R, BR_X, BR_B, TAP, SHIFT, \
+    BR_STATUS
+from pypower.idx_gen import GEN_BUS, GEN_STATUS
+
+
+def casehash(baseMVA, bus, gen, branch, *args):
+    """Hashes the network topology and parameters of a case.
+
+    Returns a hex digest identifying the network of a case in internal
+    indexing: the bus numbers, types and shunts, the branch terminals,
+    impedances, taps, shifts and statuses, and the generator buses and
+    statuses. Loads and generator set points do not affect it, so
+    successive snapshots of the same network have the same hash. Any
+    further arguments (arrays or scalars) are included in the hash.
+
+    Used as the key of caches of quantities that depend only on the
+    network, such as L{warmstart_cache}.
+    """
+    h = sha1()
+    for a in (baseMVA, bus[:, [BUS_I, BUS_TYPE, GS, BS]],
+              branch[:, [F_BUS, T_BUS, BR_R, BR_X, BR_B, TAP, SHIFT,
+                         BR_STATUS]],
+              gen[:, [GEN_BUS, GEN_STATUS]]) + args:
+        a = ascontiguousarray(a, float)
+        h.update(str(a.shape))
+        h.update(a.data)
+    return h.hexdigest()
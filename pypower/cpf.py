@@ -0,0 +1,298 @@
+# Copyright (C) 2011 Richard Lincoln
+#
+# PYPOWER is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published
+# by the Free Software Foundation, either version 3 of the License,
+# or (at your option) any later version.
+#
+# PYPOWER is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with PYPOWER. If not, see <http://www.gnu.org/licenses/>.
+
+"""Traces a power flow solution curve by continuation.
+"""
+
+import sys
+
+from time import time
+
+from numpy import angle, exp, conj, r_, zeros, arange, repeat, diff, \
+    argmax, array, Inf, sign
+from numpy.linalg import norm
+from scipy.sparse import csr_matrix
+
+from pypower.lufactor import lufactor
+from pypower.makeJidx import makeJidx
+from pypower.makeJac import makeJac
+from pypower.ppoption import ppoption
+
+
+def cpf(Ybus, Sbusb, Sbust, V0, ref, pv, pq, ppopt=None, lu=None):
+    """Traces a power flow solution curve by continuation.
+
+    Follows the solutions of the AC power flow with the bus injections
+    C{Sbus = Sbusb + lam * (Sbust - Sbusb)} as the loading parameter
+    C{lam} increases from 0, where C{V0} must be the solution of the power
+    flow with injections C{Sbusb} (the base case), in the direction of the
+    target injections C{Sbust}, reached at C{lam = 1}. The other arguments
+    are as for L{newtonpf}, whose mismatch and Jacobian (L{makeJac} on the
+    pattern computed once by L{makeJidx}) are used.
+
+    Each step predicts the next point along the tangent to the curve and
+    corrects it with Newton's method on the power flow equations augmented
+    with a parameterization equation, so that the solution can be followed
+    around the nose of the curve, where the power flow Jacobian is
+    singular. The C{CPF_PARAMETERIZATION} option selects:
+        1. local parameterization, the state variable (or C{lam}) changing
+           fastest along the tangent is fixed at each step
+        2. pseudo arc length, the step is measured along the tangent
+
+    The augmented Jacobian has a fixed pattern and is refactored by an
+    L{lufactor} object (C{lu}, if given), which reuses its analysis.
+
+    The step size C{CPF_STEP} is adapted if C{CPF_ADAPT_STEP} is set, so
+    that the distance between the predicted and corrected points stays
+    near C{CPF_ERROR_TOL}, within C{CPF_STEP_MIN} and C{CPF_STEP_MAX}.
+    Steps whose corrector does not converge are retaken with half the
+    step size. The C{CPF_STOP_AT} option selects when to stop:
+        - C{'NOSE'}  once the nose of the curve is passed, i.e. C{lam}
+          starts to decrease. The step is then halved until the nose is
+          located within C{CPF_STEP_MIN}
+        - C{'FULL'}  once C{lam} returns to 0 on the lower part of the
+          curve
+        - a number   once C{lam} reaches that value (or the nose)
+    At most C{CPF_MAX_STEPS} steps are taken.
+
+    Returns the complex voltages and the value of C{lam} of the last
+    point, a flag which is true if the stopping criterion was met and a
+    dict with:
+        - C{V}           C{nb x (steps + 1)} complex voltages of the points
+          traced, the first being C{V0}
+        - C{lam}         values of C{lam} of the points traced
+        - C{max_lam}     largest value of C{lam} found (the loadability
+          margin if the nose was reached)
+        - C{steps}       number of steps taken (accepted)
+        - C{rejected}    number of steps retaken
+        - C{iterations}  total number of corrector iterations
+        - C{event}       C{'NOSE'}, C{'FULL'}, C{'TARGET'}, C{'MAX_STEPS'} or
+          C{'FAILED'} (corrector failed at the minimum step size)
+        - C{et}          elapsed time in seconds
+
+    @see: L{runcpf}, L{newtonpf}
+    """
+    ## default arguments
+    if ppopt is None:
+        ppopt = ppoption()
+    if lu is None:
+        lu = lufactor()
+
+    ## options
+    tol      = ppopt['PF_TOL']
+    max_it   = ppopt['PF_MAX_IT']
+    verbose  = ppopt['VERBOSE']
+    step     = ppopt['CPF_STEP']
+    step_min = ppopt['CPF_STEP_MIN']
+    step_max = ppopt['CPF_STEP_MAX']
+    adapt    = ppopt['CPF_ADAPT_STEP']
+    err_tol  = ppopt['CPF_ERROR_TOL']
+    param    = ppopt['CPF_PARAMETERIZATION']
+    stop_at  = ppopt['CPF_STOP_AT']
+    max_step = ppopt['CPF_MAX_STEPS']
+    if param not in (1, 2):
+        raise ValueError('cpf: unknown parameterization %s' % param)
+    if isinstance(stop_at, str):
+        stop_at = stop_at.upper()
+        if stop_at not in ('NOSE', 'FULL'):
+            raise ValueError('cpf: unknown CPF_STOP_AT \'%s\'' % stop_at)
+        lam_stop = Inf
+    else:
+        lam_stop = stop_at
+    nose = stop_at != 'FULL'
+
+    t0 = time()
+
+    ## indexing of the state x = [Va(pv), Va(pq), Vm(pq), lam]
+    pvpq = r_[pv, pq]
+    npv, npq = len(pv), len(pq)
+    nj = npv + 2 * npq
+    nx = nj + 1
+    j1 = 0;         j2 = npv           ## j1:j2 - V angle of pv buses
+    j3 = j2;        j4 = j2 + npq      ## j3:j4 - V angle of pq buses
+    j5 = j4;        j6 = j4 + npq      ## j5:j6 - V mag of pq buses
+
+    ## derivative of the mismatch w.r.t. lam
+    dS = Sbust - Sbusb
+    dF_dlam = -r_[dS[pv].real, dS[pq].real, dS[pq].imag]
+
+    ## augmented Jacobian [J dF_dlam; dP_dx], with all of the last column
+    ## and row stored, so its pattern never changes
+    Jidx = makeJidx(Ybus, pv, pq)
+    J = Jidx['J']
+    nnzJ = J.nnz
+    rows = repeat(arange(nj), diff(J.indptr))
+    pJ = arange(nnzJ) + rows                ## positions of the J entries
+    pc = J.indptr[1:] + arange(nj)          ## and of the last column
+    indices = zeros(nnzJ + nj + nx, int)
+    indices[pJ] = J.indices
+    indices[pc] = nj
+    indices[nnzJ + nj:] = arange(nx)
+    A = csr_matrix((zeros(nnzJ + nj + nx), indices,
+                    r_[J.indptr + arange(nj + 1), nnzJ + nj + nx]), (nx, nx))
+    A.has_sorted_indices = True
+
+    def state(V, lam):
+        return r_[angle(V[pvpq]), abs(V[pq]), lam]
+
+    def voltage(x):
+        Va, Vm = angle(V0), abs(V0)
+        Va[pvpq] = x[j1:j4]
+        Vm[pq] = x[j5:j6]
+        return Vm * exp(1j * Va)
+
+    def mismatch(V, lam, Ibus):
+        mis = V * conj(Ibus) - Sbusb - lam * dS
+        return r_[mis[pv].real, mis[pq].real, mis[pq].imag]
+
+    def factor(V, Ibus, dP_dx):
+        makeJac(Ybus, V, Jidx, Ibus)
+        A.data[pJ] = J.data
+        A.data[pc] = dF_dlam
+        A.data[nnzJ + nj:] = dP_dx
+        return lu.factor(A)
+
+    def tangent(V, z, k):
+        ## unit tangent, oriented as z (or as increasing lam if z is None)
+        e = zeros(nx)
+        e[-1] = 1
+        if z is None:
+            dP_dx, rhs = e, 1
+        elif param == 1:
+            dP_dx = zeros(nx)
+            dP_dx[k] = 1
+            rhs = sign(z[k])
+        else:
+            dP_dx, rhs = z, 1
+        t = factor(V, Ybus * V, dP_dx).solve(r_[zeros(nj), rhs])
+        return t / norm(t)
+
+    def correct(x, dP_dx, p):
+        ## Newton's method on [F(x); dP_dx * x - p] = 0
+        V = voltage(x)
+        for i in range(max_it + 1):
+            Ibus = Ybus * V
+            F = r_[mismatch(V, x[-1], Ibus), dP_dx.dot(x) - p]
+            if norm(F, Inf) < tol:
+                return x, V, True, i
+            if i == max_it:
+                break
+            x = x - factor(V, Ibus, dP_dx).solve(F)
+            V = voltage(x)
+        return x, V, False, i
+
+    def at_lam(x, lam):
+        ## corrects x to the point with the given value of lam
+        e = zeros(nx)
+        e[-1] = 1
+        return correct(x, e, lam)
+
+    ## start from the base case
+    x = state(V0, 0.0)
+    V = V0
+    Vs, lams = [V0], [0.0]
+    z = tangent(V0, None, None)
+    nsteps = rejected = iterations = 0
+    event = 'MAX_STEPS'
+    locating = False
+
+    if verbose > 1:
+        sys.stdout.write('\n step     lambda       step size   iterations')
+        sys.stdout.write('\n------  -----------  -----------  ----------')
+        sys.stdout.write('\n%5d  %11.6f' % (0, 0.0))
+
+    while nsteps < max_step:
+        ## predictor
+        k = argmax(abs(z))
+        xp = x + step * z
+
+        ## corrector
+        if param == 1:
+            dP_dx = zeros(nx)
+            dP_dx[k] = 1
+            p = xp[k]
+        else:
+            dP_dx, p = z, z.dot(xp)
+        xc, Vc, ok, i = correct(xp, dP_dx, p)
+        iterations += i
+
+        if not ok or (nose and xc[-1] < x[-1]):
+            ## corrector failed or passed the nose, retry with a smaller step
+            locating = locating or ok
+            if step > step_min:
+                step = max(step / 2, step_min)
+                rejected += 1
+                continue
+            if not ok:
+                event = 'FAILED'
+                break
+
+        if ok and adapt and not locating:
+            err = norm(xc - xp, Inf)
+            if err > err_tol and step > step_min:
+                step = max(step * err_tol / err, step / 2, step_min)
+                rejected += 1
+                continue
+            step = min(step * min(err_tol / max(err, 1e-12), 2), step_max)
+
+        ## stop on reaching lam = 0 on the way back or the target value
+        if stop_at == 'FULL' and xc[-1] < 0:
+            xc, Vc, ok, i = at_lam(xc, 0.0)
+            iterations += i
+            event = 'FULL'
+        elif xc[-1] > lam_stop:
+            xc, Vc, ok, i = at_lam(x, lam_stop)
+            iterations += i
+            event = 'TARGET'
+        elif nose and xc[-1] < x[-1]:
+            event = 'NOSE'
+
+        nsteps += 1
+        x, V = xc, Vc
+        Vs.append(V)
+        lams.append(x[-1])
+        if verbose > 1:
+            sys.stdout.write('\n%5d  %11.6f  %11.3e  %10d' %
+                             (nsteps, x[-1], step, i))
+        if not ok:
+            event = 'FAILED'
+            break
+        if event != 'MAX_STEPS':
+            break
+
+        ## new tangent
+        z = tangent(V, z, k)
+
+    lams = array(lams)
+    success = event in ('NOSE', 'FULL', 'TARGET')
+    if verbose:
+        sys.stdout.write('\nContinuation power flow %s after %d steps '
+                         '(%d rejected), max lambda = %g.\n' %
+                         ('stopped at ' + event.lower() if success else
+                          'failed (%s)' % event.lower(),
+                          nsteps, rejected, lams.max()))
+
+    info = {
+        'V': array(Vs).T,
+        'lam': lams,
+        'max_lam': lams.max(),
+        'steps': nsteps,
+        'rejected': rejected,
+        'iterations': iterations,
+        'event': event,
+        'et': time() - t0
+    }
+
+    return V, x[-1], success, info
@@ -219,6 +219,10 @@ def dcopf_solver(om, ppopt, out_opt=None):
         costtol = ppopt['PDIPM_COSTTOL']
         max_it  = ppopt['PDIPM_MAX_IT']
         max_red = ppopt['SCPDIPM_RED_IT']
+        linsolver = ppopt['PDIPM_LINSOLVER']
+        ordering = ppopt['PDIPM_LINSOLVER_ORDERING']
+        ls_tol = ppopt['PDIPM_LINSOLVER_TOL']
+        ls_max_it = ppopt['PDIPM_LINSOLVER_MAX_IT']
         if feastol == 0:
             feastol = ppopt['OPF_VIOLATION']    ## = OPF_VIOLATION by default
         opt["pips_opt"] = {  'feastol': feastol,
@@ -227,7 +231,11 @@ def dcopf_solver(om, ppopt, out_opt=None):
                              'costtol': costtol,
                              'max_it':  max_it,
                              'max_red': max_red,
-                             'cost_mult': 1  }
+                             'cost_mult': 1,
+                             'linsolver': linsolver,
+                             'linsolver_ordering': ordering,
+                             'linsolver_tol': ls_tol,
+                             'linsolver_max_it': ls_max_it  }
     elif alg == 400:
         opt['ipopt_opt'] = ipopt_options([], ppopt)
     elif alg == 500:
@@ -17,11 +17,12 @@
 """Solves a DC power flow.
 """
 
-from numpy import copy, r_, matrix
-from scipy.sparse.linalg import spsolve
+from numpy import copy, r_, ix_, atleast_1d
 
+from pypower.lufactor import lufactor
 
-def dcpf(B, Pbus, Va0, ref, pv, pq):
+
+def dcpf(B, Pbus, Va0, ref, pv, pq, lu=None):
     """Solves a DC power flow.
 
     Solves for the bus voltage angles at all but the reference bus, given the
@@ -30,19 +31,29 @@ def dcpf(B, Pbus, Va0, ref, pv, pq):
     the lists of bus indices for the swing bus, PV buses, and PQ buses,
     respectively. Returns a vector of bus voltage angles in radians.
 
-    @see: L{rundcpf}, L{runpf}
+    The reduced C{B} matrix is factored by the optional L{lufactor} object
+    C{lu}. Passing the same object to repeated calls for a network with an
+    unchanged topology reuses its ordering and symbolic analysis.
+
+    @see: L{rundcpf}, L{runpf}, L{lufactor}
 
     @author: Carlos E. Murillo-Sanchez (PSERC Cornell & Universidad
     Autonoma de Manizales)
     @author: Ray Zimmerman (PSERC Cornell)
     @author: Richard Lincoln
     """
-    pvpq = matrix(r_[pv, pq])
+    if lu is None:
+        lu = lufactor()
+
+    pvpq = r_[pv, pq]
+    ref = atleast_1d(ref)
 
     ## initialize result vector
     Va = copy(Va0)
 
     ## update angles for non-reference buses
-    Va[pvpq] = spsolve(B[pvpq.T, pvpq], Pbus[pvpq] - B[pvpq.T, ref] * Va0[ref])
+    if len(pvpq):
+        Va[pvpq] = lu.factor(B[ix_(pvpq, pvpq)]).solve(
+            Pbus[pvpq] - B[ix_(pvpq, ref)] * Va0[ref])
 
     return Va
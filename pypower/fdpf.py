@@ -19,13 +19,13 @@
 
 import sys
 
-from numpy import array, angle, exp, linalg, conj, r_, Inf
-from scipy.sparse.linalg import splu
+from numpy import angle, exp, linalg, conj, r_, ix_, Inf
 
 from ppoption import ppoption
+from lufactor import lufactor
 
 
-def fdpf(Ybus, Sbus, V0, Bp, Bpp, ref, pv, pq, ppopt=None):
+def fdpf(Ybus, Sbus, V0, Bp, Bpp, ref, pv, pq, ppopt=None, lu=None):
     """Solves the power flow using a fast decoupled method.
 
     Solves for bus voltages given the full system admittance matrix (for
@@ -42,7 +42,14 @@ def fdpf(Ybus, Sbus, V0, Bp, Bpp, ref, pv, pq, ppopt=None):
     final complex voltages, a flag which indicates whether it converged
     or not, and the number of iterations performed.
 
-    @see: L{runpf}
+    C{lu} is an optional pair of L{lufactor} objects for the reduced B
+    prime and B double prime matrices. If they already hold factors
+    (from an earlier call with the same network and bus types), they are
+    used as they are and C{Bp} and C{Bpp} are ignored, so they may be
+    C{None}. Otherwise the reduced matrices are factored into them, so
+    that they can be kept for later calls (see L{fdpf_cache}).
+
+    @see: L{runpf}, L{fdpf_cache}
 
     @author: Ray Zimmerman (PSERC Cornell)
     @author: Richard Lincoln
@@ -72,9 +79,9 @@ def fdpf(Ybus, Sbus, V0, Bp, Bpp, ref, pv, pq, ppopt=None):
     P = mis[pvpq].real
     Q = mis[pq].imag
 
-    ## check tolerance
-    normP = linalg.norm(P, Inf)
-    normQ = linalg.norm(Q, Inf)
+    ## check tolerance (none if only ref buses)
+    normP = linalg.norm(P, Inf) if len(P) else 0.0
+    normQ = linalg.norm(Q, Inf) if len(Q) else 0.0
     if verbose > 1:
         sys.stdout.write('\niteration     max mismatch (p.u.)  ')
         sys.stdout.write('\ntype   #        P            Q     ')
@@ -85,13 +92,14 @@ def fdpf(Ybus, Sbus, V0, Bp, Bpp, ref, pv, pq, ppopt=None):
         if verbose > 1:
             sys.stdout.write('\nConverged!\n')
 
-    ## reduce B matrices
-    Bp = Bp[array([pvpq]).T, pvpq].tocsc() # splu requires a CSC matrix
-    Bpp = Bpp[array([pq]).T, pq].tocsc()
-
-    ## factor B matrices
-    Bp_solver = splu(Bp)
-    Bpp_solver = splu(Bpp)
+    ## reduce and factor B matrices, unless already factored
+    if lu is None:
+        lu = (lufactor(), lufactor())
+    Bp_solver, Bpp_solver = lu
+    if not Bp_solver.nfactor and not converged:
+        Bp_solver.factor(Bp[ix_(pvpq, pvpq)].tocsc())
+    if not Bpp_solver.nfactor and not converged:
+        Bpp_solver.factor(Bpp[ix_(pq, pq)].tocsc())
 
     ## do P and Q iterations
     while (not converged and i < max_it):
@@ -114,8 +122,7 @@ def fdpf(Ybus, Sbus, V0, Bp, Bpp, ref, pv, pq, ppopt=None):
         normP = linalg.norm(P, Inf)
         normQ = linalg.norm(Q, Inf)
         if verbose > 1:
-            sys.stdout.write("\n  %s  %3d   %10.3e   %10.3e" %
-                             (type,i, normP, normQ))
+            sys.stdout.write('\n  P  %3d   %10.3e   %10.3e' % (i, normP, normQ))
         if normP < tol and normQ < tol:
             converged = 1
             if verbose:
@@ -0,0 +1,107 @@
+# Copyright (C) 2011 Richard Lincoln
+#
+# PYPOWER is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published
+# by the Free Software Foundation, either version 3 of the License,
+# or (at your option) any later version.
+#
+# PYPOWER is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with PYPOWER. If not, see <http://www.gnu.org/licenses/>.
+
+"""Cache of factored B matrices for the fast-decoupled power flow.
+"""
+
+from collections import OrderedDict
+
+from pypower.casehash import casehash
+
+
+class fdpf_cache(object):
+    """Cache of factored B matrices for the fast-decoupled power flow.
+
+    Stores, for each network, set of PV and PQ buses and algorithm, the
+    pair of L{lufactor} objects holding the factors of the reduced B prime
+    and B double prime matrices used by L{fdpf}. A power flow whose entry
+    is found skips L{makeB} and the factorizations, leaving only the
+    forward and back substitutions of the P and Q iterations::
+
+        key = cache.key(baseMVA, bus, gen, branch, pv, pq, alg)
+        lu = cache.get(key)
+        if lu is None:
+            Bp, Bpp = makeB(baseMVA, bus, branch, alg)
+            lu = (lufactor(), lufactor())
+        else:
+            Bp = Bpp = None
+        V, success, i = fdpf(Ybus, Sbus, V0, Bp, Bpp, ref, pv, pq, ppopt, lu)
+        if lu[0].nfactor and lu[1].nfactor:
+            cache.put(key, lu)
+
+    L{fdpf} does not factor the matrices if C{V0} has already converged,
+    so only pairs that hold factors should be stored.
+
+    Entries are identified by L{key}, the L{casehash} of the network
+    extended with the bus index lists and the algorithm. At most
+    C{maxsize} entries are kept, the least recently used being evicted
+    first.
+
+    L{runpf} uses the module level C{runpf_fdpf_cache} when the
+    C{PF_FD_CACHE} option is set to the number of entries to keep.
+
+    @see: L{fdpf}, L{runpf}
+    """
+
+    def __init__(self, maxsize=4):
+        #: maximum number of entries
+        self.maxsize = maxsize
+
+        #: numbers of lookups that found and did not find an entry
+        self.hits = 0
+        self.misses = 0
+
+        self._lu = OrderedDict()
+
+    def __len__(self):
+        return len(self._lu)
+
+    def key(self, baseMVA, bus, gen, branch, pv, pq, alg):
+        """Returns the key of a network in internal indexing with the given
+        PV and PQ buses, for the algorithm C{alg} (2 = XB, 3 = BX).
+        """
+        return casehash(baseMVA, bus, gen, branch, pv, pq, alg)
+
+    def get(self, key):
+        """Returns the C{(Bp, Bpp)} pair of L{lufactor} objects stored for
+        C{key}, or C{None}.
+        """
+        lu = self._lu.pop(key, None)
+        if lu is None:
+            self.misses += 1
+            return None
+        self._lu[key] = lu          ## most recently used
+        self.hits += 1
+        return lu
+
+    def put(self, key, lu):
+        """Stores the C{(Bp, Bpp)} pair of factored L{lufactor} objects
+        C{lu} for C{key}.
+        """
+        self._lu.pop(key, None)
+        self._lu[key] = lu
+        while len(self._lu) > max(self.maxsize, 0):
+            self._lu.popitem(last=False)
+
+    def clear(self):
+        """Removes all entries.
+        """
+        self._lu.clear()
+        self.hits = 0
+        self.misses = 0
+
+
+#: cache used by L{runpf} when the C{PF_FD_CACHE} option is set
+runpf_fdpf_cache = fdpf_cache()
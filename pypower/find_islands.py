@@ -0,0 +1,49 @@
+# Copyright (C) 2011 Richard Lincoln
+#
+# PYPOWER is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published
+# by the Free Software Foundation, either version 3 of the License,
+# or (at your option) any later version.
+#
+# PYPOWER is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with PYPOWER. If not, see <http://www.gnu.org/licenses/>.
+
+"""Finds the islands of a network.
+"""
+
+from numpy import ones, argsort, bincount, cumsum, split, \
+    flatnonzero as find
+from scipy.sparse import csr_matrix as sparse
+from scipy.sparse.csgraph import connected_components
+
+from pypower.idx_brch import F_BUS, T_BUS, BR_STATUS
+
+
+def find_islands(bus, branch):
+    """Finds the islands of a network.
+
+    Returns a list of arrays of bus indices, one per connected component
+    of the graph of the in-service branches, ordered by decreasing number
+    of buses (and by first bus for equal sizes), each sorted. A bus with
+    no in-service branch forms an island by itself. Expects C{bus} and
+    C{branch} to use internal consecutive bus numbering.
+
+    @see: L{runpf_islands}
+    """
+    nb = bus.shape[0]
+    on = find(branch[:, BR_STATUS] > 0)
+    f = branch[on, F_BUS].astype(int)
+    t = branch[on, T_BUS].astype(int)
+    C = sparse((ones(len(on)), (f, t)), (nb, nb))
+
+    n, label = connected_components(C, directed=False)
+    buses = argsort(label, kind='mergesort')    ## grouped by island, sorted
+    groups = split(buses, cumsum(bincount(label, minlength=n))[:-1])
+    groups.sort(key=lambda g: (-len(g), g[0]))
+
+    return groups
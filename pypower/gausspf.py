@@ -19,9 +19,12 @@
 
 import sys
 
-from numpy import linalg, conj, r_, Inf, asscalar
+from numpy import linalg, conj, r_, Inf, arange, zeros, add, cumsum, \
+    flatnonzero as find
+from scipy.sparse import csr_matrix
 
 from ppoption import ppoption
+from gscolor import gscolor
 
 
 def gausspf(Ybus, Sbus, V0, ref, pv, pq, ppopt=None):
@@ -41,7 +44,14 @@ def gausspf(Ybus, Sbus, V0, ref, pv, pq, ppopt=None):
     a flag which indicates whether it converged or not, and the number
     of iterations performed.
 
-    @see: L{runpf}
+    The PV and PQ buses are partitioned into color classes by L{gscolor}
+    so that no two buses of a class are connected. All of the buses of a
+    class are then updated together in a single vectorized step, which is
+    equivalent to updating them one at a time. The rows of C{Ybus} needed
+    by each class are gathered once from its CSR arrays. The voltage
+    corrections are multiplied by the acceleration factor C{PF_GS_ACCEL}.
+
+    @see: L{runpf}, L{gscolor}
 
     @author: Ray Zimmerman (PSERC Cornell)
     @author: Alberto Borghetti (University of Bologna, Italy)
@@ -54,19 +64,43 @@ def gausspf(Ybus, Sbus, V0, ref, pv, pq, ppopt=None):
     ## options
     tol     = ppopt['PF_TOL']
     max_it  = ppopt['PF_MAX_IT_GS']
+    accel   = ppopt['PF_GS_ACCEL']
     verbose = ppopt['VERBOSE']
 
     ## initialize
     converged = 0
     i = 0
     V = V0.copy()
+    Sbus = Sbus.copy()
     #Va = angle(V)
     Vm = abs(V)
 
     ## set up indexing for updating V
-    npv = len(pv)
-    npq = len(pq)
-    pvpq = r_[pv, pq]
+    pvpq = r_[pv, pq].astype(int)
+    ispv = zeros(Ybus.shape[0], bool)
+    ispv[pv] = True
+
+    ## gather the rows of Ybus of each color class
+    Y = csr_matrix(Ybus)
+    Y.sum_duplicates()
+    classes = []
+    for c in gscolor(Y, pvpq):
+        k = pvpq[c]
+        start, end = Y.indptr[k], Y.indptr[k + 1]
+        seg = r_[0, cumsum(end - start)[:-1]]
+        pos = arange(end.sum() - start.sum()) - seg.repeat(end - start) + \
+            start.repeat(end - start)
+        classes.append({
+            'k': k,
+            'pv': find(ispv[k]),
+            'seg': seg,
+            'col': Y.indices[pos],
+            'y': Y.data[pos],
+            'ydiag': Y.diagonal()[k]
+        })
+    if verbose > 1:
+        sys.stdout.write('\n%d buses in %d color classes' %
+                         (len(pvpq), len(classes)))
 
     ## evaluate F(x0)
     mis = V * conj(Ybus * V) - Sbus
@@ -74,7 +108,7 @@ def gausspf(Ybus, Sbus, V0, ref, pv, pq, ppopt=None):
              mis[pq].imag   ]
 
     ## check tolerance
-    normF = linalg.norm(F, Inf)
+    normF = linalg.norm(F, Inf) if len(F) else 0.0   ## none if only ref buses
     if verbose > 1:
         sys.stdout.write('\n it    max P & Q mismatch (p.u.)')
         sys.stdout.write('\n----  ---------------------------')
@@ -89,21 +123,21 @@ def gausspf(Ybus, Sbus, V0, ref, pv, pq, ppopt=None):
         ## update iteration counter
         i = i + 1
 
-        ## update voltage
-        ## at PQ buses
-        for k in pq[range(npq)]:
-            tmp = (conj(Sbus[k] / V[k]) - Ybus[k, :] * V) / Ybus[k, k]
-            V[k] = V[k] + asscalar(tmp)
-
-        ## at PV buses
-        if npv:
-            for k in pv[range(npv)]:
-                tmp = (V[k] * conj(Ybus[k,:] * V)).imag
-                Sbus[k] = Sbus[k].real + 1j * asscalar(tmp)
-                tmp = (conj(Sbus[k] / V[k]) - Ybus[k, :] * V) / Ybus[k, k]
-                V[k] = V[k] + asscalar(tmp)
-#               V[k] = Vm[k] * V[k] / abs(V[k])
-            V[pv] = Vm[pv] * V[pv] / abs(V[pv])
+        ## update voltage, one color class at a time
+        for c in classes:
+            k, kv = c['k'], c['pv']
+            YV = add.reduceat(c['y'] * V[c['col']], c['seg'])
+
+            ## at PV buses, set Q to the current injection
+            if len(kv):
+                Sbus[k[kv]] = Sbus[k[kv]].real + \
+                    1j * (V[k[kv]] * conj(YV[kv])).imag
+
+            V[k] = V[k] + accel * (conj(Sbus[k] / V[k]) - YV) / c['ydiag']
+
+            ## restore voltage magnitudes of PV buses
+            if len(kv):
+                V[k[kv]] = Vm[k[kv]] * V[k[kv]] / abs(V[k[kv]])
 
         ## evalute F(x)
         mis = V * conj(Ybus * V) - Sbus
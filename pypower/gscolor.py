@@ -0,0 +1,60 @@
+# Copyright (C) 2011 Richard Lincoln
+#
+# PYPOWER is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published
+# by the Free Software Foundation, either version 3 of the License,
+# or (at your option) any later version.
+#
+# PYPOWER is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with PYPOWER. If not, see <http://www.gnu.org/licenses/>.
+
+"""Partitions buses into classes of buses that are not connected.
+"""
+
+from numpy import arange, zeros, ones, flatnonzero as find
+from numpy.random import RandomState
+from scipy.sparse import csr_matrix
+
+
+def gscolor(Ybus, buses):
+    """Partitions buses into classes of buses that are not connected.
+
+    Returns a list of index vectors into C{buses}, one per color class,
+    such that no two buses in a class are connected by a branch (an
+    off-diagonal nonzero of C{Ybus}). Each class is a maximal independent
+    set of the buses not yet colored, found with Luby's algorithm using
+    fixed pseudo-random priorities, so the coloring is reproducible and
+    is computed with sparse matrix operations only.
+
+    @see: L{gausspf}
+    """
+    n = len(buses)
+
+    ## adjacency among the given buses, without self loops
+    A = csr_matrix(Ybus)[buses, :][:, buses]
+    A = csr_matrix((ones(A.nnz), A.indices, A.indptr), A.shape)
+    A.setdiag(0)
+    A.eliminate_zeros()
+    A = ((A + A.T) > 0).astype(float).tocsr()
+
+    w = RandomState(42).permutation(n) + 1.0    ## priorities, all > 0
+    uncolored = ones(n, bool)
+    classes = []
+    while uncolored.any():
+        color = zeros(n, bool)
+        cand = uncolored.copy()
+        while cand.any():
+            ## candidates with higher priority than all candidate neighbors
+            W = A * csr_matrix((w * cand, (arange(n), arange(n))), (n, n))
+            sel = cand & (w > W.max(axis=1).toarray().ravel())
+            color |= sel
+            cand &= ~sel & ~(A * sel > 0)
+        classes.append(find(color))
+        uncolored &= ~color
+
+    return classes
@@ -20,7 +20,7 @@
 from numpy import ones, zeros, shape, Inf, pi, exp, conj, r_, arange
 from numpy import flatnonzero as find
 
-from scipy.sparse import issparse, tril, vstack, hstack, csr_matrix as sparse
+from scipy.sparse import issparse, vstack, hstack, csr_matrix as sparse
 from scipy.sparse import eye as speye
 
 from pypower.idx_bus import BUS_TYPE, REF, VM, VA, MU_VMAX, MU_VMIN, LAM_P, LAM_Q
@@ -31,7 +31,9 @@ from pypower.idx_cost import MODEL, PW_LINEAR, NCOST
 from pypower.makeYbus import makeYbus
 from pypower.opf_costfcn import opf_costfcn
 from pypower.opf_consfcn import opf_consfcn
+from pypower.opf_considx import opf_considx
 from pypower.opf_hessfcn import opf_hessfcn
+from pypower.opf_hessidx import opf_hessidx
 from pypower.util import sub2ind
 from pypower.ipopt_options import ipopt_options
 
@@ -134,7 +136,6 @@ def ipoptopf_solver(om, ppopt):
     Cl2 = Cl[il, :]
     Cg = sparse((ones(ng), (gen[:, GEN_BUS], arange(ng))), (nb, ng))
     nz = nx - 2 * (nb + ng)
-    nxtra = nx - 2 * nb
     if nz > 0:
         Js = vstack([
             hstack([Cb,      Cb,      Cg,              sparse((nb, ng)),   sparse((nb,  nz))]),
@@ -153,13 +154,6 @@ def ipoptopf_solver(om, ppopt):
     if A is not None and issparse(A):
         Js = vstack([Js, A], 'coo')
 
-    f, _, d2f = opf_costfcn(x0, om, True)
-    Hs = tril(d2f + vstack([
-        hstack([Cb,  Cb,  sparse((nb, nxtra))]),
-        hstack([Cb,  Cb,  sparse((nb, nxtra))]),
-        sparse((nxtra, nx))
-    ]), format='coo')
-
     ## set options struct for IPOPT
 #    options = {}
 #    options['ipopt'] = ipopt_options([], ppopt)
@@ -172,14 +166,23 @@ def ipoptopf_solver(om, ppopt):
         'Yt':       Yt[il, :],
         'ppopt':    ppopt,
         'il':       il,
+        'cidx':     None,
+        'hidx':     None,
         'A':        A,
         'nA':       nA,
         'neqnln':   2 * nb,
         'niqnln':   2 * nl2,
         'Js':       Js,
-        'Hs':       Hs
+        'Hs':       None
     }
 
+    ## index maps of the constraint gradients and of the Hessian of the
+    ## Lagrangian, the structure of which is that of its lower triangle
+    userdata['cidx'] = opf_considx(om, Ybus, userdata['Yf'], userdata['Yt'], il)
+    userdata['hidx'] = opf_hessidx(om, Ybus, userdata['Yf'], userdata['Yt'],
+                                   il, userdata['cidx'])
+    Hs = userdata['Hs'] = userdata['hidx']['L'].tocoo()
+
     ## check Jacobian and Hessian structure
     #xr                  = rand(x0.shape)
     #lmbda               = rand( 2 * nb + 2 * nl2)
@@ -379,9 +382,10 @@ def eval_g(x, user_data=None):
     Yt    = user_data['Yt']
     ppopt = user_data['ppopt']
     il    = user_data['il']
+    cidx  = user_data['cidx']
     A     = user_data['A']
 
-    hn, gn, _, _ = opf_consfcn(x, om, Ybus, Yf, Yt, ppopt, il)
+    hn, gn, _, _ = opf_consfcn(x, om, Ybus, Yf, Yt, ppopt, il, cidx)
 
     if A is not None and issparse(A):
         c = r_[gn, hn, A * x]
@@ -408,9 +412,10 @@ def eval_jac_g(x, flag, user_data=None):
         Yt    = user_data['Yt']
         ppopt = user_data['ppopt']
         il    = user_data['il']
+        cidx  = user_data['cidx']
         A     = user_data['A']
 
-        _, _, dhn, dgn = opf_consfcn(x, om, Ybus, Yf, Yt, ppopt, il)
+        _, _, dhn, dgn = opf_consfcn(x, om, Ybus, Yf, Yt, ppopt, il, cidx)
 
         if A is not None and issparse(A):
             J = vstack([dgn.T, dhn.T, A], 'coo')
@@ -445,19 +450,13 @@ def eval_h(x, lagrange, obj_factor, flag, user_data=None):
         Yt     = user_data['Yt']
         ppopt  = user_data['ppopt']
         il     = user_data['il']
+        hidx   = user_data['hidx']
 
         lam = {}
         lam['eqnonlin']   = lagrange[:neqnln]
         lam['ineqnonlin'] = lagrange[arange(niqnln) + neqnln]
 
-        H = opf_hessfcn(x, lam, om, Ybus, Yf, Yt, ppopt, il, obj_factor)
-
-        Hl = tril(H, format='csc')
-
-        ## FIXME: Extend PyIPOPT to handle changes in sparsity structure
-        nnzh = Hs.nnz
-        Hd = zeros(nnzh)
-        for i in xrange(nnzh):
-            Hd[i] = Hl[Hs.row[i], Hs.col[i]]
+        ## values of the lower triangle, in the order of Hs
+        opf_hessfcn(x, lam, om, Ybus, Yf, Yt, ppopt, il, obj_factor, hidx)
 
-        return Hd
+        return hidx['L'].data.copy()
@@ -0,0 +1,130 @@
+# Copyright (C) 2011 Richard Lincoln
+#
+# PYPOWER is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published
+# by the Free Software Foundation, either version 3 of the License,
+# or (at your option) any later version.
+#
+# PYPOWER is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with PYPOWER. If not, see <http://www.gnu.org/licenses/>.
+
+"""Computes line outage distribution factors in chunks of outages.
+"""
+
+from sys import stderr
+
+from numpy import ones, zeros, arange, asarray, memmap, r_, \
+    flatnonzero as find
+from scipy.sparse import csr_matrix as sparse
+
+from pypower.makeBdc import makeBdc
+from pypower.lufactor import lufactor
+
+from pypower.idx_bus import BUS_TYPE, REF, BUS_I
+from pypower.idx_brch import F_BUS, T_BUS
+
+
+def lodf_chunks(baseMVA, bus, branch, outages=None, chunk=256,
+                callback=None, out=None, tol=1e-8):
+    """Computes line outage distribution factors in chunks of outages.
+
+    Computes the columns of the DC line outage distribution factor matrix
+    (see L{makeLODF}) for the branches listed in C{outages} (all branches
+    by default), C{chunk} columns at a time, without forming the PTDF
+    matrix. The reduced B matrix is factored once and each chunk takes
+    one solve per outage for the PTDF of the corresponding transfer,
+    so memory use is bounded by C{nl x chunk} rather than C{nl x nl}.
+
+    Column C{j} holds the changes in the flows of all C{nl} branches per
+    unit of pre-outage flow on branch C{outages[j]}, with C{-1} for the
+    outaged branch itself.
+
+    The outage of a bridge branch, one whose removal splits the network
+    into islands, has no DC solution and would give a division by zero.
+    Such outages are detected by a PTDF of the branch to its own transfer
+    within C{tol} of one. Their columns are set to zero, with C{-1} for
+    the outaged branch, and they are flagged in the returned C{bridge}
+    vector.
+
+    Each chunk is passed as it is computed to C{callback(k, LODF, bridge)},
+    if given, where C{k} are the indices of the outaged branches of the
+    chunk, C{LODF} is the C{nl x len(k)} block of factors and C{bridge}
+    their bridge flags. The chunks are also written to C{out}, the name of
+    a file to create as a C{nl x len(outages)} memory-mapped array, or an
+    existing array or memory map of that shape. If neither C{callback}
+    nor C{out} is given, a dense array is allocated.
+
+    Returns C{out} (C{None} when only a C{callback} is given) and the
+    boolean vector C{bridge} of bridge flags for C{outages}.
+
+    Example::
+        lodf, bridge = lodf_chunks(baseMVA, bus, branch, out='lodf.dat')
+
+    @see: L{makeLODF}, L{makePTDF}
+    """
+    nb = bus.shape[0]
+    nl = branch.shape[0]
+    if outages is None:
+        outages = arange(nl)
+    outages = asarray(outages, int).flatten()
+    no = len(outages)
+
+    ## check that bus numbers are equal to indices to bus (one set of bus numbers)
+    if any(bus[:, BUS_I] != arange(nb)):
+        stderr.write('lodf_chunks: buses must be numbered consecutively')
+
+    ## output
+    if isinstance(out, basestring):
+        out = memmap(out, dtype=float, mode='w+', shape=(nl, no))
+    elif out is None and callback is None:
+        out = zeros((nl, no))
+    if out is not None and out.shape != (nl, no):
+        raise ValueError('lodf_chunks: out must be %d x %d' % (nl, no))
+
+    ## factor the reduced B matrix for the reference bus as slack, any
+    ## slack gives the same PTDF for a transfer between two buses
+    slack = find(bus[:, BUS_TYPE] == REF)[0]
+    noref = arange(1, nb)      ## use bus 1 for voltage angle reference
+    noslack = find(arange(nb) != slack)
+    Bbus, Bf, _, _ = makeBdc(baseMVA, bus, branch)
+    A = Bbus.tocsr()[noslack, :].tocsc()[:, noref]
+    Bf = Bf.tocsc()[:, noref]
+    lu = lufactor().factor(A)
+
+    ## branch-bus incidence, one column per branch
+    f = branch[:, F_BUS].astype(int)
+    t = branch[:, T_BUS].astype(int)
+    Cft = sparse((r_[ones(nl), -ones(nl)],
+                  (r_[f, t], r_[arange(nl), arange(nl)])), (nb, nl))
+    Cft = Cft.tocsc()[:, outages].tocsr()[noslack, :]
+
+    bridge = zeros(no, bool)
+    for j in range(0, no, chunk):
+        c = arange(j, min(j + chunk, no))
+        k = outages[c]
+
+        ## PTDFs for the transfers between the ends of the outaged branches
+        H = asarray(Bf * lu.solve(Cft[:, c].toarray()))
+        h = H[k, arange(len(c))]
+
+        ## LODF = H / (1 - h), except for bridges
+        br = abs(1 - h) < tol
+        H[:, br] = 0
+        H[:, ~br] = H[:, ~br] / (1 - h[~br])
+        H[k, arange(len(c))] = -1
+        bridge[c] = br
+
+        if callback is not None:
+            callback(k, H, br)
+        if out is not None:
+            out[:, c] = H
+
+    if isinstance(out, memmap):
+        out.flush()
+
+    return out, bridge
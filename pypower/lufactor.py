@@ -0,0 +1,236 @@
+# Copyright (C) 2011 Richard Lincoln
+#
+# PYPOWER is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published
+# by the Free Software Foundation, either version 3 of the License,
+# or (at your option) any later version.
+#
+# PYPOWER is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with PYPOWER. If not, see <http://www.gnu.org/licenses/>.
+
+"""Sparse LU factorization that reuses its ordering and symbolic analysis.
+"""
+
+from warnings import warn
+
+from numpy import arange, argsort, array_equal, empty, empty_like, \
+    zeros, nan, int32
+
+from scipy.sparse import csc_matrix, issparse
+from scipy.sparse.linalg import splu
+
+try:
+    from scikits.umfpack import UmfpackContext, UMFPACK_A, UMFPACK_At
+except ImportError:
+    UmfpackContext = None
+
+
+class lufactor(object):
+    """Sparse LU factorization that reuses its ordering and symbolic
+    analysis.
+
+    Newton power flow, DC power flow and interior point KKT systems are
+    solved many times with a coefficient matrix whose sparsity pattern does
+    not change. An C{lufactor} object remembers the pattern of the last
+    matrix passed to L{factor} and, if the next matrix has the same
+    pattern, only performs a numeric refactorization::
+
+        lu = lufactor()
+        for k in range(max_it):
+            J = makeJac(Ybus, V, Jidx)
+            dx = -lu.factor(J).solve(F)
+
+    Two solvers are supported:
+        - C{'UMFPACK'}  used by default if C{scikits.umfpack} is
+          importable. The symbolic analysis is computed once per pattern
+          and each refactorization is purely numeric.
+        - C{'SUPERLU'}  SciPy's C{splu}. SuperLU does not expose its
+          symbolic phase separately, so the fill-reducing column ordering
+          (C{permc_spec}, COLAMD by default) from the first factorization
+          is kept instead and later
+          factorizations are done on the pre-permuted matrix using the
+          natural ordering. The permuted CSC pattern and the map from the
+          input C{data} array into it are also kept, so no format conversion
+          or column permutation is needed on refactorization.
+
+    The numbers of numeric factorizations and of symbolic analyses
+    performed are kept in the C{nfactor} and C{nanalyse} attributes.
+
+    If the matrix is singular, L{solve} returns a vector of C{nan}, as
+    C{spsolve} does.
+    """
+
+    def __init__(self, solver=None, permc_spec='COLAMD'):
+        if not solver:
+            solver = 'SUPERLU' if UmfpackContext is None else 'UMFPACK'
+        solver = solver.upper()
+        if solver not in ('SUPERLU', 'UMFPACK'):
+            raise ValueError('lufactor: unknown solver \'%s\'' % solver)
+        if solver == 'UMFPACK' and UmfpackContext is None:
+            raise ImportError('lufactor: UMFPACK solver requires '
+                              'scikits.umfpack')
+
+        #: name of the solver used for factorization
+        self.solver = solver
+
+        #: column ordering of the first SuperLU factorization
+        self.permc_spec = permc_spec
+
+        #: number of numeric factorizations performed
+        self.nfactor = 0
+
+        #: number of symbolic analyses (orderings) performed
+        self.nanalyse = 0
+
+        self._shape = None
+        self._format = None
+        self._indptr = None
+        self._indices = None
+
+        self._A = None          ## current (CSC) matrix, for UMFPACK
+        self._lu = None         ## SuperLU object
+        self._umf = None        ## UmfpackContext
+        self._pq = None         ## column ordering of current pattern (SuperLU)
+        self._q = None          ## column permutation of current factors
+        self._map = None        ## input data -> permuted CSC data (SuperLU)
+        self._pindptr = None    ## permuted CSC pattern (SuperLU)
+        self._pindices = None
+        self._singular = False
+
+    def same_pattern(self, A):
+        """Returns C{True} if C{A} has the sparsity pattern of the matrix
+        last passed to L{factor}.
+        """
+        return (self._indices is not None) and \
+            (A.shape == self._shape) and (A.format == self._format) and \
+            (A.nnz == len(self._indices)) and \
+            array_equal(A.indptr, self._indptr) and \
+            array_equal(A.indices, self._indices)
+
+    def factor(self, A):
+        """Factors the sparse matrix C{A} (CSR or CSC).
+
+        The symbolic analysis (UMFPACK) or column ordering (SuperLU) of the
+        previous call is reused if the pattern of C{A} is unchanged.
+        Returns the object itself, so that C{lu.factor(A).solve(b)} may be
+        used.
+        """
+        if not issparse(A) or A.format not in ('csr', 'csc'):
+            A = csc_matrix(A)
+        if not A.has_canonical_format:
+            A = A.copy()
+            A.sum_duplicates()
+
+        if self.same_pattern(A):
+            self._numeric(A)
+        else:
+            self._analyse(A)
+
+        return self
+
+    def solve(self, b, trans=False):
+        """Solves C{A * x = b} (or C{A.T * x = b} if C{trans} is true)
+        using the current factorization. C{b} may be a vector or a matrix
+        with one right-hand side per column.
+        """
+        if self._singular:
+            return nan * zeros(b.shape)
+
+        if self.solver == 'UMFPACK':
+            sys = UMFPACK_At if trans else UMFPACK_A
+            if b.ndim == 1:
+                return self._umf.solve(sys, self._A, b, autoTranspose=False)
+            x = empty(b.shape)
+            for k in range(b.shape[1]):
+                x[:, k] = self._umf.solve(sys, self._A, b[:, k],
+                                          autoTranspose=False)
+            return x
+
+        ## A[:, q] = B is factored, so A.T * x = b is B.T * x = b[q]
+        if trans:
+            if self._q is None:
+                return self._lu.solve(b, 'T')
+            return self._lu.solve(b[self._q], 'T')
+
+        y = self._lu.solve(b)
+        if self._q is None:
+            return y
+        x = empty_like(y)
+        x[self._q] = y
+        return x
+
+    def _analyse(self, A):
+        self.nanalyse += 1
+        self._shape = A.shape
+        self._format = A.format
+        self._indptr = A.indptr.copy()
+        self._indices = A.indices.copy()
+
+        if self.solver == 'UMFPACK':
+            self._A = A.tocsc()
+            self._A.sort_indices()
+            family = 'di' if self._A.indices.dtype == int32 else 'dl'
+            self._umf = UmfpackContext(family)
+            self._umf.symbolic(self._A)
+            self._numeric(A)
+            return
+
+        ## first factorization computes the fill-reducing ordering
+        self.nfactor += 1
+        try:
+            self._lu = splu(A.tocsc(), permc_spec=self.permc_spec)
+            self._singular = False
+        except RuntimeError:
+            ## no ordering to keep, analyse the pattern again next time
+            self._lu = None
+            self._singular = True
+            self._indices = None
+            warn('lufactor: matrix is exactly singular')
+            return
+        self._q = None
+
+        ## Pr * A * Pc = L * U, i.e. A * Pc = A[:, argsort(perm_c)]
+        q = argsort(self._lu.perm_c)
+
+        ## map data of A into the CSC pattern of A[:, q], carrying
+        ## (1-based) positions as values so that none of them is zero
+        C = A.copy()
+        C.data = arange(1, A.nnz + 1, dtype=float)
+        P = C.tocsc()[:, q]
+        P.sort_indices()
+        self._pq = q
+        self._map = P.data.astype(int) - 1
+        self._pindptr = P.indptr
+        self._pindices = P.indices
+
+    def _numeric(self, A):
+        self.nfactor += 1
+
+        if self.solver == 'UMFPACK':
+            if A.format == 'csc':
+                self._A.data[:] = A.data
+            else:
+                self._A = A.tocsc()
+                self._A.sort_indices()
+            try:
+                self._umf.numeric(self._A)
+                self._singular = False
+            except RuntimeError:
+                self._singular = True
+                warn('lufactor: matrix is exactly singular')
+            return
+
+        B = csc_matrix((A.data[self._map], self._pindices, self._pindptr),
+                       self._shape)
+        try:
+            self._lu = splu(B, permc_spec='NATURAL')
+            self._q = self._pq
+            self._singular = False
+        except RuntimeError:
+            self._singular = True
+            warn('lufactor: matrix is exactly singular')
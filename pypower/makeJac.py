@@ -0,0 +1,62 @@
+# Copyright (C) 2011 Richard Lincoln
+#
+# PYPOWER is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published
+# by the Free Software Foundation, either version 3 of the License,
+# or (at your option) any later version.
+#
+# PYPOWER is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with PYPOWER. If not, see <http://www.gnu.org/licenses/>.
+
+"""Fills the power flow Jacobian in place from a precomputed index map.
+"""
+
+from numpy import conj, zeros, r_
+
+
+def makeJac(Ybus, V, Jidx, Ibus=None):
+    """Fills the power flow Jacobian in place from a precomputed index map.
+
+    Evaluates the entries of C{dSbus_dV} only at the nonzeros of the
+    pattern recorded in C{Jidx} (see L{makeJidx}) and scatters their real
+    and imaginary parts directly into the C{data} array of the Jacobian
+    C{Jidx['J']}, which is returned. For each nonzero C{Ybus[i, j]}::
+
+        dS_dVm[i, j] = V[i] * conj(Ybus[i, j] * V[j] / abs(V[j]))
+        dS_dVa[i, j] = -j * V[i] * conj(Ybus[i, j] * V[j])
+
+    with C{conj(Ibus[i]) * V[i] / abs(V[i])} and C{j * V[i] * conj(Ibus[i])}
+    added on the diagonal. C{Ibus = Ybus * V} may be supplied if it is
+    already available. C{Ybus} must have the pattern it had when C{Jidx}
+    was built.
+
+    @see: L{makeJidx}, L{dSbus_dV}, L{newtonpf}
+    """
+    if Ibus is None:
+        Ibus = Ybus * V
+
+    ib, jb, kdiag, ny = Jidx['ib'], Jidx['jb'], Jidx['kdiag'], Jidx['ny']
+
+    ydata = Ybus.data
+    if len(ib) > ny:
+        ydata = r_[ydata, zeros(len(ib) - ny)]
+
+    Vnorm = V / abs(V)
+    Vi = V[ib]
+    yconj = conj(ydata)
+
+    dS_dVm = Vi * yconj * conj(Vnorm[jb])
+    dS_dVa = -1j * Vi * yconj * conj(V[jb])
+    dS_dVm[kdiag] += conj(Ibus) * Vnorm
+    dS_dVa[kdiag] += 1j * V * conj(Ibus)
+
+    J = Jidx['J']
+    J.data[:] = r_[dS_dVa.real, dS_dVm.real,
+                   dS_dVa.imag, dS_dVm.imag][Jidx['src']]
+
+    return J
@@ -0,0 +1,127 @@
+# Copyright (C) 2011 Richard Lincoln
+#
+# PYPOWER is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published
+# by the Free Software Foundation, either version 3 of the License,
+# or (at your option) any later version.
+#
+# PYPOWER is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with PYPOWER. If not, see <http://www.gnu.org/licenses/>.
+
+"""Builds the index map used to fill the power flow Jacobian in place.
+"""
+
+from numpy import arange, ones, zeros, r_, diff, lexsort, bincount, \
+    cumsum, setdiff1d, flatnonzero as find
+from scipy.sparse import csr_matrix, issparse
+
+
+def makeJidx(Ybus, pv, pq):
+    """Builds the index map used to fill the power flow Jacobian in place.
+
+    The structure of the Newton power flow Jacobian::
+
+        J = | dP/dVa[pvpq, pvpq]  dP/dVm[pvpq, pq] |
+            | dQ/dVa[pq, pvpq]    dQ/dVm[pq, pq]   |
+
+    depends only on the sparsity pattern of C{Ybus} and on the sets of
+    PV and PQ buses. This function analyses the pattern once and returns
+    a dict that L{makeJac} uses to write the Jacobian values straight into
+    the C{data} array of a preallocated CSR matrix, without forming
+    C{dSbus_dV} or stacking the four sub-blocks.
+
+    The dict contains the following keys:
+        - C{ib}, C{jb}  bus row and column of each entry of the pattern
+          (the pattern of C{Ybus} plus its full diagonal)
+        - C{ny}     number of leading pattern entries that are taken,
+          in order, from C{Ybus.data}
+        - C{kdiag}  position of the diagonal element of each bus in the
+          pattern
+        - C{src}    index into the stacked values
+          C{[Re dS/dVa, Re dS/dVm, Im dS/dVa, Im dS/dVm]} of the pattern
+          for each nonzero of C{J}, in CSR order
+        - C{pv}, C{pq}, C{pvpq}  bus index lists used to build C{J}
+        - C{J}      the preallocated CSR Jacobian
+
+    C{Ybus} may be in CSR or CSC format. It is put in canonical format in
+    place (duplicates summed and indices sorted) so that its C{data} array
+    can be read directly by L{makeJac}. If only the values of C{Ybus}
+    change, the same index map remains valid.
+
+    @see: L{makeJac}, L{newtonpf}, L{dSbus_dV}
+    """
+    if not issparse(Ybus) or Ybus.format not in ('csr', 'csc'):
+        raise ValueError('makeJidx: Ybus must be a CSR or CSC matrix')
+    Ybus.sum_duplicates()
+    Ybus.sort_indices()
+
+    nb = Ybus.shape[0]
+    ny = Ybus.nnz
+    pvpq = r_[pv, pq].astype(int)
+    npvpq = len(pvpq)
+    npq = len(pq)
+
+    ## bus row & column of each nonzero in Ybus
+    ib = arange(nb).repeat(diff(Ybus.indptr))
+    jb = Ybus.indices.astype(int)
+    if Ybus.format == 'csc':
+        ib, jb = jb, ib
+
+    ## append any structurally missing diagonal elements
+    missing = setdiff1d(arange(nb), ib[ib == jb])
+    ib = r_[ib, missing]
+    jb = r_[jb, missing]
+    nnz = len(ib)
+
+    kdiag = zeros(nb, int)
+    d = find(ib == jb)
+    kdiag[ib[d]] = d
+
+    ## position of each bus in the rows/columns of J (-1 if not present)
+    rowP = -ones(nb, int)
+    rowQ = -ones(nb, int)
+    colA = -ones(nb, int)
+    colM = -ones(nb, int)
+    rowP[pvpq] = arange(npvpq)
+    colA[pvpq] = arange(npvpq)
+    rowQ[pq] = npvpq + arange(npq)
+    colM[pq] = npvpq + arange(npq)
+
+    ## entries of each block: J11 = Re dS/dVa, J12 = Re dS/dVm,
+    ## J21 = Im dS/dVa, J22 = Im dS/dVm
+    rows, cols, src = [], [], []
+    for blk, (rmap, cmap) in enumerate([(rowP, colA), (rowP, colM),
+                                        (rowQ, colA), (rowQ, colM)]):
+        r = rmap[ib]
+        c = cmap[jb]
+        k = find((r >= 0) & (c >= 0))
+        rows.append(r[k])
+        cols.append(c[k])
+        src.append(blk * nnz + k)
+    rows, cols, src = r_[tuple(rows)], r_[tuple(cols)], r_[tuple(src)]
+
+    ## sort into CSR order
+    order = lexsort((cols, rows))
+    rows, cols, src = rows[order], cols[order], src[order]
+
+    nj = npvpq + npq
+    indptr = r_[0, cumsum(bincount(rows, minlength=max(nj, 1))[:nj])]
+    J = csr_matrix((zeros(len(src)), cols, indptr), (nj, nj))
+    J.has_sorted_indices = True
+
+    return {
+        'ib': ib,
+        'jb': jb,
+        'ny': ny,
+        'kdiag': kdiag,
+        'src': src,
+        'pv': pv,
+        'pq': pq,
+        'pvpq': pvpq,
+        'J': J
+    }
@@ -17,7 +17,7 @@
 """Builds the line outage distribution factor matrix.
 """
 
-from numpy import ones, diag, eye, r_, arange
+from numpy import ones, diag, r_, arange, asarray, fill_diagonal
 from scipy.sparse import csr_matrix as sparse
 
 from idx_brch import F_BUS, T_BUS
@@ -33,7 +33,10 @@ def makeLODF(branch, PTDF):
         H = makePTDF(baseMVA, bus, branch)
         LODF = makeLODF(branch, H)
 
-    @see: L{makePTDF}
+    The full matrix is formed densely. For large systems or a subset of
+    outages, see L{lodf_chunks}.
+
+    @see: L{makePTDF}, L{lodf_chunks}
 
     @author: Ray Zimmerman (PSERC Cornell)
     @author: Richard Lincoln
@@ -44,9 +47,9 @@ def makeLODF(branch, PTDF):
     Cft = sparse((r_[ones(nl), -ones(nl)],
                       (r_[f, t], r_[arange(nl), arange(nl)])), (nb, nl))
 
-    H = PTDF * Cft
+    H = asarray(PTDF * Cft)
     h = diag(H, 0)
-    LODF = H / (ones((nl, nl)) - ones((nl, 1)) * h.T)
-    LODF = LODF - diag(diag(LODF)) - eye(nl, nl)
+    LODF = H / (1 - h)
+    fill_diagonal(LODF, -1)
 
     return LODF
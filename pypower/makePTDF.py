@@ -19,15 +19,15 @@
 
 from sys import stderr
 
-from numpy import zeros, arange, isscalar, dot, ix_, flatnonzero as find
-
-from numpy.linalg import solve
+from numpy import zeros, ones, arange, isscalar, asarray, flatnonzero as find
+from scipy.sparse import csr_matrix as sparse, hstack
 
 from idx_bus import BUS_TYPE, REF, BUS_I
 from makeBdc import makeBdc
+from lufactor import lufactor
 
 
-def makePTDF(baseMVA, bus, branch, slack=None):
+def makePTDF(baseMVA, bus, branch, slack=None, bus_idx=None, branch_idx=None):
     """Builds the DC PTDF matrix for a given choice of slack.
 
     Returns the DC PTDF matrix for a given choice of slack. The matrix is
@@ -41,6 +41,14 @@ def makePTDF(baseMVA, bus, branch, slack=None):
     column specifies how the slack should be handled for injections
     at that bus.
 
+    If C{branch_idx} is given, only the rows of the monitored branches it
+    lists are computed and, if C{bus_idx} is given, only the columns of the
+    injection buses it lists, in the given orders. The reduced B matrix is
+    factored once with a sparse LU factorization and the PTDF is obtained
+    by solving either for the selected columns or, if there are fewer of
+    them, for the selected rows with the transposed matrix, so that neither
+    C{Bbus} nor the full matrix is ever formed densely.
+
     @see: L{makeLODF}
 
     @author: Ray Zimmerman (PSERC Cornell)
@@ -62,29 +70,51 @@ def makePTDF(baseMVA, bus, branch, slack=None):
     noref = arange(1, nb)      ## use bus 1 for voltage angle reference
     noslack = find(arange(nb) != slack_bus)
 
+    ## rows and columns to compute
+    if bus_idx is None:
+        bus_idx = arange(nb)
+    if branch_idx is None:
+        branch_idx = arange(nbr)
+    bus_idx = asarray(bus_idx, int).flatten()
+    branch_idx = asarray(branch_idx, int).flatten()
+
     ## check that bus numbers are equal to indices to bus (one set of bus numbers)
     if any(bus[:, BUS_I] != arange(nb)):
         stderr.write('makePTDF: buses must be numbered consecutively')
 
-    ## compute PTDF for single slack_bus
+    ## injections whose flows are computed, as columns of R, so that
+    ## H = H0 * R where H0 is the PTDF for the single slack_bus
+    I = sparse((ones(nb), (arange(nb), arange(nb))), (nb, nb)).tocsc()
+    if isscalar(slack):
+        R = I[:, bus_idx]
+    elif len(slack.shape) == 1:    ## slack is a vector of weights
+        ## conceptually, we want to do ...
+        ##    H = H * (eye(nb, nb) - slack * ones((1, nb)))
+        ## ... we just do it more efficiently, with the flows due to the
+        ## slack distribution computed as one extra column
+        slack = slack / float(sum(slack))   ## normalize weights
+        R = hstack([I[:, bus_idx], sparse(slack).T]).tocsc()
+    else:
+        R = sparse(asarray(slack)[:, bus_idx])
+    R = R.tocsr()[noslack, :]
+
+    ## compute PTDF for single slack_bus, H0 = Bf[:, noref] * inv(A)
     Bbus, Bf, _, _ = makeBdc(baseMVA, bus, branch)
-    Bbus, Bf = Bbus.todense(), Bf.todense()
-    H = zeros((nbr, nb))
-    H[:, noslack] = solve( Bbus[ix_(noslack, noref)].T, Bf[:, noref].T ).T
-    #             = Bf[:, noref] * inv(Bbus[ix_(noslack, noref)])
+    A = Bbus.tocsr()[noslack, :].tocsc()[:, noref]
+    Bf = Bf.tocsr()[branch_idx, :].tocsc()[:, noref]
+    if len(branch_idx) == 0 or R.shape[1] == 0:
+        H = zeros((len(branch_idx), R.shape[1]))
+    elif len(branch_idx) < R.shape[1]:
+        ## one solve per monitored branch, H0[:, noslack] = (A' \ Bf')'
+        Y = lufactor().factor(A.T.tocsc()).solve(Bf.T.toarray())
+        H = asarray((R.T * Y).T)
+    else:
+        ## one solve per injection, H = Bf * (A \ R)
+        X = lufactor().factor(A).solve(R.toarray())
+        H = asarray(Bf * X)
 
     ## distribute slack, if requested
-    if not isscalar(slack):
-        if len(slack.shape) == 1:  ## slack is a vector of weights
-            slack = slack / sum(slack)   ## normalize weights
-
-            ## conceptually, we want to do ...
-            ##    H = H * (eye(nb, nb) - slack * ones((1, nb)))
-            ## ... we just do it more efficiently
-            v = dot(H, slack)
-            for k in range(nb):
-                H[:, k] = H[:, k] - v
-        else:
-            H = dot(H, slack)
+    if not isscalar(slack) and len(slack.shape) == 1:
+        H = H[:, :-1] - H[:, -1:]
 
     return H
@@ -0,0 +1,144 @@
+# Copyright (C) 2011 Richard Lincoln
+#
+# PYPOWER is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published
+# by the Free Software Foundation, either version 3 of the License,
+# or (at your option) any later version.
+#
+# PYPOWER is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with PYPOWER. If not, see <http://www.gnu.org/licenses/>.
+
+"""Stores selected power flow and OPF results in memory-mapped arrays.
+"""
+
+from os import makedirs
+from os.path import join, isdir, exists, basename, splitext
+from glob import glob
+
+from numpy import nan
+from numpy.lib.format import open_memmap
+
+from pypower.loadcase import loadcase
+
+from pypower.idx_bus import VM, VA, LAM_P, LAM_Q, MU_VMAX, MU_VMIN
+from pypower.idx_brch import PF, QF, PT, QT, MU_SF, MU_ST
+from pypower.idx_gen import PG, QG, MU_PMAX, MU_PMIN
+
+
+#: quantities that can be stored, with their table and column
+FIELDS = {
+    'VM': ('bus', VM),
+    'VA': ('bus', VA),
+    'LAM_P': ('bus', LAM_P),
+    'LAM_Q': ('bus', LAM_Q),
+    'MU_VMAX': ('bus', MU_VMAX),
+    'MU_VMIN': ('bus', MU_VMIN),
+    'PF': ('branch', PF),
+    'QF': ('branch', QF),
+    'PT': ('branch', PT),
+    'QT': ('branch', QT),
+    'MU_SF': ('branch', MU_SF),
+    'MU_ST': ('branch', MU_ST),
+    'PG': ('gen', PG),
+    'QG': ('gen', QG),
+    'MU_PMAX': ('gen', MU_PMAX),
+    'MU_PMIN': ('gen', MU_PMIN)
+}
+
+
+class memmap_sink(object):
+    """Stores selected power flow and OPF results in memory-mapped arrays.
+
+    Keeps only the requested columns of the C{bus}, C{branch} and C{gen}
+    matrices of a series of results, such as the periods of a year-long
+    study, instead of the whole C{results} dicts. Each quantity is
+    written to a preallocated C{T x n} array, indexed by (period,
+    element), memory-mapped from a C{.npy} file in the directory C{path},
+    where C{n} is the number of rows of the corresponding matrix of the
+    case C{ppc} (external ordering)::
+
+        sink = memmap_sink('year', 8760, ppc, ['VM', 'VA', 'PF', 'PG'])
+        for t in range(8760):
+            ...
+            results, success = runpf(ppc, ppopt)
+            sink.write(t, results)
+        sink.flush()
+        Pf = sink['PF']          ## 8760 x nl
+
+    C{fields} are names of L{FIELDS}, by default C{VM}, C{VA}, C{PF},
+    C{QF}, C{PT}, C{QT}, C{PG}, C{QG} and C{LAM_P}. Quantities missing from
+    the results, such as prices of a power flow, are stored as C{nan}. The
+    C{success} flag of each period is also stored.
+
+    With C{mode} C{'r'} or C{'r+'}, the arrays of an existing directory
+    are opened instead (all of them if C{fields} is not given), and C{T}
+    and C{ppc} are not needed. The files can also be read directly with
+    C{numpy.load(file, mmap_mode='r')}.
+
+    @see: L{runpf}, L{runopf}, L{scenario_pool}
+    """
+
+    def __init__(self, path, T=None, ppc=None, fields=None, mode='w+'):
+        #: directory holding the arrays
+        self.path = path
+
+        if mode == 'w+':
+            if fields is None:
+                fields = ['VM', 'VA', 'PF', 'QF', 'PT', 'QT', 'PG', 'QG',
+                          'LAM_P']
+            for f in fields:
+                if f not in FIELDS:
+                    raise ValueError('memmap_sink: unknown field \'%s\'' % f)
+            ppc = loadcase(ppc)
+            if not isdir(path):
+                makedirs(path)
+        elif fields is None:
+            fields = [splitext(basename(f))[0]
+                      for f in glob(join(path, '*.npy'))]
+            fields = [f for f in fields if f in FIELDS]
+
+        #: names of the stored quantities
+        self.fields = list(fields)
+
+        self._a = {}
+        for f in self.fields + ['success']:
+            fname = join(path, f + '.npy')
+            if mode == 'w+':
+                if f == 'success':
+                    shape, dtype = (T,), bool
+                else:
+                    shape, dtype = (T, ppc[FIELDS[f][0]].shape[0]), float
+                self._a[f] = open_memmap(fname, mode, dtype, shape)
+                if f != 'success':
+                    self._a[f][:] = nan
+            elif exists(fname):
+                self._a[f] = open_memmap(fname, mode)
+
+        #: number of periods
+        self.T = self._a['success'].shape[0]
+
+    def __getitem__(self, field):
+        return self._a[field]
+
+    def write(self, t, results):
+        """Stores the quantities of C{results} for period C{t}.
+        """
+        for f in self.fields:
+            table, col = FIELDS[f]
+            x = results[table]
+            if x.shape[1] > col:
+                self._a[f][t, :] = x[:, col]
+            else:
+                self._a[f][t, :] = nan
+        self._a['success'][t] = results.get('success', True)
+
+    def flush(self):
+        """Writes any changes to the files.
+        """
+        for a in self._a.values():
+            a.flush()
@@ -19,16 +19,19 @@
 
 import sys
 
-from numpy import array, angle, exp, linalg, conj, r_, Inf
+from time import time
 
-from scipy.sparse import hstack, vstack
-from scipy.sparse.linalg import spsolve
+from numpy import angle, exp, linalg, conj, r_, Inf, in1d, sort, any, \
+    maximum, argmax, where, array, flatnonzero
 
-from dSbus_dV import dSbus_dV
+from lufactor import lufactor
+from makeJidx import makeJidx
+from makeJac import makeJac
 from ppoption import ppoption
 
 
-def newtonpf(Ybus, Sbus, V0, ref, pv, pq, ppopt=None):
+def newtonpf(Ybus, Sbus, V0, ref, pv, pq, ppopt=None, lu=None,
+             Qmin=None, Qmax=None):
     """Solves the power flow using a full Newton's method.
 
     Solves for bus voltages given the full system admittance matrix (for
@@ -42,10 +45,55 @@ def newtonpf(Ybus, Sbus, V0, ref, pv, pq, ppopt=None):
     set the termination tolerance, maximum number of iterations, and
     output options (see L{ppoption} for details). Uses default options if
     this parameter is not given. Returns the final complex voltages, a
-    flag which indicates whether it converged or not, and the number of
-    iterations performed.
+    flag which indicates whether it converged or not, the number of
+    iterations performed and a dict of solver statistics:
+        - C{iterations}  number of iterations
+        - C{nfactor}     number of Jacobian evaluations and factorizations
+        - C{rejected}    number of steps rejected (see below)
+        - C{et}          total elapsed time in seconds
+        - C{et_jac}, C{et_factor}, C{et_solve}, C{et_mis}  time spent
+          evaluating the Jacobian, factoring it, solving for the update and
+          evaluating the mismatch
+        - C{ref}, C{pv}, C{pq}  final bus index lists (see below)
+        - C{limited}     buses converted from PV to PQ (see below)
+        - C{lu}, C{Jidx}  the L{lufactor} object holding the factors of the
+          Jacobian evaluated at the last iteration, one Newton step before
+          the solution, and the L{makeJidx} index map of the final bus
+          types (see L{ac_sensitivity}). C{lu} is C{None} if the last
+          iteration reused older factors, if it was followed by a change of
+          bus types, or if no iteration was done (C{V0} had already
+          converged)
 
-    @see: L{runpf}
+    The sparsity pattern of the Jacobian is computed once from C{Ybus} by
+    L{makeJidx} and its values are refilled in place by L{makeJac} at each
+    iteration. The Jacobian is factored by an L{lufactor} object, which
+    keeps its ordering and symbolic analysis from one iteration to the
+    next. If the optional C{lu} argument is given, that object is used
+    instead of a new one, so that repeated solves of a network with an
+    unchanged topology also reuse the analysis.
+
+    If the C{PF_NR_REUSE} option is positive, the factored Jacobian is
+    reused for up to that many consecutive iterations, in the way that
+    L{fdpf} reuses its constant B matrices. The Jacobian is evaluated and
+    refactored as soon as an iteration with reused factors reduces the
+    mismatch by a ratio worse than C{PF_NR_REUSE_RATIO}, and a step with
+    reused factors that increases the mismatch is rejected and retaken with
+    a fresh Jacobian.
+
+    If C{Qmin} and C{Qmax}, vectors of the lower and upper limits on the
+    reactive power injection at each bus in p.u., are given and the
+    C{ENFORCE_Q_LIMS} option is set, generator reactive power limits are
+    enforced within the iterations. Once the mismatch is below 1e-3 p.u.
+    (or the tolerance), the reactive injections at the PV and reference
+    buses are checked after each iteration. Buses that violate a limit are
+    converted to PQ buses with the injection fixed at the limit, by moving
+    them to the PQ index list, and the iterations continue from the current
+    voltages. If C{ENFORCE_Q_LIMS} is 2, only the largest violation is
+    fixed at a time. If the reference bus is converted, the first remaining
+    PV bus becomes the reference. The final index lists are returned in
+    C{info}.
+
+    @see: L{runpf}, L{makeJidx}, L{makeJac}, L{lufactor}
 
     @author: Ray Zimmerman (PSERC Cornell)
     @author: Richard Lincoln
@@ -53,66 +101,145 @@ def newtonpf(Ybus, Sbus, V0, ref, pv, pq, ppopt=None):
     ## default arguments
     if ppopt is None:
         ppopt = ppoption()
+    if lu is None:
+        lu = lufactor()
 
     ## options
     tol     = ppopt['PF_TOL']
     max_it  = ppopt['PF_MAX_IT']
+    reuse   = ppopt['PF_NR_REUSE']
+    ratio   = ppopt['PF_NR_REUSE_RATIO']
     verbose = ppopt['VERBOSE']
+    qlim    = ppopt['ENFORCE_Q_LIMS'] if Qmin is not None else 0
 
     ## initialize
+    t0 = time()
+    if qlim:
+        Sbus = Sbus.copy()
+    limited = array([], int)
     converged = 0
     i = 0
     V = V0
     Va = angle(V)
     Vm = abs(V)
+    info = {'iterations': 0, 'nfactor': 0, 'rejected': 0, 'et': 0.0,
+            'et_jac': 0.0, 'et_factor': 0.0, 'et_solve': 0.0, 'et_mis': 0.0}
 
     ## set up indexing for updating V
-    pvpq = r_[pv, pq]
     npv = len(pv)
     npq = len(pq)
     j1 = 0;         j2 = npv           ## j1:j2 - V angle of pv buses
     j3 = j2;        j4 = j2 + npq      ## j3:j4 - V angle of pq buses
     j5 = j4;        j6 = j4 + npq      ## j5:j6 - V mag of pq buses
 
+    ## precompute the Jacobian sparsity pattern and index map
+    Jidx = makeJidx(Ybus, pv, pq)
+
     ## evaluate F(x0)
-    mis = V * conj(Ybus * V) - Sbus
+    t1 = time()
+    Ibus = Ybus * V
+    mis = V * conj(Ibus) - Sbus
     F = r_[  mis[pv].real,
              mis[pq].real,
              mis[pq].imag  ]
+    info['et_mis'] += time() - t1
 
     ## check tolerance
-    normF = linalg.norm(F, Inf)
+    normF = linalg.norm(F, Inf) if len(F) else 0.0   ## none if only ref buses
     if verbose > 1:
         sys.stdout.write('\n it    max P & Q mismatch (p.u.)')
         sys.stdout.write('\n----  ---------------------------')
         sys.stdout.write('\n%3d        %10.3e' % (i, normF))
     if normF < tol:
         converged = 1
-        if verbose > 1:
-            sys.stdout.write('\nConverged!\n')
 
     ## do Newton iterations
-    while (not converged and i < max_it):
-        ## update iteration counter
-        i = i + 1
+    refactor = True         ## evaluate and factor the Jacobian?
+    nreuse = 0              ## consecutive iterations with reused factors
+    fresh = False           ## factors from this iteration & bus types?
+    while True:
+        ## convert PV buses with violated Q limits to PQ buses, once the
+        ## mismatch is small enough for the Q injections to be meaningful
+        if qlim and normF < max(tol, 1e-3):
+            k, Qlim = _qviolations(V, Ibus, r_[ref, pv], Qmin, Qmax, tol,
+                                   qlim == 2)
+            if len(k):
+                Sbus[k] = Sbus[k].real + 1j * Qlim
+                r = ref[in1d(ref, k)]       ## fix P of a converted slack bus
+                Sbus[r] = (V[r] * conj(Ibus[r])).real + 1j * Sbus[r].imag
+                limited = r_[limited, k].astype(int)
+                if verbose:
+                    for b, q in zip(k, Qlim):
+                        sys.stdout.write('\nBus %d at %s Q limit, converting '
+                                         'to PQ bus' % (b, 'upper' if
+                                         q == Qmax[b] else 'lower'))
 
-        ## evaluate Jacobian
-        dS_dVm, dS_dVa = dSbus_dV(Ybus, V)
+                ## update bus index lists
+                pv = pv[~in1d(pv, k)]
+                if any(in1d(ref, k)):
+                    if len(ref) > 1:
+                        raise ValueError('Sorry, PYPOWER cannot enforce Q '
+                                         'limits for slack buses in systems '
+                                         'with multiple slacks.')
+                    if len(pv) == 0:
+                        if verbose:
+                            sys.stdout.write('\nBus %d [only one left] '
+                                             'exceeds Q limit : INFEASIBLE '
+                                             'PROBLEM\n' % ref[0])
+                        converged = 0
+                        break
+                    ref, pv = pv[:1], pv[1:]
+                    if verbose:
+                        sys.stdout.write('\nBus %d is new slack bus' % ref[0])
+                pq = sort(r_[pq, k])
+                npv = len(pv)
+                npq = len(pq)
+                j1 = 0;         j2 = npv       ## j1:j2 - V angle of pv buses
+                j3 = j2;        j4 = j2 + npq  ## j3:j4 - V angle of pq buses
+                j5 = j4;        j6 = j4 + npq  ## j5:j6 - V mag of pq buses
+                Jidx = makeJidx(Ybus, pv, pq)
+                refactor = True
+                fresh = False
 
-        J11 = dS_dVa[array([pvpq]).T, pvpq].real
-        J12 = dS_dVm[array([pvpq]).T, pq].real
-        J21 = dS_dVa[array([pq]).T, pvpq].imag
-        J22 = dS_dVm[array([pq]).T, pq].imag
+                mis = V * conj(Ibus) - Sbus
+                F = r_[  mis[pv].real,
+                         mis[pq].real,
+                         mis[pq].imag  ]
+                normF = linalg.norm(F, Inf)
+                converged = 0
+                if verbose > 1:
+                    sys.stdout.write('\n%3d        %10.3e' % (i, normF))
 
-        J = vstack([
-                hstack([J11, J12]),
-                hstack([J21, J22])
-            ], format="csr")
+        if converged or i >= max_it:
+            break
+
+        ## update iteration counter
+        i = i + 1
+
+        ## evaluate and factor Jacobian, unless reusing the last factors
+        if refactor or nreuse >= reuse:
+            t1 = time()
+            J = makeJac(Ybus, V, Jidx, Ibus)
+            t2 = time()
+            lu.factor(J)
+            info['et_jac'] += t2 - t1
+            info['et_factor'] += time() - t2
+            info['nfactor'] += 1
+            nreuse = 0
+            fresh = True
+        else:
+            nreuse = nreuse + 1
+            fresh = False
 
         ## compute update step
-        dx = -1 * spsolve(J, F)
+        t1 = time()
+        dx = -1 * lu.solve(F)
+        info['et_solve'] += time() - t1
 
         ## update voltage
+        Va0, Vm0, V0, Ibus0, F0, normF0, mis0 = Va, Vm, V, Ibus, F, normF, mis
+        Va = Va.copy()
+        Vm = Vm.copy()
         if npv:
             Va[pv] = Va[pv] + dx[j1:j2]
         if npq:
@@ -123,24 +250,63 @@ def newtonpf(Ybus, Sbus, V0, ref, pv, pq, ppopt=None):
         Va = angle(V)          ## we wrapped around with a negative Vm
 
         ## evalute F(x)
-        mis = V * conj(Ybus * V) - Sbus
+        t1 = time()
+        Ibus = Ybus * V
+        mis = V * conj(Ibus) - Sbus
         F = r_[  mis[pv].real,
                  mis[pq].real,
                  mis[pq].imag  ]
+        info['et_mis'] += time() - t1
 
         ## check for convergence
         normF = linalg.norm(F, Inf)
         if verbose > 1:
-            sys.stdout.write('\n%3d        %10.3e' % (i, normF))
+            sys.stdout.write('\n%3d        %10.3e%s' %
+                             (i, normF, '  (reused J)' if nreuse else ''))
         if normF < tol:
             converged = 1
-            if verbose:
-                sys.stdout.write("\nNewton's method power flow converged in "
-                                 "%d iterations.\n" % i)
+        elif nreuse:
+            ## reject a step with reused factors that increases the mismatch
+            if normF > normF0:
+                Va, Vm, V, Ibus, F, normF, mis = \
+                    Va0, Vm0, V0, Ibus0, F0, normF0, mis0
+                info['rejected'] += 1
+                if verbose > 1:
+                    sys.stdout.write('  rejected')
+            refactor = normF > ratio * normF0
+        else:
+            refactor = False
 
     if verbose:
-        if not converged:
+        if converged:
+            sys.stdout.write("\nNewton's method power flow converged in "
+                             "%d iterations.\n" % i)
+        else:
             sys.stdout.write("\nNewton's method power did not converge in %d "
                              "iterations.\n" % i)
 
-    return V, converged, i
+    info['iterations'] = i
+    info['et'] = time() - t0
+    info['ref'], info['pv'], info['pq'] = ref, pv, pq
+    info['limited'] = limited
+    ## only factors of the last iteration, with the final bus types
+    info['lu'] = lu if fresh else None
+    info['Jidx'] = Jidx
+
+    return V, converged, i, info
+
+
+def _qviolations(V, Ibus, buses, Qmin, Qmax, tol, largest=False):
+    """Returns the buses among C{buses} whose reactive power injection
+    violates its limits by more than C{tol}, and the limits violated. If
+    C{largest} is true only the largest violation is returned.
+    """
+    Q = (V[buses] * conj(Ibus[buses])).imag
+    over = Q - Qmax[buses]
+    under = Qmin[buses] - Q
+    viol = maximum(over, under)
+    k = flatnonzero(viol > tol)
+    if largest and len(k):
+        k = k[[argmax(viol[k])]]
+    Qlim = where(over[k] > 0, Qmax[buses[k]], Qmin[buses[k]])
+    return buses[k], Qlim
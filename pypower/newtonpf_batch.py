@@ -0,0 +1,155 @@
+# Copyright (C) 2011 Richard Lincoln
+#
+# PYPOWER is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published
+# by the Free Software Foundation, either version 3 of the License,
+# or (at your option) any later version.
+#
+# PYPOWER is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with PYPOWER. If not, see <http://www.gnu.org/licenses/>.
+
+"""Solves several power flows on the same network using Newton's method.
+"""
+
+import sys
+
+from numpy import angle, exp, conj, c_, r_, arange, zeros, \
+    flatnonzero as find
+from scipy.sparse import csr_matrix
+
+from pypower.lufactor import lufactor
+from pypower.makeJidx import makeJidx
+from pypower.ppoption import ppoption
+
+
+def newtonpf_batch(Ybus, Sbus, V0, ref, pv, pq, ppopt=None, lu=None):
+    """Solves several power flows on the same network using Newton's method.
+
+    Like L{newtonpf}, but C{Sbus} and C{V0} are C{ns x nb} matrices with
+    one scenario per row. All scenarios share C{Ybus} and the bus type
+    index lists, so the Jacobian index map is computed only once by
+    L{makeJidx}. At each iteration the mismatches of all scenarios that
+    have not yet converged are evaluated together, their Jacobians are
+    filled from the common index map and stacked into a single
+    block-diagonal matrix, and all of the Newton updates are computed with
+    one sparse factorization. Converged scenarios are dropped from the
+    system as soon as their mismatch satisfies the tolerance.
+
+    Returns an C{ns x nb} matrix of complex bus voltages, a boolean vector
+    of convergence flags and the number of iterations taken by each
+    scenario. C{lu} is an optional L{lufactor} object that may be shared
+    between calls.
+
+    @see: L{newtonpf}, L{runpf_batch}
+    """
+    ## default arguments
+    if ppopt is None:
+        ppopt = ppoption()
+    if lu is None:
+        lu = lufactor()
+
+    ## options
+    tol     = ppopt['PF_TOL']
+    max_it  = ppopt['PF_MAX_IT']
+    verbose = ppopt['VERBOSE']
+
+    ## initialize
+    ns = Sbus.shape[0]
+    V = V0.copy()
+    Va = angle(V)
+    Vm = abs(V)
+    converged = zeros(ns, bool)
+    iterations = zeros(ns, int)
+
+    ## set up indexing for updating V
+    npv = len(pv)
+    npq = len(pq)
+    j1 = 0;         j2 = npv           ## j1:j2 - V angle of pv buses
+    j3 = j2;        j4 = j2 + npq      ## j3:j4 - V angle of pq buses
+    j5 = j4;        j6 = j4 + npq      ## j5:j6 - V mag of pq buses
+
+    ## Jacobian pattern of a single scenario
+    Jidx = makeJidx(Ybus, pv, pq)
+    ib, jb, kdiag, src = Jidx['ib'], Jidx['jb'], Jidx['kdiag'], Jidx['src']
+    nj = Jidx['J'].shape[0]
+    nnzJ = len(src)
+    indptr, indices = Jidx['J'].indptr, Jidx['J'].indices
+
+    ydata = r_[Ybus.data, zeros(len(ib) - Jidx['ny'])]
+    yconj = conj(ydata)
+
+    ## evaluate F(x0) for all scenarios
+    Ibus = (Ybus * V.T).T
+    mis = V * conj(Ibus) - Sbus
+    F = c_[mis[:, pv].real, mis[:, pq].real, mis[:, pq].imag]
+    normF = abs(F).max(1) if F.shape[1] else zeros(ns)
+    converged[normF < tol] = True
+    if verbose > 1:
+        sys.stdout.write('\n it    scenarios    max P & Q mismatch (p.u.)')
+        sys.stdout.write('\n----  -----------  ---------------------------')
+        sys.stdout.write('\n%3d  %5d active        %10.3e' %
+                         (0, ns - sum(converged), normF.max()))
+
+    ## do Newton iterations
+    i = 0
+    act = find(~converged)
+    while len(act) and i < max_it:
+        ## update iteration counter
+        i = i + 1
+        na = len(act)
+        iterations[act] = i
+
+        ## evaluate Jacobians of active scenarios (as in makeJac)
+        Vx = V[act]
+        Vnorm = Vx / abs(Vx)
+        Vi = Vx[:, ib]
+        dS_dVm = Vi * yconj * conj(Vnorm[:, jb])
+        dS_dVa = -1j * Vi * yconj * conj(Vx[:, jb])
+        dS_dVm[:, kdiag] += conj(Ibus[act]) * Vnorm
+        dS_dVa[:, kdiag] += 1j * Vx * conj(Ibus[act])
+        data = c_[dS_dVa.real, dS_dVm.real, dS_dVa.imag, dS_dVm.imag][:, src]
+
+        ## block-diagonal Jacobian with one block per active scenario
+        offs = arange(na)
+        J = csr_matrix((data.ravel(),
+                        (indices + nj * offs[:, None]).ravel(),
+                        r_[0, (indptr[1:] + nnzJ * offs[:, None]).ravel()]),
+                       (na * nj, na * nj))
+
+        ## compute update step
+        dx = -1 * lu.factor(J).solve(F[act].ravel()).reshape(na, nj)
+
+        ## update voltage
+        if npv:
+            Va[act[:, None], pv] = Va[act][:, pv] + dx[:, j1:j2]
+        if npq:
+            Va[act[:, None], pq] = Va[act][:, pq] + dx[:, j3:j4]
+            Vm[act[:, None], pq] = Vm[act][:, pq] + dx[:, j5:j6]
+        V[act] = Vm[act] * exp(1j * Va[act])
+        Vm[act] = abs(V[act])            ## update Vm and Va again in case
+        Va[act] = angle(V[act])          ## we wrapped around with a negative Vm
+
+        ## evalute F(x) of active scenarios
+        Ibus[act] = (Ybus * V[act].T).T
+        mis = V[act] * conj(Ibus[act]) - Sbus[act]
+        F[act] = c_[mis[:, pv].real, mis[:, pq].real, mis[:, pq].imag]
+
+        ## check for convergence
+        normF[act] = abs(F[act]).max(1) if F.shape[1] else zeros(na)
+        converged[act[normF[act] < tol]] = True
+        if verbose > 1:
+            sys.stdout.write('\n%3d  %5d active        %10.3e' %
+                             (i, na, normF[act].max()))
+        act = find(~converged)
+
+    if verbose:
+        sys.stdout.write("\nNewton's method power flow converged for %d of "
+                         "%d scenarios in at most %d iterations.\n" %
+                         (sum(converged), ns, i))
+
+    return V, converged, iterations
@@ -19,19 +19,14 @@
 
 from numpy import zeros, ones, conj, exp, r_, Inf, arange
 
-from scipy.sparse import lil_matrix, vstack, hstack, csr_matrix as sparse
-
-from idx_gen import GEN_BUS, PG, QG
+from idx_gen import PG, QG
 from idx_brch import F_BUS, T_BUS, RATE_A
 
 from makeSbus import makeSbus
-from dSbus_dV import dSbus_dV
-from dIbr_dV import dIbr_dV
-from dSbr_dV import dSbr_dV
-from dAbr_dV import dAbr_dV
+from opf_considx import opf_considx
 
 
-def opf_consfcn(x, om, Ybus, Yf, Yt, ppopt, il=None, *args):
+def opf_consfcn(x, om, Ybus, Yf, Yt, ppopt, il=None, cidx=None, *args):
     """Evaluates nonlinear constraints and their Jacobian for OPF.
 
     Constraint evaluation function for AC optimal power flow, suitable
@@ -47,6 +42,9 @@ def opf_consfcn(x, om, Ybus, Yf, Yt, ppopt, il=None, *args):
     branches with flow limits (all others are assumed to be
     unconstrained). The default is C{range(nl)} (all branches).
     C{Yf} and C{Yt} contain only the rows corresponding to C{il}.
+    @param cidx: (optional) index map of the constraint gradients built
+    by L{opf_considx} for the same arguments. It is built on each call if
+    not given.
 
     @return: C{h} - vector of inequality constraint values (flow limits)
     limit^2 - flow^2, where the flow can be apparent power real power or
@@ -54,8 +52,10 @@ def opf_consfcn(x, om, Ybus, Yf, Yt, ppopt, il=None, *args):
     constrained lines). C{g} - vector of equality constraint values (power
     balances). C{dh} - (optional) inequality constraint gradients, column
     j is gradient of h(j). C{dg} - (optional) equality constraint gradients.
+    C{dh} and C{dg} are the CSC matrices of C{cidx}, whose values are
+    overwritten in place by the next call.
 
-    @see: L{opf_costfcn}, L{opf_hessfcn}
+    @see: L{opf_costfcn}, L{opf_hessfcn}, L{opf_considx}
 
     @author: Carlos E. Murillo-Sanchez (PSERC Cornell & Universidad
     Autonoma de Manizales)
@@ -99,7 +99,8 @@ def opf_consfcn(x, om, Ybus, Yf, Yt, ppopt, il=None, *args):
     V = Vm * exp(1j * Va)
 
     ## evaluate power flow equations
-    mis = V * conj(Ybus * V) - Sbus
+    Ibus = Ybus * V
+    mis = V * conj(Ibus) - Sbus
 
     ##----- evaluate constraint function values -----
     ## first, the equality constraints (power flow)
@@ -110,17 +111,17 @@ def opf_consfcn(x, om, Ybus, Yf, Yt, ppopt, il=None, *args):
     if nl2 > 0:
         flow_max = (branch[il, RATE_A] / baseMVA)**2
         flow_max[flow_max == 0] = Inf
+        If = Yf * V
+        It = Yt * V
         if ppopt['OPF_FLOW_LIM'] == 2:       ## current magnitude limit, |I|
-            If = Yf * V
-            It = Yt * V
             h = r_[ If * conj(If) - flow_max,     ## branch I limits (from bus)
                     It * conj(It) - flow_max ].real    ## branch I limits (to bus)
         else:
             ## compute branch power flows
             ## complex power injected at "from" bus (p.u.)
-            Sf = V[ branch[il, F_BUS].astype(int) ] * conj(Yf * V)
+            Sf = V[ branch[il, F_BUS].astype(int) ] * conj(If)
             ## complex power injected at "to" bus (p.u.)
-            St = V[ branch[il, T_BUS].astype(int) ] * conj(Yt * V)
+            St = V[ branch[il, T_BUS].astype(int) ] * conj(It)
             if ppopt['OPF_FLOW_LIM'] == 1:   ## active power limit, P (Pan Wei)
                 h = r_[ Sf.real**2 - flow_max,   ## branch P limits (from bus)
                         St.real**2 - flow_max ]  ## branch P limits (to bus)
@@ -131,57 +132,57 @@ def opf_consfcn(x, om, Ybus, Yf, Yt, ppopt, il=None, *args):
         h = zeros((0,1))
 
     ##----- evaluate partials of constraints -----
-    ## index ranges
-    iVa = arange(vv["i1"]["Va"], vv["iN"]["Va"])
-    iVm = arange(vv["i1"]["Vm"], vv["iN"]["Vm"])
-    iPg = arange(vv["i1"]["Pg"], vv["iN"]["Pg"])
-    iQg = arange(vv["i1"]["Qg"], vv["iN"]["Qg"])
-    iVaVmPgQg = r_[iVa, iVm, iPg, iQg].T
-
-    ## compute partials of injected bus powers
-    dSbus_dVm, dSbus_dVa = dSbus_dV(Ybus, V)           ## w.r.t. V
+    if cidx is None:
+        cidx = opf_considx(om, Ybus, Yf, Yt, il)
+    Vnorm = V / abs(V)
+
+    ## partials of injected bus powers w.r.t. V (as in makeJac), and of
     ## Pbus w.r.t. Pg, Qbus w.r.t. Qg
-    neg_Cg = sparse((-ones(ng), (gen[:, GEN_BUS], range(ng))), (nb, ng))
-
-    ## construct Jacobian of equality constraints (power flow) and transpose it
-    dg = lil_matrix((2 * nb, nxyz))
-    blank = sparse((nb, ng))
-    dg[:, iVaVmPgQg] = vstack([
-            ## P mismatch w.r.t Va, Vm, Pg, Qg
-            hstack([dSbus_dVa.real, dSbus_dVm.real, neg_Cg, blank]),
-            ## Q mismatch w.r.t Va, Vm, Pg, Qg
-            hstack([dSbus_dVa.imag, dSbus_dVm.imag, blank, neg_Cg])
-        ], "csr")
-    dg = dg.T
+    ib, jb, kdiag = cidx['ib'], cidx['jb'], cidx['kdiag']
+    y = conj(r_[Ybus.data, zeros(len(ib) - cidx['ny'])])
+    Vi = V[ib]
+    dS_dVm = Vi * y * conj(Vnorm[jb])
+    dS_dVa = -1j * Vi * y * conj(V[jb])
+    dS_dVm[kdiag] += conj(Ibus) * Vnorm
+    dS_dVa[kdiag] += 1j * V * conj(Ibus)
+
+    ## fill Jacobian of equality constraints (power flow), transposed
+    dg = cidx['dg']
+    dg.data[:] = r_[dS_dVa.real, dS_dVm.real, dS_dVa.imag, dS_dVm.imag,
+                    -ones(ng)][cidx['gsrc']]
 
     if nl2 > 0:
-        ## compute partials of Flows w.r.t. V
-        if ppopt['OPF_FLOW_LIM'] == 2:     ## current
-            dFf_dVa, dFf_dVm, dFt_dVa, dFt_dVm, Ff, Ft = \
-                    dIbr_dV(branch[il, :], Yf, Yt, V)
-        else:                  ## power
-            dFf_dVa, dFf_dVm, dFt_dVa, dFt_dVm, Ff, Ft = \
-                    dSbr_dV(branch[il, :], Yf, Yt, V)
-        if ppopt['OPF_FLOW_LIM'] == 1:     ## real part of flow (active power)
-            dFf_dVa = dFf_dVa.real
-            dFf_dVm = dFf_dVm.real
-            dFt_dVa = dFt_dVa.real
-            dFt_dVm = dFt_dVm.real
-            Ff = Ff.real
-            Ft = Ft.real
-
-        ## squared magnitude of flow (of complex power or current, or real power)
-        df_dVa, df_dVm, dt_dVa, dt_dVm = \
-                dAbr_dV(dFf_dVa, dFf_dVm, dFt_dVa, dFt_dVm, Ff, Ft)
-
-        ## construct Jacobian of inequality constraints (branch limits)
-        ## and transpose it.
-        dh = lil_matrix((2 * nl2, nxyz))
-        dh[:, r_[iVa, iVm].T] = vstack([
-                hstack([df_dVa, df_dVm]),    ## "from" flow limit
-                hstack([dt_dVa, dt_dVm])     ## "to" flow limit
-            ], "csr")
-        dh = dh.T
+        ## partials of squared magnitude of flow (of complex power or
+        ## current, or real power) at both ends w.r.t. V
+        f, t = cidx['f'], cidx['t']
+        dA = []
+        for Y, I, l, c, ny, k, b in [
+                (Yf, If, cidx['lf'], cidx['cf'], cidx['nyf'], cidx['kf'], f),
+                (Yt, It, cidx['lt'], cidx['ct'], cidx['nyt'], cidx['kt'], t)]:
+            y = r_[Y.data, zeros(len(l) - ny)]
+            if ppopt['OPF_FLOW_LIM'] == 2:     ## current
+                dF_dVa = 1j * y * V[c]
+                dF_dVm = y * Vnorm[c]
+                F = I
+            else:                  ## power, as in dSbr_dV
+                Vb = V[b]
+                dF_dVa = -1j * Vb[l] * conj(y * V[c])
+                dF_dVm = Vb[l] * conj(y * Vnorm[c])
+                dF_dVa[k] += 1j * conj(I) * Vb
+                dF_dVm[k] += conj(I) * Vnorm[b]
+                F = Vb * conj(I)
+            if ppopt['OPF_FLOW_LIM'] == 1:     ## real part of flow (active power)
+                dF_dVa = dF_dVa.real
+                dF_dVm = dF_dVm.real
+                F = F.real
+
+            ## as in dAbr_dV
+            dA.append(2 * (F.real[l] * dF_dVa.real + F.imag[l] * dF_dVa.imag))
+            dA.append(2 * (F.real[l] * dF_dVm.real + F.imag[l] * dF_dVm.imag))
+
+        ## fill Jacobian of inequality constraints (branch limits), transposed
+        dh = cidx['dh']
+        dh.data[:] = r_[tuple(dA)][cidx['hsrc']]
     else:
         dh = None
 
@@ -0,0 +1,150 @@
+# Copyright (C) 2011 Richard Lincoln
+#
+# PYPOWER is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published
+# by the Free Software Foundation, either version 3 of the License,
+# or (at your option) any later version.
+#
+# PYPOWER is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with PYPOWER. If not, see <http://www.gnu.org/licenses/>.
+
+"""Builds the index map used to fill the OPF constraint gradients in place.
+"""
+
+from numpy import arange, ones, zeros, r_, diff, lexsort, bincount, \
+    cumsum, flatnonzero as find
+from scipy.sparse import csc_matrix, issparse
+
+from pypower.idx_gen import GEN_BUS
+from pypower.idx_brch import F_BUS, T_BUS
+
+
+def opf_considx(om, Ybus, Yf, Yt, il=None):
+    """Builds the index map used to fill the OPF constraint gradients in
+    place.
+
+    The sparsity patterns of the gradients of the power balance
+    constraints C{dg} (C{nx x 2*nb}) and of the branch flow limits C{dh}
+    (C{nx x 2*nl2}) computed by L{opf_consfcn} depend only on those of
+    C{Ybus}, C{Yf} and C{Yt}, on the generator buses and on the variable
+    layout of the OPF model C{om} (see L{opf_model.get_idx}). This
+    function analyses them once and returns a dict that L{opf_consfcn}
+    uses to write the derivatives of C{dSbus_dV} and of the squared branch
+    flows straight into the C{data} arrays of preallocated CSC matrices,
+    without forming C{dSbus_dV} and C{dSbr_dV} or stacking and transposing
+    their blocks.
+
+    The dict contains the following keys:
+        - C{ib}, C{jb}, C{ny}, C{kdiag}  bus row and column of each entry
+          of the pattern of C{Ybus} plus its full diagonal, number of
+          leading entries taken, in order, from C{Ybus.data}, and position
+          of the diagonal element of each bus, as in L{makeJidx}
+        - C{lf}, C{cf}, C{nyf}, C{kf}  the same for C{Yf}, with the
+          element of the "from" bus of each branch in place of the diagonal
+        - C{lt}, C{ct}, C{nyt}, C{kt}  the same for C{Yt} and the "to" bus
+        - C{f}, C{t}  "from" and "to" buses of the constrained branches
+        - C{gsrc}  index into the stacked values
+          C{[Re dS/dVa, Re dS/dVm, Im dS/dVa, Im dS/dVm, -1 (ng)]} of
+          every nonzero of C{dg}, in CSC order
+        - C{hsrc}  index into the stacked values C{[dAf/dVa, dAf/dVm,
+          dAt/dVa, dAt/dVm]} of every nonzero of C{dh}, in CSC order
+        - C{dg}, C{dh}  the preallocated gradients (C{dh} is C{None} if no
+          branch is constrained)
+
+    C{Yf} and C{Yt} contain only the rows of the branches C{il} (all
+    branches by default). C{Ybus}, C{Yf} and C{Yt} are put in canonical
+    format in place, and may then change in value but not in pattern.
+
+    @see: L{opf_consfcn}, L{makeJidx}
+    """
+    ppc = om.get_ppc()
+    gen, branch = ppc['gen'], ppc['branch']
+    vv, _, _, _ = om.get_idx()
+
+    nb = Ybus.shape[0]
+    ng = gen.shape[0]
+    nxyz = om.getN('var')
+    if il is None:
+        il = arange(branch.shape[0])
+    nl2 = len(il)
+
+    iVa = arange(vv['i1']['Va'], vv['iN']['Va'])
+    iVm = arange(vv['i1']['Vm'], vv['iN']['Vm'])
+    iPg = arange(vv['i1']['Pg'], vv['iN']['Pg'])
+    iQg = arange(vv['i1']['Qg'], vv['iN']['Qg'])
+
+    ## power balance: P and Q mismatch of bus ib w.r.t. Va and Vm of bus jb,
+    ## and of the bus of each generator w.r.t. its Pg and Qg
+    ib, jb, ny, kdiag = _pattern(Ybus, arange(nb))
+    nnz = len(ib)
+    gbus = gen[:, GEN_BUS].astype(int)
+    kg = 4 * nnz + arange(ng)
+    rows = r_[ib, ib, nb + ib, nb + ib, gbus, nb + gbus]
+    cols = r_[iVa[jb], iVm[jb], iVa[jb], iVm[jb], iPg, iQg]
+    src = r_[arange(4 * nnz), kg, kg]
+    gsrc, dg = _csc(rows, cols, src, (nxyz, 2 * nb))
+
+    idx = {'ib': ib, 'jb': jb, 'ny': ny, 'kdiag': kdiag,
+           'gsrc': gsrc, 'dg': dg, 'hsrc': None, 'dh': None}
+
+    ## branch flow limits: squared flow at the "from" (row lf) and "to"
+    ## (row lt) end w.r.t. Va and Vm of bus cf (ct)
+    f = branch[il, F_BUS].astype(int)
+    t = branch[il, T_BUS].astype(int)
+    lf, cf, nyf, kf = _pattern(Yf, f)
+    lt, ct, nyt, kt = _pattern(Yt, t)
+    idx.update({'lf': lf, 'cf': cf, 'nyf': nyf, 'kf': kf,
+                'lt': lt, 'ct': ct, 'nyt': nyt, 'kt': kt, 'f': f, 't': t})
+    if nl2 > 0:
+        nf, nt = len(lf), len(lt)
+        rows = r_[lf, lf, nl2 + lt, nl2 + lt]
+        cols = r_[iVa[cf], iVm[cf], iVa[ct], iVm[ct]]
+        src = arange(2 * (nf + nt))
+        idx['hsrc'], idx['dh'] = _csc(rows, cols, src, (nxyz, 2 * nl2))
+
+    return idx
+
+
+def _pattern(Y, col):
+    """Returns the row and column of each nonzero of C{Y}, in the order of
+    its data, followed by any structurally missing elements
+    C{(i, col[i])}, the number of nonzeros of C{Y} and the position of the
+    element C{(i, col[i])} of each row C{i}.
+    """
+    if not issparse(Y) or Y.format not in ('csr', 'csc'):
+        raise ValueError('opf_considx: admittance matrices must be CSR '
+                         'or CSC matrices')
+    Y.sum_duplicates()
+    Y.sort_indices()
+
+    n = Y.shape[0]
+    i = arange(Y.shape[0 if Y.format == 'csr' else 1]).repeat(diff(Y.indptr))
+    j = Y.indices.astype(int)
+    if Y.format == 'csc':
+        i, j = j, i
+
+    k = -ones(n, int)
+    d = find(j == col[i])
+    k[i[d]] = d
+    missing = find(k < 0)
+    k[missing] = Y.nnz + arange(len(missing))
+
+    return r_[i, missing], r_[j, col[missing]], Y.nnz, k
+
+
+def _csc(rows, cols, src, shape):
+    """Returns the sources of the values of the entries C{(cols, rows)} of
+    a matrix in CSC order and the matrix, with zero values.
+    """
+    order = lexsort((cols, rows))
+    rows, cols, src = rows[order], cols[order], src[order]
+    indptr = r_[0, cumsum(bincount(rows, minlength=max(shape[1], 1))
+                          [:shape[1]])]
+    A = csc_matrix((zeros(len(src)), cols, indptr), shape)
+    A.has_sorted_indices = True
+    return src, A
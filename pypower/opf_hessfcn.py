@@ -17,24 +17,19 @@
 """Evaluates Hessian of Lagrangian for AC OPF.
 """
 
-from numpy import array, zeros, ones, exp, arange, r_, flatnonzero as find
-from scipy.sparse import vstack, hstack, issparse, csr_matrix as sparse
+from numpy import array, zeros, ones, conj, exp, arange, r_, add, bincount, \
+    searchsorted, flatnonzero as find
+from scipy.sparse import csr_matrix as sparse
 
 from idx_gen import PG, QG
-from idx_brch import F_BUS, T_BUS
 from idx_cost import MODEL, POLYNOMIAL
 
 from polycost import polycost
-from d2Sbus_dV2 import d2Sbus_dV2
-from dSbr_dV import dSbr_dV
-from dIbr_dV import dIbr_dV
-from d2AIbr_dV2 import d2AIbr_dV2
-from d2ASbr_dV2 import d2ASbr_dV2
-from opf_costfcn import opf_costfcn
-from opf_consfcn import opf_consfcn
+from opf_hessidx import opf_hessidx
 
 
-def opf_hessfcn(x, lmbda, om, Ybus, Yf, Yt, ppopt, il=None, cost_mult=1.0):
+def opf_hessfcn(x, lmbda, om, Ybus, Yf, Yt, ppopt, il=None, cost_mult=1.0,
+                hidx=None):
     """Evaluates Hessian of Lagrangian for AC OPF.
 
     Hessian evaluation function for AC optimal power flow, suitable
@@ -44,6 +39,15 @@ def opf_hessfcn(x, lmbda, om, Ybus, Yf, Yt, ppopt, il=None, cost_mult=1.0):
         Lxx = opf_hessfcn(x, lmbda, om, Ybus, Yf, Yt, ppopt)
         Lxx = opf_hessfcn(x, lmbda, om, Ybus, Yf, Yt, ppopt, il)
         Lxx = opf_hessfcn(x, lmbda, om, Ybus, Yf, Yt, ppopt, il, cost_mult)
+        Lxx = opf_hessfcn(x, lmbda, om, Ybus, Yf, Yt, ppopt, il, cost_mult,
+                          hidx)
+
+    The second derivatives of the costs and of the power balance and
+    branch flow constraints are evaluated term by term on the fixed
+    pattern of the Hessian listed by L{opf_hessidx}, and summed into the
+    C{data} array of its preallocated lower triangle C{hidx['L']}, from
+    which that of the returned symmetric matrix C{hidx['H']} is copied.
+    Both are overwritten by the next call with the same C{hidx}.
 
     @param x: optimization vector
     @param lmbda: C{eqnonlin} - Lagrange multipliers on power balance
@@ -60,10 +64,12 @@ def opf_hessfcn(x, lmbda, om, Ybus, Yf, Yt, ppopt, il=None, cost_mult=1.0):
     only the rows corresponding to C{il}.
     @param cost_mult: (optional) Scale factor to be applied to the cost
     (default = 1).
+    @param hidx: (optional) index map of the Hessian built by
+    L{opf_hessidx}, built on each call if not given.
 
     @return: Hessian of the Lagrangian.
 
-    @see: L{opf_costfcn}, L{opf_consfcn}
+    @see: L{opf_costfcn}, L{opf_consfcn}, L{opf_hessidx}
 
     @author: Ray Zimmerman (PSERC Cornell)
     @author: Carlos E. Murillo-Sanchez (PSERC Cornell & Universidad
@@ -90,6 +96,8 @@ def opf_hessfcn(x, lmbda, om, Ybus, Yf, Yt, ppopt, il=None, cost_mult=1.0):
     if il is None:
         il = arange(nl)            ## all lines have limits by default
     nl2 = len(il)           ## number of constrained lines
+    if hidx is None:
+        hidx = opf_hessidx(om, Ybus, Yf, Yt, il)
 
     ## grab Pg & Qg
     Pg = x[vv["i1"]["Pg"]:vv["iN"]["Pg"]]  ## active generation in p.u.
@@ -103,7 +111,6 @@ def opf_hessfcn(x, lmbda, om, Ybus, Yf, Yt, ppopt, il=None, cost_mult=1.0):
     Va = x[vv["i1"]["Va"]:vv["iN"]["Va"]]
     Vm = x[vv["i1"]["Vm"]:vv["iN"]["Vm"]]
     V = Vm * exp(1j * Va)
-    nxtra = nxyz - 2 * nb
     pcost = gencost[arange(ng), :]
     if gencost.shape[0] > ng:
         qcost = gencost[arange(ng, 2 * ng), :]
@@ -120,14 +127,11 @@ def opf_hessfcn(x, lmbda, om, Ybus, Yf, Yt, ppopt, il=None, cost_mult=1.0):
         ipolq = find(qcost[:, MODEL] == POLYNOMIAL)
         d2f_dQg2[ipolq] = \
                 baseMVA**2 * polycost(qcost[ipolq, :], Qg[ipolq] * baseMVA, 2)
-    i = r_[arange(vv["i1"]["Pg"], vv["iN"]["Pg"]),
-           arange(vv["i1"]["Qg"], vv["iN"]["Qg"])]
-#    d2f = sparse((vstack([d2f_dPg2, d2f_dQg2]).toarray().flatten(),
-#                  (i, i)), shape=(nxyz, nxyz))
-    d2f = sparse((r_[d2f_dPg2, d2f_dQg2], (i, i)), (nxyz, nxyz))
 
     ## generalized cost
-    if issparse(N) and N.nnz > 0:
+    gkey = hidx['gkey']
+    d2fN = zeros(len(gkey))
+    if len(gkey):
         nw = N.shape[0]
         r = N * x - rh                    ## Nx - rhat
         iLT = find(r < -kk)               ## below dead zone
@@ -149,101 +153,90 @@ def opf_hessfcn(x, lmbda, om, Ybus, Yf, Yt, ppopt, il=None, cost_mult=1.0):
         HwC = H * w + Cw
         AA = N.T * M * (LL + 2 * QQ * diagrr)
 
-        d2f = d2f + AA * H * AA.T + 2 * N.T * M * QQ * \
-                sparse((HwC, (arange(nw), arange(nw))), (nw, nw)) * N
-    d2f = d2f * cost_mult
+        G = (AA * H * AA.T + 2 * N.T * M * QQ * \
+                sparse((HwC, (arange(nw), arange(nw))), (nw, nw)) * N).tocoo()
+        add.at(d2fN, searchsorted(gkey, G.row * nxyz + G.col), G.data)
 
     ##----- evaluate Hessian of power balance constraints -----
+    ## as in d2Sbus_dV2, for the multipliers lamP - j lamQ (the real part
+    ## of which is the sum of the real and imaginary parts of the Hessians
+    ## for lamP and lamQ), on the index map of the Hessian
     nlam = len(lmbda["eqnonlin"]) / 2
     lamP = lmbda["eqnonlin"][:nlam]
     lamQ = lmbda["eqnonlin"][nlam:nlam + nlam]
-    Gpaa, Gpav, Gpva, Gpvv = d2Sbus_dV2(Ybus, V, lamP)
-    Gqaa, Gqav, Gqva, Gqvv = d2Sbus_dV2(Ybus, V, lamQ)
-
-    d2G = vstack([
-            hstack([
-                vstack([hstack([Gpaa, Gpav]),
-                        hstack([Gpva, Gpvv])]).real +
-                vstack([hstack([Gqaa, Gqav]),
-                        hstack([Gqva, Gqvv])]).imag,
-                sparse((2 * nb, nxtra))]),
-            hstack([
-                sparse((nxtra, 2 * nb)),
-                sparse((nxtra, nxtra))
-            ])
-        ], "csr")
+    lam = lamP - 1j * lamQ
+    ib, jb, kT, kdiag = hidx['ib'], hidx['jb'], hidx['kT'], hidx['kdiag']
+    y = r_[Ybus.data, zeros(len(ib) - hidx['ny'])]
+    Vm = abs(V)
+    Ibus = Ybus * V
+    C = (lam * V)[ib] * conj(y * V[jb])
+    E = conj(V[ib] * y[kT]) * (lam * V)[jb]
+    E[kdiag] -= conj(V) * conj(Ybus.T * conj(lam * V))
+    F = C.copy()
+    F[kdiag] -= lam * V * conj(Ibus)
+    Gva = 1j * (E - F) / Vm[ib]
+    d2 = [E + F, Gva[kT], Gva, (C + C[kT]) / (Vm[ib] * Vm[jb])]
 
     ##----- evaluate Hessian of flow constraints -----
+    ## as in d2ASbr_dV2 (or d2AIbr_dV2), on the index map of the Hessian
     nmu = len(lmbda["ineqnonlin"]) / 2
     muF = lmbda["ineqnonlin"][:nmu]
     muT = lmbda["ineqnonlin"][nmu:nmu + nmu]
-    if ppopt['OPF_FLOW_LIM'] == 2:       ## current
-        dIf_dVa, dIf_dVm, dIt_dVa, dIt_dVm, If, It = dIbr_dV(Yf, Yt, V)
-        Hfaa, Hfav, Hfva, Hfvv = d2AIbr_dV2(dIf_dVa, dIf_dVm, If, Yf, V, muF)
-        Htaa, Htav, Htva, Htvv = d2AIbr_dV2(dIt_dVa, dIt_dVm, It, Yt, V, muT)
-    else:
-        f = branch[il, F_BUS].astype(int)    ## list of "from" buses
-        t = branch[il, T_BUS].astype(int)    ## list of "to" buses
-        ## connection matrix for line & from buses
-        Cf = sparse((ones(nl2), (arange(nl2), f)), (nl2, nb))
-        ## connection matrix for line & to buses
-        Ct = sparse((ones(nl2), (arange(nl2), t)), (nl2, nb))
-        dSf_dVa, dSf_dVm, dSt_dVa, dSt_dVm, Sf, St = \
-                dSbr_dV(branch[il,:], Yf, Yt, V)
-        if ppopt['OPF_FLOW_LIM'] == 1:     ## real power
-            Hfaa, Hfav, Hfva, Hfvv = d2ASbr_dV2(dSf_dVa.real, dSf_dVm.real,
-                                                Sf.real, Cf, Yf, V, muF)
-            Htaa, Htav, Htva, Htvv = d2ASbr_dV2(dSt_dVa.real, dSt_dVm.real,
-                                                St.real, Ct, Yt, V, muT)
-        else:                  ## apparent power
-            Hfaa, Hfav, Hfva, Hfvv = \
-                    d2ASbr_dV2(dSf_dVa, dSf_dVm, Sf, Cf, Yf, V, muF)
-            Htaa, Htav, Htva, Htvv = \
-                    d2ASbr_dV2(dSt_dVa, dSt_dVm, St, Ct, Yt, V, muT)
-
-    d2H = vstack([
-            hstack([
-                vstack([hstack([Hfaa, Hfav]),
-                        hstack([Hfva, Hfvv])]) +
-                vstack([hstack([Htaa, Htav]),
-                        hstack([Htva, Htvv])]),
-                sparse((2 * nb, nxtra))
-            ]),
-            hstack([
-                sparse((nxtra, 2 * nb)),
-                sparse((nxtra, nxtra))
-            ])
-        ], "csr")
-
-    ##-----  do numerical check using (central) finite differences  -----
-    if 0:
-        nx = len(x)
-        step = 1e-5
-        num_d2f = sparse((nx, nx))
-        num_d2G = sparse((nx, nx))
-        num_d2H = sparse((nx, nx))
-        for i in range(nx):
-            xp = x
-            xm = x
-            xp[i] = x[i] + step / 2
-            xm[i] = x[i] - step / 2
-            # evaluate cost & gradients
-            _, dfp = opf_costfcn(xp, om)
-            _, dfm = opf_costfcn(xm, om)
-            # evaluate constraints & gradients
-            _, _, dHp, dGp = opf_consfcn(xp, om, Ybus, Yf, Yt, ppopt, il)
-            _, _, dHm, dGm = opf_consfcn(xm, om, Ybus, Yf, Yt, ppopt, il)
-            num_d2f[:, i] = cost_mult * (dfp - dfm) / step
-            num_d2G[:, i] = (dGp - dGm) * lmbda["eqnonlin"]   / step
-            num_d2H[:, i] = (dHp - dHm) * lmbda["ineqnonlin"] / step
-        d2f_err = max(max(abs(d2f - num_d2f)))
-        d2G_err = max(max(abs(d2G - num_d2G)))
-        d2H_err = max(max(abs(d2H - num_d2H)))
-        if d2f_err > 1e-6:
-            print 'Max difference in d2f: %g' % d2f_err
-        if d2G_err > 1e-5:
-            print 'Max difference in d2G: %g' % d2G_err
-        if d2H_err > 1e-6:
-            print 'Max difference in d2H: %g' % d2H_err
-
-    return d2f + d2G + d2H
+    Vnorm = V / Vm
+    if nl2 > 0:
+        for Y, mu, l, c, ny, k, b, ka, kb in [
+                (Yf, muF, hidx['lf'], hidx['cf'], hidx['nyf'], hidx['kf'],
+                 hidx['f'], hidx['af'], hidx['bf']),
+                (Yt, muT, hidx['lt'], hidx['ct'], hidx['nyt'], hidx['kt'],
+                 hidx['t'], hidx['at'], hidx['bt'])]:
+            y = r_[Y.data, zeros(len(l) - ny)]
+            I = Y * V
+            bl = b[l]
+            if ppopt['OPF_FLOW_LIM'] == 2:     ## current
+                dF_dVa = 1j * y * V[c]
+                dF_dVm = y * Vnorm[c]
+
+                ## d2Ibr_dV2 for conj(I) * mu, on the diagonal only
+                q = -y * (conj(I) * mu)[l] * V[c]
+                qv = -1j * q / Vm[c]
+                z = zeros(len(l))
+                d2 += [z, z, q, z, z, z, qv, z, z, z, qv, z, z, z]
+            else:                  ## power, as in dSbr_dV
+                Vb = V[b]
+                dF_dVa = -1j * Vb[l] * conj(y * V[c])
+                dF_dVm = Vb[l] * conj(y * Vnorm[c])
+                dF_dVa[k] += 1j * conj(I) * Vb
+                dF_dVm[k] += conj(I) * Vnorm[b]
+                F = Vb * conj(I)
+                if ppopt['OPF_FLOW_LIM'] == 1: ## real part of flow (active power)
+                    dF_dVa = dF_dVa.real
+                    dF_dVm = dF_dVm.real
+                    F = F.real
+
+                ## d2Sbr_dV2 for conj(F) * mu, B = conj(diagV) * A * diagV
+                ## has an element B(c, b) for each element (l, c) of Ybr
+                B = conj(V[c] * y) * (conj(F) * mu)[l] * V[bl]
+                Bc = 1j * B / Vm[c]
+                Bb = 1j * B / Vm[bl]
+                Bv = B / (Vm[c] * Vm[bl])
+                d2 += [B, B, -B, -B, Bc, -Bb, -Bc, Bb,
+                       Bc, -Bb, -Bc, Bb, Bv, Bv]
+
+            ## dF_dV.T * diag(mu) * conj(dF_dV), for each pair of elements
+            ## in the same row
+            mua = mu[l[ka]]
+            Fa = mua * dF_dVa[ka]
+            Fv = mua * dF_dVm[ka]
+            Ga = conj(dF_dVa[kb])
+            Gv = conj(dF_dVm[kb])
+            d2 += [Fa * Ga, Fa * Gv, Fv * Ga, Fv * Gv]
+        d2[4:] = [2 * v for v in d2[4:]]
+
+    ##----- fill lower triangle and symmetric Hessian -----
+    vals = r_[r_[tuple(d2)].real,
+              cost_mult * r_[d2f_dPg2, d2f_dQg2, d2fN]]
+    L, Lxx = hidx['L'], hidx['H']
+    L.data[:] = bincount(hidx['dst'], vals[hidx['keep']], L.nnz)
+    Lxx.data[:] = L.data[hidx['hsrc']]
+
+    return Lxx
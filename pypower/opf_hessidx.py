@@ -0,0 +1,167 @@
+# Copyright (C) 2011 Richard Lincoln
+#
+# PYPOWER is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published
+# by the Free Software Foundation, either version 3 of the License,
+# or (at your option) any later version.
+#
+# PYPOWER is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with PYPOWER. If not, see <http://www.gnu.org/licenses/>.
+
+
+"""Builds the index map used to fill the OPF Hessian of the Lagrangian in
+place.
+"""
+
+from numpy import arange, zeros, r_, argsort, bincount, cumsum, \
+    unique, searchsorted, repeat, minimum, flatnonzero as find
+from scipy.sparse import csc_matrix, csr_matrix, issparse, eye
+
+from pypower.opf_considx import opf_considx
+
+
+def opf_hessidx(om, Ybus, Yf, Yt, il=None, cidx=None):
+    """Builds the index map used to fill the OPF Hessian of the Lagrangian
+    in place.
+
+    The sparsity pattern of the Hessian of the Lagrangian computed by
+    L{opf_hessfcn} depends only on those of C{Ybus}, C{Yf} and C{Yt}, on
+    the cost parameters and on the variable layout of the OPF model C{om}.
+    This function lists, once, the row and column of every term of the
+    second derivatives of the power balance constraints (as in
+    L{d2Sbus_dV2}), of the squared branch flows (as in L{d2ASbr_dV2} and
+    L{d2AIbr_dV2}, for any C{OPF_FLOW_LIM}) and of the costs, keeps those
+    in the lower triangle and returns a dict that L{opf_hessfcn} uses to
+    sum their values straight into the C{data} array of a preallocated
+    lower triangular matrix, without forming and stacking the blocks of the
+    second derivatives.
+
+    The dict contains, in addition to the keys of the index map C{cidx} of
+    the constraint gradients (see L{opf_considx}, built if not given):
+        - C{kT}  position, in the power balance pattern C{(ib, jb)}
+          (extended by any structurally missing transposed element), of
+          the transpose of each element
+        - C{af}, C{bf}, C{at}, C{bt}  positions, in the layouts
+          C{(lf, cf)} and C{(lt, ct)} of the flow gradients, of every pair
+          of entries in the same branch row
+        - C{gkey}  sorted keys C{row * nx + col} of the pattern of the
+          Hessian of the generalized cost (empty if there is none)
+        - C{keep}, C{dst}  indices of the terms in the lower triangle, in
+          the order they are computed by L{opf_hessfcn}, and their
+          positions in C{L.data}
+        - C{L}  the preallocated lower triangle (CSC)
+        - C{hsrc}, C{H}  position in C{L.data} of every nonzero of the full
+          symmetric Hessian C{H} (CSR), which L{opf_hessfcn} returns
+
+    @see: L{opf_hessfcn}, L{opf_considx}
+    """
+    if cidx is None:
+        cidx = opf_considx(om, Ybus, Yf, Yt, il)
+    idx = dict(cidx)
+
+    vv, _, _, _ = om.get_idx()
+    nb = Ybus.shape[0]
+    nxyz = om.getN('var')
+    nl2 = Yf.shape[0]
+
+    iVa = arange(vv['i1']['Va'], vv['iN']['Va'])
+    iVm = arange(vv['i1']['Vm'], vv['iN']['Vm'])
+    iPg = arange(vv['i1']['Pg'], vv['iN']['Pg'])
+    iQg = arange(vv['i1']['Qg'], vv['iN']['Qg'])
+
+    ## power balance: Gaa, Gav, Gva and Gvv on the pattern of Ybus, its
+    ## diagonal and its transpose
+    ib, jb = cidx['ib'], cidx['jb']
+    key = ib * nb + jb
+    keyT = jb * nb + ib
+    k = argsort(key)
+    p = minimum(searchsorted(key[k], keyT), len(k) - 1)
+    missing = unique(keyT[key[k[p]] != keyT])
+    ib = r_[ib, missing // nb]
+    jb = r_[jb, missing % nb]
+    key = ib * nb + jb
+    k = argsort(key)
+    kT = k[searchsorted(key[k], jb * nb + ib)]
+    idx.update({'ib': ib, 'jb': jb, 'kT': kT})
+
+    rows = [iVa[ib], iVa[ib], iVm[ib], iVm[ib]]
+    cols = [iVa[jb], iVm[jb], iVa[jb], iVm[jb]]
+
+    ## branch flows, at the "from" and then the "to" end
+    for end, l, c, b in [('f', cidx['lf'], cidx['cf'], cidx['f']),
+                         ('t', cidx['lt'], cidx['ct'], cidx['t'])]:
+        if nl2 == 0:
+            idx['a' + end], idx['b' + end] = zeros(0, int), zeros(0, int)
+            continue
+        bl = b[l]
+
+        ## second derivatives of the flows themselves, Haa, Hva, Hav, Hvv
+        rows += [iVa[c], iVa[bl], iVa[c], iVa[bl],
+                 iVm[c], iVm[bl], iVm[c], iVm[bl],
+                 iVa[bl], iVa[c], iVa[c], iVa[bl],
+                 iVm[c], iVm[bl]]
+        cols += [iVa[bl], iVa[c], iVa[c], iVa[bl],
+                 iVa[bl], iVa[c], iVa[c], iVa[bl],
+                 iVm[c], iVm[bl], iVm[c], iVm[bl],
+                 iVm[bl], iVm[c]]
+
+        ## products of the first derivatives, for every pair of entries
+        ## of the same branch row
+        s = argsort(l, kind='mergesort')
+        cnt = bincount(l, minlength=nl2)
+        nk = cnt[l[s]]
+        i = repeat(arange(len(s)), nk)
+        j = repeat(cumsum(cnt) - cnt, cnt)[i] + arange(len(i)) - \
+            repeat(cumsum(nk) - nk, nk)
+        ka, kb = s[i], s[j]
+        idx['a' + end], idx['b' + end] = ka, kb
+        rows += [iVa[c[ka]], iVa[c[ka]], iVm[c[ka]], iVm[c[ka]]]
+        cols += [iVa[c[kb]], iVm[c[kb]], iVa[c[kb]], iVm[c[kb]]]
+
+    ## polynomial costs
+    rows += [iPg, iQg]
+    cols += [iPg, iQg]
+
+    ## generalized cost, on the pattern of N' * (H + I) * N
+    cp = om.get_cost_params()
+    N, H = cp['N'], cp['H']
+    idx['gkey'] = zeros(0, int)
+    if issparse(N) and N.nnz > 0:
+        N1 = csr_matrix(N, copy=True)
+        N1.data[:] = 1
+        nw = N.shape[0]
+        H1 = abs(csr_matrix(H)) + eye(nw, nw, format='csr')
+        G = (N1.T * H1 * N1).tocoo()
+        idx['gkey'] = unique(G.row * nxyz + G.col)
+        rows.append(idx['gkey'] // nxyz)
+        cols.append(idx['gkey'] % nxyz)
+
+    ## lower triangle, in CSC order
+    rows, cols = r_[tuple(rows)], r_[tuple(cols)]
+    keep = find(rows >= cols)
+    k, dst = unique(cols[keep] * nxyz + rows[keep], return_inverse=True)
+    indptr = r_[0, cumsum(bincount(k // nxyz, minlength=max(nxyz, 1))
+                          [:nxyz])]
+    L = csc_matrix((zeros(len(k)), k % nxyz, indptr), (nxyz, nxyz))
+    L.has_sorted_indices = True
+
+    ## full symmetric matrix, in CSR order
+    r, c = k % nxyz, k // nxyz
+    off = find(r != c)
+    src = r_[arange(len(k)), off]
+    key = r_[r * nxyz + c, c[off] * nxyz + r[off]]
+    order = argsort(key)
+    key, src = key[order], src[order]
+    indptr = r_[0, cumsum(bincount(key // nxyz, minlength=max(nxyz, 1))
+                          [:nxyz])]
+    H = csr_matrix((zeros(len(key)), key % nxyz, indptr), (nxyz, nxyz))
+    H.has_sorted_indices = True
+
+    idx.update({'keep': keep, 'dst': dst, 'L': L, 'hsrc': src, 'H': H})
+
+    return idx
@@ -17,14 +17,17 @@
 """Python Interior Point Solver (PIPS).
 """
 
+from time import time
+
 from numpy import array, Inf, any, isnan, ones, r_, finfo, \
-    zeros, dot, absolute, log, flatnonzero as find
+    zeros, dot, absolute, log, bincount, flatnonzero as find
 
 from numpy.linalg import norm
 
-from scipy.sparse import vstack, hstack, eye, csr_matrix as sparse
-from scipy.sparse.linalg import spsolve
+from scipy.sparse import hstack, csr_matrix
 
+from pypower.pips_kkt import pips_kkt
+from pypower.pips_linsolver import pips_linsolver
 from pypower.pipsver import pipsver
 
 
@@ -152,6 +155,16 @@ def pips(f_fcn, x0=None, A=None, l=None, u=None, xmin=None, xmax=None,
                     value is also passed as the 3rd argument to the Hessian
                     evaluation function so that it can appropriately scale the
                     objective function term in the Hessian of the Lagrangian.
+                  - C{linsolver} ('') - linear solver for the Newton step,
+                    'SUPERLU', 'UMFPACK', 'MINRES', 'GMRES' or '' for the
+                    default direct solver (see L{pips_linsolver})
+                  - C{linsolver_ordering} ('COLAMD') - column ordering used
+                    by SuperLU and the GMRES preconditioner
+                  - C{linsolver_tol} (1e-10) - relative residual tolerance
+                    of the iterative linear solvers
+                  - C{linsolver_max_it} (100) - maximum number of
+                    iterations (restart cycles for GMRES) of the iterative
+                    linear solvers
     @type opt: dict
 
     @rtype: dict
@@ -168,6 +181,18 @@ def pips(f_fcn, x0=None, A=None, l=None, u=None, xmin=None, xmax=None,
                      following: feascond, gradcond, compcond, costcond, gamma,
                      stepsize, obj, alphap, alphad
                    - C{message} - exit message
+                   - C{et} - total elapsed time in seconds
+                   - C{et_fcn}, C{et_hess}, C{et_kkt}, C{et_factor},
+                     C{et_solve} - time spent evaluating the objective
+                     and constraint functions, evaluating the Hessian,
+                     assembling the KKT system, factoring it and solving
+                     for the Newton step
+                   - C{nanalyse} - number of analyses of the KKT
+                     matrix pattern (see L{pips_kkt})
+                   - C{linsolver} - name of the linear solver in use at
+                     the end
+                   - C{nfallback} - number of fallbacks to another linear
+                     solver
                - C{lmbda} - dictionary containing the Langrange and Kuhn-Tucker
                  multipliers on the constraints, with keys:
                    - C{eqnonlin} - nonlinear equality constraints
@@ -177,6 +202,16 @@ def pips(f_fcn, x0=None, A=None, l=None, u=None, xmin=None, xmax=None,
                    - C{lower} - lower bound on optimization variables
                    - C{upper} - upper bound on optimization variables
 
+    The pattern of the KKT matrix of the Newton step is computed once by a
+    L{pips_kkt} object, which then fills its values in place at each
+    iteration, and its factorization reuses the ordering (or symbolic
+    analysis) of the first one (see L{lufactor}). Finite limits on
+    M{x} are handled as simple bounds rather than as rows of the linear
+    constraints, their barrier terms being added to the diagonal of the
+    Hessian block of the KKT matrix. The linear solver used
+    for the Newton step, and the solvers it falls back to if it fails, are
+    set by the C{linsolver} options (see L{pips_linsolver}).
+
     @see: U{http://www.pserc.cornell.edu/matpower/}
     @license: GNU GPL version 3
 
@@ -231,6 +266,14 @@ def pips(f_fcn, x0=None, A=None, l=None, u=None, xmin=None, xmax=None,
         opt["cost_mult"] = 1
     if "verbose" not in opt:
         opt["verbose"] = 0
+    if "linsolver" not in opt:
+        opt["linsolver"] = ''
+    if "linsolver_ordering" not in opt:
+        opt["linsolver_ordering"] = 'COLAMD'
+    if "linsolver_tol" not in opt:
+        opt["linsolver_tol"] = 1e-10
+    if "linsolver_max_it" not in opt:
+        opt["linsolver_max_it"] = 100
 
     # initialize history
     hist = []
@@ -248,10 +291,12 @@ def pips(f_fcn, x0=None, A=None, l=None, u=None, xmin=None, xmax=None,
     i = 0                       # iteration counter
     converged = False           # flag
     eflag = False               # exit flag
+    t0 = time()
+    et = {'et_fcn': 0.0, 'et_hess': 0.0, 'et_kkt': 0.0, 'et_factor': 0.0,
+          'et_solve': 0.0}
 
-    # add var limits to linear constraints
-    eyex = eye(nx, nx, format="csr")
-    AA = eyex if A is None else vstack([eyex, A], "csr")
+    # var limits and linear constraints are the rows of [I; A], which is
+    # not formed
     ll = r_[xmin, l]
     uu = r_[xmax, u]
 
@@ -260,24 +305,45 @@ def pips(f_fcn, x0=None, A=None, l=None, u=None, xmin=None, xmax=None,
     igt = find( (uu >=  1e10) & (ll > -1e10) )
     ilt = find( (ll <= -1e10) & (uu <  1e10) )
     ibx = find( (absolute(uu - ll) > EPS) & (uu < 1e10) & (ll > -1e10) )
-    # zero-sized sparse matrices unsupported
-    Ae = AA[ieq, :] if len(ieq) else None
-    if len(ilt) or len(igt) or len(ibx):
-        idxs = [(1, ilt), (-1, igt), (1, ibx), (-1, ibx)]
-        Ai = vstack([sig * AA[idx, :] for sig, idx in idxs if len(idx)], 'csr')
-    else:
-        Ai = None
-    be = uu[ieq, :]
-    bi = r_[uu[ilt], -ll[igt], uu[ibx], -ll[ibx]]
+    Ae = _rows(A, ieq, ones(len(ieq)), nx)
+    be = uu[ieq]
+
+    # linear inequalities on rows of A form Ai, those on var limits are
+    # kept as simple bounds sx * x[jx] <= bx, placed after them in h, whose
+    # gradients are never formed and whose barrier terms are diagonal
+    irow = r_[ilt, igt, ibx, ibx]
+    isig = r_[ones(len(ilt)), -ones(len(igt)), ones(len(ibx)), -ones(len(ibx))]
+    irhs = r_[uu[ilt], -ll[igt], uu[ibx], -ll[ibx]]
+    ka = find(irow >= nx)
+    kb = find(irow < nx)
+    Ai = _rows(A, irow[ka], isig[ka], nx)
+    bi = irhs[ka]
+    jx, sx, bx = irow[kb], isig[kb], irhs[kb]
+    nxb = len(kb)              # number of simple bounds
+    ilin = r_[ka, kb]          # order of linear inequalities in h
+
+    def hlin(x):
+        # linear inequality constraints
+        return r_[-bi if Ai is None else Ai * x - bi, sx * x[jx] - bx]
+
+    def dh_mul(dh, v):
+        # product of the gradients of all inequalities with v
+        y = bincount(jx, sx * v[len(v) - nxb:], nx)
+        return y if dh is None else y + dh * v[:len(v) - nxb]
+
+    def dh_tmul(dh, dx):
+        # product of the transposed gradients of all inequalities with dx
+        return r_[zeros(0) if dh is None else dh.T * dx, sx * dx[jx]]
 
     # evaluate cost f(x0) and constraints g(x0), h(x0)
+    t1 = time()
     x = x0
     f, df = f_fcn(x)                 # cost
     f = f * opt["cost_mult"]
     df = df * opt["cost_mult"]
     if nonlinear:
         hn, gn, dhn, dgn = gh_fcn(x)        # nonlinear constraints
-        h = hn if Ai is None else r_[hn, Ai * x - bi] # inequality constraints
+        h = r_[hn, hlin(x)]                 # inequality constraints
         g = gn if Ae is None else r_[gn, Ae * x - be] # equality constraints
 
         if (dhn is None) and (Ai is None):
@@ -285,9 +351,9 @@ def pips(f_fcn, x0=None, A=None, l=None, u=None, xmin=None, xmax=None,
         elif dhn is None:
             dh = Ai.T
         elif Ai is None:
-            dh = dhn
+            dh = dhn.tocsc()
         else:
-            dh = hstack([dhn, Ai.T])
+            dh = hstack([dhn, Ai.T], "csc")
 
         if (dgn is None) and (Ae is None):
             dg = None
@@ -298,10 +364,11 @@ def pips(f_fcn, x0=None, A=None, l=None, u=None, xmin=None, xmax=None,
         else:
             dg = hstack([dgn, Ae.T])
     else:
-        h = -bi if Ai is None else Ai * x - bi        # inequality constraints
+        h = hlin(x)                                   # inequality constraints
         g = -be if Ae is None else Ae * x - be        # equality constraints
         dh = None if Ai is None else Ai.T     # 1st derivative of inequalities
         dg = None if Ae is None else Ae.T     # 1st derivative of equalities
+    et['et_fcn'] += time() - t1
 
     # some dimensions
     neq = g.shape[0]           # number of equality constraints
@@ -330,7 +397,7 @@ def pips(f_fcn, x0=None, A=None, l=None, u=None, xmin=None, xmax=None,
 
     Lx = df.copy()
     Lx = Lx + dg * lam if dg is not None else Lx
-    Lx = Lx + dh * mu  if dh is not None else Lx
+    Lx = Lx + dh_mul(dh, mu)
 
     maxh = zeros(1) if len(h) == 0 else max(h)
 
@@ -370,12 +437,19 @@ def pips(f_fcn, x0=None, A=None, l=None, u=None, xmin=None, xmax=None,
         if opt["verbose"]:
             print "Converged!"
 
+    # KKT matrix with a fixed pattern, filled in place, and its
+    # factorization, which reuses its ordering while the pattern is unchanged
+    kkt = pips_kkt()
+    lu = pips_linsolver(opt["linsolver"], opt["linsolver_ordering"],
+                        opt["linsolver_tol"], opt["linsolver_max_it"], nx)
+
     # do Newton iterations
     while (not converged) and (i < opt["max_it"]):
         # update iteration counter
         i += 1
 
         # compute update step
+        t1 = time()
         lmbda = {"eqnonlin": lam[range(neqnln)],
                  "ineqnonlin": mu[range(niqnln)]}
         if nonlinear:
@@ -387,21 +461,26 @@ def pips(f_fcn, x0=None, A=None, l=None, u=None, xmin=None, xmax=None,
         else:
             _, _, d2f = f_fcn(x, True)      # cost
             Lxx = d2f * opt["cost_mult"]
-        rz = range(len(z))
-        zinvdiag = sparse((1.0 / z, (rz, rz))) if len(z) else None
-        rmu = range(len(mu))
-        mudiag = sparse((mu, (rmu, rmu))) if len(mu) else None
-        dh_zinv = None if dh is None else dh * zinvdiag
-        M = Lxx if dh is None else Lxx + dh_zinv * mudiag * dh.T
-        N = Lx if dh is None else Lx + dh_zinv * (mudiag * h + gamma * e)
-
-        Ab = sparse(M) if dg is None else vstack([
-            hstack([M, dg]),
-            hstack([dg.T, sparse((neq, neq))])
-        ])
+        t2 = time()
+        et['et_hess'] += t2 - t1
+
+        # [M dg; dg.T 0], M = Lxx + dh * diag(mu / z) * dh.T, with the
+        # terms of the simple bounds on the diagonal
+        zinv = 1.0 / z
+        w = mu * zinv
+        nig = niq - nxb
+        d = bincount(jx, w[nig:], nx) if nxb else None
+        Ab = kkt.assemble(Lxx, dh, w[:nig], dg, d)
+        N = Lx + dh_mul(dh, (mu * h + gamma * e) * zinv)
         bb = r_[-N, -g]
+        t1 = time()
+        et['et_kkt'] += t1 - t2
 
-        dxdlam = spsolve(Ab.tocsr(), bb)
+        lu.factor(Ab)
+        t2 = time()
+        et['et_factor'] += t2 - t1
+        dxdlam = lu.solve(bb)
+        et['et_solve'] += time() - t2
 
         if any(isnan(dxdlam)):
             if opt["verbose"]:
@@ -411,8 +490,8 @@ def pips(f_fcn, x0=None, A=None, l=None, u=None, xmin=None, xmax=None,
 
         dx = dxdlam[:nx]
         dlam = dxdlam[nx:nx + neq]
-        dz = -h - z if dh is None else -h - z - dh.T * dx
-        dmu = -mu if dh is None else -mu + zinvdiag * (gamma * e - mudiag * dz)
+        dz = -h - z - dh_tmul(dh, dx)
+        dmu = -mu + zinv * (gamma * e - mu * dz)
 
         # optional step-size control
         sc = False
@@ -426,7 +505,7 @@ def pips(f_fcn, x0=None, A=None, l=None, u=None, xmin=None, xmax=None,
             if nonlinear:
                 hn1, gn1, dhn1, dgn1 = gh_fcn(x1) # nonlinear constraints
 
-                h1 = hn1 if Ai is None else r_[hn1, Ai * x1 - bi] # ieq constraints
+                h1 = r_[hn1, hlin(x1)]                            # ieq constraints
                 g1 = gn1 if Ae is None else r_[gn1, Ae * x1 - be] # eq constraints
 
                 # 1st der of ieq
@@ -435,9 +514,9 @@ def pips(f_fcn, x0=None, A=None, l=None, u=None, xmin=None, xmax=None,
                 elif dhn1 is None:
                     dh1 = Ai.T
                 elif Ai is None:
-                    dh1 = dhn1
+                    dh1 = dhn1.tocsc()
                 else:
-                    dh1 = hstack([dhn1, Ai.T])
+                    dh1 = hstack([dhn1, Ai.T], "csc")
 
                 # 1st der of eqs
                 if (dgn1 is None) and (Ae is None):
@@ -449,7 +528,7 @@ def pips(f_fcn, x0=None, A=None, l=None, u=None, xmin=None, xmax=None,
                 else:
                     dg1 = hstack([dgn1, Ae.T])
             else:
-                h1 = -bi if Ai is None else Ai * x1 - bi    # inequality constraints
+                h1 = hlin(x1)                               # inequality constraints
                 g1 = -be if Ae is None else Ae * x1 - be    # equality constraints
 
                 dh1 = dh                       ## 1st derivative of inequalities
@@ -458,7 +537,7 @@ def pips(f_fcn, x0=None, A=None, l=None, u=None, xmin=None, xmax=None,
             # check tolerance
             Lx1 = df1
             Lx1 = Lx1 + dg1 * lam if dg1 is not None else Lx1
-            Lx1 = Lx1 + dh1 * mu  if dh1 is not None else Lx1
+            Lx1 = Lx1 + dh_mul(dh1, mu)
 
             maxh1 = zeros(1) if len(h1) == 0 else max(h1)
 
@@ -482,10 +561,10 @@ def pips(f_fcn, x0=None, A=None, l=None, u=None, xmin=None, xmax=None,
                 f1 = f1 * opt["cost_mult"]
                 if nonlinear:
                     hn1, gn1, _, _ = gh_fcn(x1)              # nonlinear constraints
-                    h1 = hn1 if Ai is None else r_[hn1, Ai * x1 - bi]         # inequality constraints
+                    h1 = r_[hn1, hlin(x1)]                                    # inequality constraints
                     g1 = gn1 if Ae is None else r_[gn1, Ae * x1 - be]         # equality constraints
                 else:
-                    h1 = -bi if Ai is None else Ai * x1 - bi    # inequality constraints
+                    h1 = hlin(x1)                               # inequality constraints
                     g1 = -be if Ae is None else Ae * x1 - be    # equality constraints
 
                 L1 = f1 + dot(lam, g1) + dot(mu, h1 + z) - gamma * sum(log(z))
@@ -517,6 +596,7 @@ def pips(f_fcn, x0=None, A=None, l=None, u=None, xmin=None, xmax=None,
             gamma = sigma * dot(z, mu) / niq
 
         # evaluate cost, constraints, derivatives
+        t1 = time()
         f, df = f_fcn(x)             # cost
         f = f * opt["cost_mult"]
         df = df * opt["cost_mult"]
@@ -524,7 +604,7 @@ def pips(f_fcn, x0=None, A=None, l=None, u=None, xmin=None, xmax=None,
             hn, gn, dhn, dgn = gh_fcn(x)                   # nln constraints
 #            g = gn if Ai is None else r_[gn, Ai * x - bi] # ieq constraints
 #            h = hn if Ae is None else r_[hn, Ae * x - be] # eq constraints
-            h = hn if Ai is None else r_[hn, Ai * x - bi] # ieq constr
+            h = r_[hn, hlin(x)]                           # ieq constr
             g = gn if Ae is None else r_[gn, Ae * x - be]  # eq constr
 
             if (dhn is None) and (Ai is None):
@@ -532,9 +612,9 @@ def pips(f_fcn, x0=None, A=None, l=None, u=None, xmin=None, xmax=None,
             elif dhn is None:
                 dh = Ai.T
             elif Ai is None:
-                dh = dhn
+                dh = dhn.tocsc()
             else:
-                dh = hstack([dhn, Ai.T])
+                dh = hstack([dhn, Ai.T], "csc")
 
             if (dgn is None) and (Ae is None):
                 dg = None
@@ -545,13 +625,14 @@ def pips(f_fcn, x0=None, A=None, l=None, u=None, xmin=None, xmax=None,
             else:
                 dg = hstack([dgn, Ae.T])
         else:
-            h = -bi if Ai is None else Ai * x - bi    # inequality constraints
+            h = hlin(x)                               # inequality constraints
             g = -be if Ae is None else Ae * x - be    # equality constraints
             # 1st derivatives are constant, still dh = Ai.T, dg = Ae.T
+        et['et_fcn'] += time() - t1
 
         Lx = df
         Lx = Lx + dg * lam if dg is not None else Lx
-        Lx = Lx + dh * mu  if dh is not None else Lx
+        Lx = Lx + dh_mul(dh, mu)
 
         if len(h) == 0:
             maxh = zeros(1)
@@ -613,7 +694,15 @@ def pips(f_fcn, x0=None, A=None, l=None, u=None, xmin=None, xmax=None,
     else:
         raise
 
-    output = {"iterations": i, "hist": hist, "message": message}
+    output = {"iterations": i, "hist": hist, "message": message,
+              "et": time() - t0, "nanalyse": kkt.nanalyse,
+              "linsolver": lu.solver, "nfallback": lu.nfallback}
+    output.update(et)
+    if opt["verbose"] > 1:
+        print "Time (s): functions %.3f, Hessian %.3f, KKT assembly %.3f, " \
+              "factor %.3f, solve %.3f, total %.3f" % \
+            (et['et_fcn'], et['et_hess'], et['et_kkt'], et['et_factor'],
+             et['et_solve'], output['et'])
 
     # zero out multipliers on non-binding constraints
     mu[find( (h < -opt["feastol"]) & (mu < mu_threshold) )] = 0.0
@@ -625,7 +714,8 @@ def pips(f_fcn, x0=None, A=None, l=None, u=None, xmin=None, xmax=None,
 
     # re-package multipliers into struct
     lam_lin = lam[neqnln:neq]           # lambda for linear constraints
-    mu_lin = mu[niqnln:niq]             # mu for linear constraints
+    mu_lin = zeros(niq - niqnln)        # mu for linear constraints
+    mu_lin[ilin] = mu[niqnln:niq]
     kl = find(lam_lin < 0.0)     # lower bound binding
     ku = find(lam_lin > 0.0)     # upper bound binding
 
@@ -656,6 +746,26 @@ def pips(f_fcn, x0=None, A=None, l=None, u=None, xmin=None, xmax=None,
 
     return solution
 
+
+def _rows(A, idx, sig, nx):
+    """Returns rows C{idx} of C{[I; A]}, where C{I} is the C{nx x nx}
+    identity, multiplied by C{sig}, or C{None} if C{idx} is empty.
+    """
+    n = len(idx)
+    if n == 0:          # zero-sized sparse matrices unsupported
+        return None
+    kb = find(idx < nx)
+    ka = find(idx >= nx)
+    rows, cols, vals = [kb], [idx[kb]], [sig[kb]]
+    if len(ka):
+        Aa = csr_matrix(A)[idx[ka] - nx, :].tocoo()
+        rows.append(ka[Aa.row])
+        cols.append(Aa.col)
+        vals.append(sig[ka][Aa.row] * Aa.data)
+    return csr_matrix((r_[tuple(vals)], (r_[tuple(rows)], r_[tuple(cols)])),
+                      (n, nx))
+
+
 if __name__ == "__main__":
     import doctest
     doctest.testmod()
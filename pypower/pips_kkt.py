@@ -0,0 +1,168 @@
+# Copyright (C) 2011 Richard Lincoln
+#
+# PYPOWER is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published
+# by the Free Software Foundation, either version 3 of the License,
+# or (at your option) any later version.
+#
+# PYPOWER is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with PYPOWER. If not, see <http://www.gnu.org/licenses/>.
+
+"""KKT matrix of the PIPS Newton step, assembled in place.
+"""
+
+from numpy import arange, repeat, cumsum, diff, bincount, unique, zeros, \
+    array_equal, r_
+from scipy.sparse import csr_matrix, csc_matrix, issparse
+
+
+class pips_kkt(object):
+    """KKT matrix of the PIPS Newton step, assembled in place.
+
+    Each iteration of L{pips} solves a linear system with the matrix::
+
+        | Lxx + dh * diag(w) * dh.T + diag(d)   dg |
+        |                                         |
+        |                dg.T                    0 |
+
+    where C{w = mu / z} and C{d} holds the barrier terms of the simple
+    bounds on the variables. Its sparsity pattern only depends on those of the
+    Hessian of the Lagrangian C{Lxx} and of the constraint gradients
+    C{dh} and C{dg}, which do not change from one iteration to the next.
+    On the first call to L{assemble}, or when one of the input patterns
+    changes, the pattern of the matrix is computed in CSR form, together
+    with the position in its C{data} array of every nonzero of C{Lxx}, C{dg}
+    and C{dg.T}, of the diagonal and of every product
+    C{dh[i, k] * dh[j, k]}. Later calls
+    only compute those products and scatter all of the values into the
+    C{data} array, which is overwritten in place::
+
+        kkt = pips_kkt()
+        lu = lufactor()
+        for k in range(max_it):
+            K = kkt.assemble(Lxx, dh, mu / z, dg)
+            dxdlam = lu.factor(K).solve(b)
+
+    The matrix returned is always the same object with the same pattern,
+    so an L{lufactor} object only refactors it numerically.
+
+    The number of pattern analyses performed is kept in the C{nanalyse}
+    attribute.
+
+    @see: L{pips}, L{lufactor}
+    """
+
+    def __init__(self):
+        #: number of pattern analyses performed
+        self.nanalyse = 0
+
+        #: the assembled KKT matrix
+        self.K = None
+
+        self._pat = None    ## patterns of Lxx, dh and dg
+        self._dst = None    ## positions of all values in K.data
+        self._ha = None     ## dh.data positions of the two factors and
+        self._hb = None     ## column of every product
+        self._hk = None
+
+    def assemble(self, Lxx, dh, w, dg, d=None):
+        """Returns the KKT matrix for the Hessian C{Lxx} (C{nx x nx}), the
+        inequality constraint gradients C{dh} (C{nx x niq}, or C{None}) with
+        weights C{w}, the equality constraint gradients C{dg}
+        (C{nx x neq}, or C{None}) and the diagonal C{d} (C{nx}, or C{None})
+        added to the Hessian block.
+        """
+        Lxx = _canonical(Lxx, csr_matrix)
+        dh = _canonical(dh, csc_matrix)
+        dg = _canonical(dg, csc_matrix)
+        pat = [_pattern(A) for A in (Lxx, dh, dg)] + [d is None]
+        if not self._same(pat):
+            self._analyse(Lxx, dh, dg, pat)
+
+        vals = [Lxx.data]
+        if d is not None:
+            vals.append(d)
+        if dh is not None:
+            vals.append(dh.data[self._ha] * dh.data[self._hb] * w[self._hk])
+        if dg is not None:
+            vals.extend([dg.data, dg.data])
+        self.K.data[:] = bincount(self._dst, r_[tuple(vals)], self.K.nnz)
+
+        return self.K
+
+    def _same(self, pat):
+        if self._pat is None or pat[-1] != self._pat[-1]:
+            return False
+        for p, q in zip(pat[:-1], self._pat[:-1]):
+            if (p is None) != (q is None):
+                return False
+            if p is not None and (p[0] != q[0] or
+                    not array_equal(p[1], q[1]) or
+                    not array_equal(p[2], q[2])):
+                return False
+        return True
+
+    def _analyse(self, Lxx, dh, dg, pat):
+        self.nanalyse += 1
+        self._pat = [p if p is None else (p[0], p[1].copy(), p[2].copy())
+                     for p in pat[:-1]] + pat[-1:]
+        nx = Lxx.shape[0]
+        neq = 0 if dg is None else dg.shape[1]
+        n = nx + neq
+
+        ## Lxx, in the order of its data
+        rows = [repeat(arange(nx), diff(Lxx.indptr))]
+        cols = [Lxx.indices]
+
+        ## diagonal
+        if not pat[-1]:
+            rows.append(arange(nx))
+            cols.append(arange(nx))
+
+        ## products of pairs of nonzeros in the same column of dh
+        if dh is not None:
+            cnt = diff(dh.indptr)
+            col = repeat(arange(dh.shape[1]), cnt)   ## column of each entry
+            nk = cnt[col]
+            a = repeat(arange(dh.nnz), nk)
+            start = repeat(cumsum(nk) - nk, nk)
+            b = dh.indptr[col[a]] + arange(len(a)) - start
+            self._ha, self._hb, self._hk = a, b, col[a]
+            rows.append(dh.indices[a])
+            cols.append(dh.indices[b])
+
+        ## dg and dg.T
+        if dg is not None:
+            gr = dg.indices
+            gc = nx + repeat(arange(neq), diff(dg.indptr))
+            rows.extend([gr, gc])
+            cols.extend([gc, gr])
+
+        key = r_[tuple(rows)] * n + r_[tuple(cols)]
+        k, self._dst = unique(key, return_inverse=True)
+        indptr = r_[0, cumsum(bincount(k // n, minlength=n))]
+        self.K = csr_matrix((zeros(len(k)), k % n, indptr), (n, n))
+        self.K.has_sorted_indices = True
+
+
+def _canonical(A, fmt):
+    """Returns C{A} in the given sparse format with sorted indices and no
+    duplicates.
+    """
+    if A is None:
+        return None
+    if not issparse(A) or A.format != fmt.format:
+        A = fmt(A)
+    if not A.has_canonical_format:
+        A = A.copy()
+        A.sum_duplicates()
+    return A
+
+
+def _pattern(A):
+    return None if A is None else (A.shape, A.indptr, A.indices)
@@ -0,0 +1,220 @@
+# Copyright (C) 2011 Richard Lincoln
+#
+# PYPOWER is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published
+# by the Free Software Foundation, either version 3 of the License,
+# or (at your option) any later version.
+#
+# PYPOWER is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with PYPOWER. If not, see <http://www.gnu.org/licenses/>.
+
+"""Linear solver backends for the Newton step of the interior point method.
+"""
+
+from warnings import warn
+
+from numpy import r_, zeros, nan, isfinite, sqrt
+from numpy.linalg import norm
+
+from scipy.sparse import csc_matrix, issparse
+from scipy.sparse.linalg import LinearOperator, minres, gmres, spilu
+
+from pypower.lufactor import lufactor, UmfpackContext
+
+
+## column orderings accepted by SuperLU
+ORDERINGS = ('COLAMD', 'MMD_AT_PLUS_A', 'MMD_ATA', 'NATURAL')
+
+
+class pips_linsolver(object):
+    """Linear solver backends for the Newton step of the interior point
+    method.
+
+    Solves the KKT systems of L{pips} with one of the following solvers,
+    selected by name (the C{PDIPM_LINSOLVER} option):
+        - C{'SUPERLU'}  SciPy's C{splu}, through L{lufactor}, with the
+          fill-reducing column ordering given by C{ordering} (one of
+          C{'COLAMD'}, C{'MMD_AT_PLUS_A'}, C{'MMD_ATA'} or C{'NATURAL'}).
+        - C{'UMFPACK'}  UMFPACK, through L{lufactor}, if C{scikits.umfpack}
+          is importable.
+        - C{'MINRES'}  the MINRES iterative method, preconditioned with a
+          positive diagonal matrix: the absolute diagonal of the upper left
+          C{nx x nx} (Hessian) block, and an estimate of the diagonal of
+          its Schur complement for the remaining (constraint) rows.
+        - C{'GMRES'}  the restarted GMRES iterative method, preconditioned
+          with an incomplete LU factorization (C{spilu}) computed with
+          C{ordering}.
+    The default (an empty name) is UMFPACK if it is available and SuperLU
+    otherwise, as for L{lufactor}.
+
+    The solution of an iterative method is accepted if it converges within
+    C{max_it} iterations (restart cycles for GMRES) to the relative
+    residual C{tol} of the preconditioned system, and that of the original
+    system is below C{sqrt(tol)}.
+
+    If the selected solver raises an error, or fails to produce a finite
+    (or, for an iterative method, an accepted) solution, a warning is
+    issued and the system is solved again with the next direct solver
+    (UMFPACK if available, then SuperLU). The fallback solver is used for
+    all later systems. The name of the solver in use and the number of fallbacks
+    are kept in the C{solver} and C{nfallback} attributes.
+
+    Like L{lufactor}, L{factor} returns the object itself and L{solve}
+    returns a vector of C{nan} if no solver succeeds::
+
+        ls = pips_linsolver('GMRES', nx=nx)
+        dxdlam = ls.factor(Ab).solve(bb)
+
+    @see: L{pips}, L{lufactor}
+    """
+
+    def __init__(self, solver=None, ordering='COLAMD', tol=1e-10, max_it=100,
+                 nx=None):
+        solver = (solver or '').upper()
+        ordering = (ordering or 'COLAMD').upper()
+        if solver not in ('', 'SUPERLU', 'UMFPACK', 'MINRES', 'GMRES'):
+            raise ValueError('pips_linsolver: unknown solver \'%s\'' % solver)
+        if ordering not in ORDERINGS:
+            raise ValueError('pips_linsolver: unknown ordering \'%s\'' %
+                             ordering)
+
+        ## requested solver followed by the direct fallbacks
+        direct = ['SUPERLU'] if UmfpackContext is None \
+            else ['UMFPACK', 'SUPERLU']
+        if not solver:
+            solver = direct[0]
+        self._chain = [solver] + [s for s in direct if s != solver]
+
+        #: fill-reducing column ordering of SuperLU and of C{spilu}
+        self.ordering = ordering
+
+        #: relative residual tolerance of the iterative methods
+        self.tol = tol
+
+        #: maximum number of iterations of MINRES and of restart cycles
+        #: of GMRES
+        self.max_it = max_it
+
+        #: number of rows and columns of the upper left (Hessian) block
+        self.nx = nx
+
+        #: number of fallbacks to another solver
+        self.nfallback = 0
+
+        #: name of the solver in use
+        self.solver = None
+
+        self._A = None
+        self._lu = None         ## lufactor object (direct solvers)
+        self._M = None          ## preconditioner (iterative methods)
+        self._next()
+
+    def factor(self, A):
+        """Factors the sparse matrix C{A} (CSR or CSC), or computes its
+        preconditioner for the iterative methods. Returns the object itself.
+        """
+        if not issparse(A) or A.format not in ('csr', 'csc'):
+            A = csc_matrix(A)
+        self._A = A
+        try:
+            self._factor()
+        except Exception as e:
+            self._fail(str(e))
+        return self
+
+    def solve(self, b):
+        """Solves C{A * x = b} with the current factorization or
+        preconditioner, falling back to the next solver if it fails.
+        """
+        while True:
+            try:
+                x, msg = self._solve(b)
+            except Exception as e:
+                x, msg = None, str(e)
+            if msg is None:
+                return x
+            if not self._fail(msg):
+                return nan * zeros(b.shape)
+
+    def _next(self):
+        """Switches to the next solver of the chain, returning C{False} if
+        there is none.
+        """
+        while self._chain:
+            solver = self._chain.pop(0)
+            if solver == 'UMFPACK' and UmfpackContext is None:
+                warn('pips_linsolver: UMFPACK solver requires '
+                     'scikits.umfpack')
+                continue
+            self.solver = solver
+            self._lu = lufactor(solver, self.ordering) \
+                if solver in ('SUPERLU', 'UMFPACK') else None
+            self._M = None
+            return True
+        return False
+
+    def _fail(self, msg):
+        """Falls back to the next solver after a failure of the current one
+        and factors the current matrix with it.
+        """
+        failed = self.solver
+        while self._next():
+            self.nfallback += 1
+            warn('pips_linsolver: %s failed (%s), using %s' %
+                 (failed, msg, self.solver))
+            try:
+                self._factor()
+                return True
+            except Exception as e:
+                failed, msg = self.solver, str(e)
+        self.solver = None
+        warn('pips_linsolver: %s failed (%s), no solver left' % (failed, msg))
+        return False
+
+    def _factor(self):
+        A = self._A
+        if self.solver in ('SUPERLU', 'UMFPACK'):
+            self._lu.factor(A)
+        elif self.solver == 'MINRES':
+            ## diagonal of the block of Hessian terms, and of the Schur
+            ## complement of it, as positive definite preconditioner
+            n = A.shape[0] if self.nx is None else self.nx
+            d = abs(A.diagonal()[:n])
+            d[d == 0] = 1.0
+            if n < A.shape[0]:
+                B = A[n:, :n]
+                s = B.multiply(B) * (1.0 / d)
+                s[s == 0] = 1.0
+                d = r_[d, s]
+            self._M = LinearOperator(A.shape, matvec=lambda x: x / d)
+        else:
+            ilu = spilu(A.tocsc(), drop_tol=sqrt(self.tol),
+                        permc_spec=self.ordering)
+            self._M = LinearOperator(A.shape, matvec=ilu.solve)
+
+    def _solve(self, b):
+        """Returns the solution and C{None}, or an error message.
+        """
+        if self.solver is None:
+            return None, 'no solver left'
+        if self._lu is not None:
+            x = self._lu.solve(b)
+            if not isfinite(x).all():
+                return None, 'singular matrix'
+            return x, None
+
+        A, maxiter = self._A, self.max_it
+        if self.solver == 'MINRES':
+            x, info = minres(A, b, tol=self.tol, maxiter=maxiter, M=self._M)
+        else:
+            x, info = gmres(A, b, tol=self.tol, maxiter=maxiter, M=self._M)
+        if not isfinite(x).all():
+            return None, 'no finite solution'
+        if info != 0 or norm(A * x - b) > sqrt(self.tol) * norm(b):
+            return None, 'not converged'
+        return x, None
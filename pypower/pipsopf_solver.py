@@ -28,6 +28,8 @@ from idx_cost import MODEL, PW_LINEAR, NCOST
 from makeYbus import makeYbus
 from opf_costfcn import opf_costfcn
 from opf_consfcn import opf_consfcn
+from opf_considx import opf_considx
+from opf_hessidx import opf_hessidx
 from opf_hessfcn import opf_hessfcn
 from pips import pips
 from util import sub2ind
@@ -86,6 +88,10 @@ def pipsopf_solver(om, ppopt, out_opt=None):
     costtol = ppopt['PDIPM_COSTTOL']
     max_it  = ppopt['PDIPM_MAX_IT']
     max_red = ppopt['SCPDIPM_RED_IT']
+    linsolver = ppopt['PDIPM_LINSOLVER']
+    ordering = ppopt['PDIPM_LINSOLVER_ORDERING']
+    ls_tol = ppopt['PDIPM_LINSOLVER_TOL']
+    ls_max_it = ppopt['PDIPM_LINSOLVER_MAX_IT']
     step_control = (ppopt['OPF_ALG'] == 565)  ## OPF_ALG == 565, PIPS-sc
     if feastol == 0:
         feastol = ppopt['OPF_VIOLATION']
@@ -97,7 +103,11 @@ def pipsopf_solver(om, ppopt, out_opt=None):
              'max_red': max_red,
              'step_control': step_control,
              'cost_mult': 1e-4,
-             'verbose': verbose  }
+             'verbose': verbose,
+             'linsolver': linsolver,
+             'linsolver_ordering': ordering,
+             'linsolver_tol': ls_tol,
+             'linsolver_max_it': ls_max_it  }
 
     ## unpack data
     ppc = om.get_ppc()
@@ -139,10 +149,16 @@ def pipsopf_solver(om, ppopt, out_opt=None):
     il = find((branch[:, RATE_A] != 0) & (branch[:, RATE_A] < 1e10))
     nl2 = len(il)           ## number of constrained lines
 
+    ## admittance matrices of constrained lines and index maps of the
+    ## constraint gradients and of the Hessian of the Lagrangian
+    Yfl, Ytl = Yf[il, :], Yt[il, :]
+    cidx = opf_considx(om, Ybus, Yfl, Ytl, il)
+    hidx = opf_hessidx(om, Ybus, Yfl, Ytl, il, cidx)
+
     ##-----  run opf  -----
     f_fcn = lambda x, return_hessian=False: opf_costfcn(x, om, return_hessian)
-    gh_fcn = lambda x: opf_consfcn(x, om, Ybus, Yf[il, :], Yt[il,:], ppopt, il)
-    hess_fcn = lambda x, lmbda, cost_mult: opf_hessfcn(x, lmbda, om, Ybus, Yf[il, :], Yt[il, :], ppopt, il, cost_mult)
+    gh_fcn = lambda x: opf_consfcn(x, om, Ybus, Yfl, Ytl, ppopt, il, cidx)
+    hess_fcn = lambda x, lmbda, cost_mult: opf_hessfcn(x, lmbda, om, Ybus, Yfl, Ytl, ppopt, il, cost_mult, hidx)
 
     solution = pips(f_fcn, x0, A, l, u, xmin, xmax, gh_fcn, hess_fcn, opt)
     x, f, info, lmbda, output = solution["x"], solution["f"], \
@@ -31,12 +31,30 @@ PF_OPTIONS = [
 
     ('pf_max_it', 10, 'maximum number of iterations for Newton\'s method'),
 
+    ('pf_nr_reuse', 0, '''maximum number of consecutive iterations in which
+Newton's method reuses a factored Jacobian (dishonest Newton):
+0 - refactor the Jacobian at every iteration'''),
+
+    ('pf_nr_reuse_ratio', 0.3, 'refactor the Jacobian when an iteration with '
+     'a reused Jacobian reduces the mismatch by less than this ratio'),
+
     ('pf_max_it_fd', 30, 'maximum number of iterations for fast '
      'decoupled method'),
 
     ('pf_max_it_gs', 1000, 'maximum number of iterations for '
      'Gauss-Seidel method'),
 
+    ('pf_gs_accel', 1.0, 'acceleration factor for Gauss-Seidel method'),
+
+    ('pf_warm_start', 0, '''number of networks for which runpf keeps the
+last converged voltages to use as the starting point of the next AC power
+flow on the same network: 0 - always start from the case'''),
+
+    ('pf_fd_cache', 0, '''number of networks for which runpf keeps the
+factored B matrices of the fast-decoupled method, so that later power
+flows on the same network and bus types skip their factorization:
+0 - always factor'''),
+
     ('enforce_q_lims', False, 'enforce gen reactive power limits, at '
      'expense of |V|'),
 
@@ -45,6 +63,31 @@ False - use AC formulation & corresponding algorithm opts,
 True  - use DC formulation, ignore AC algorithm options''')
 ]
 
+CPF_OPTIONS = [
+    ('cpf_stop_at', 'NOSE', '''when to stop the continuation power flow:
+'NOSE' - once the nose of the curve is passed,
+'FULL' - once lambda returns to 0 on the lower part of the curve,
+<number> - once lambda reaches that value'''),
+
+    ('cpf_parameterization', 2, '''parameterization of the continuation
+power flow corrector:
+1 - local (the fastest changing variable is fixed),
+2 - pseudo arc length'''),
+
+    ('cpf_step', 0.05, 'initial continuation power flow step size'),
+
+    ('cpf_adapt_step', True, 'adapt the continuation power flow step size'),
+
+    ('cpf_error_tol', 1e-3, 'target distance between predicted and '
+     'corrected points when adapting the step size'),
+
+    ('cpf_step_min', 1e-4, 'minimum continuation power flow step size'),
+
+    ('cpf_step_max', 0.2, 'maximum continuation power flow step size'),
+
+    ('cpf_max_steps', 500, 'maximum number of continuation power flow steps')
+]
+
 OPF_OPTIONS = [
     ('opf_alg', 0, '''algorithm to use for OPF:
 0 - choose best default solver available in the
@@ -148,7 +191,20 @@ Primal-Dual Interior Points Methods'''),
     ('pdipm_max_it',  150, '''maximum number of iterations for
 Primal-Dual Interior Points Methods'''),
     ('scpdipm_red_it', 20, '''maximum number of reductions per iteration
-for Step-Control Primal-Dual Interior Points Methods''')
+for Step-Control Primal-Dual Interior Points Methods'''),
+    ('pdipm_linsolver', '', '''linear solver for the Newton step of
+Primal-Dual Interior Points Methods: 'SUPERLU', 'UMFPACK'
+(if scikits.umfpack is installed), 'MINRES' or 'GMRES'
+(iterative), or '' for UMFPACK if available, else SUPERLU.
+Falls back to a direct solver if it fails'''),
+    ('pdipm_linsolver_ordering', 'COLAMD', '''fill-reducing column ordering
+used by SUPERLU and the GMRES preconditioner: 'COLAMD',
+'MMD_AT_PLUS_A', 'MMD_ATA' or 'NATURAL' '''),
+    ('pdipm_linsolver_tol', 1e-10, '''relative residual tolerance of the
+MINRES and GMRES linear solvers'''),
+    ('pdipm_linsolver_max_it', 100, '''maximum number of iterations of the
+MINRES linear solver and of restart cycles of the GMRES
+linear solver''')
 ]
 
 GUROBI_OPTIONS = [
@@ -188,7 +244,8 @@ def ppoption(ppopt=None, **kw_args):
 
     default_ppopt = {}
 
-    options = PF_OPTIONS + OPF_OPTIONS + OUTPUT_OPTIONS + PDIPM_OPTIONS
+    options = PF_OPTIONS + CPF_OPTIONS + OPF_OPTIONS + OUTPUT_OPTIONS + \
+        PDIPM_OPTIONS
 
     for name, default, _ in options:
         default_ppopt[name.upper()] = default
@@ -0,0 +1,315 @@
+# Copyright (C) 2011 Richard Lincoln
+#
+# PYPOWER is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published
+# by the Free Software Foundation, either version 3 of the License,
+# or (at your option) any later version.
+#
+# PYPOWER is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with PYPOWER. If not, see <http://www.gnu.org/licenses/>.
+
+"""Runs an AC N-1 contingency analysis.
+"""
+
+from sys import stdout
+
+from os.path import dirname, join
+
+from time import time
+
+from multiprocessing import Pool, cpu_count
+
+from numpy import array, zeros, ones, arange, exp, pi, conj, sqrt, \
+    maximum, c_, r_, flatnonzero as find
+
+from pypower.loadcase import loadcase
+from pypower.ext2int import ext2int
+from pypower.ppoption import ppoption
+from pypower.ppver import ppver
+from pypower.bustypes import bustypes
+from pypower.makeSbus import makeSbus
+from pypower.newtonpf import newtonpf
+from pypower.ybus_model import ybus_model
+from pypower.lufactor import lufactor
+from pypower.lodf_chunks import lodf_chunks
+from pypower.find_islands import find_islands
+
+from pypower.idx_bus import VM, VA, VMAX, VMIN
+from pypower.idx_brch import F_BUS, T_BUS, BR_STATUS, RATE_A, QT
+from pypower.idx_gen import GEN_BUS, GEN_STATUS, VG
+
+
+## columns of the violation table
+CT_K, CT_TYPE, CT_ELEM, CT_VALUE, CT_LIMIT = range(5)
+
+## violation types
+CT_NONCONV, CT_ISLAND, CT_FLOW, CT_VMIN, CT_VMAX = range(5)
+
+## model used by each worker process, see _init()
+_model = None
+
+
+def runcontingency(casedata=None, outages=None, ppopt=None, nproc=None,
+                   screen=0):
+    """Runs an AC N-1 contingency analysis.
+
+    Solves the AC power flow (Newton's method) of the base case and of each
+    of the given C{outages}, a list of C{('branch', i)} and C{('gen', i)}
+    tuples where C{i} is a row of the C{branch} or C{gen} matrix of the
+    case (external ordering). By default every in-service branch is taken
+    out in turn. Outages of elements that are already out of service are
+    skipped.
+
+    The case is loaded and converted to internal indexing, and the base
+    case solved, only once. Each contingency is then solved starting from
+    the base case voltages. Branch outages patch the base admittance
+    matrices in place with a L{ybus_model}, whose sparsity pattern does
+    not change, so the Jacobian pattern and the ordering of its
+    factorization are also shared by successive branch outages. Generator
+    outages remove the generation from the bus injections, the slack bus
+    taking up the difference, and convert the bus to a PQ bus if no other
+    generator is left on it. Generator reactive power limits are not
+    enforced. Branch outages that split the network into more islands than
+    the base case (see L{find_islands}) are reported as C{CT_ISLAND}
+    violations without being solved.
+
+    The contingencies are distributed over C{nproc} worker processes (all
+    CPUs by default). With C{nproc = 1} they are solved in the calling
+    process.
+
+    If C{screen} is positive, branch outages are first screened with the
+    DC line outage distribution factors of L{lodf_chunks}: the post-outage
+    real power flows are estimated from the base case flows and, together
+    with the base case reactive flows, compared with the C{RATE_A}
+    ratings. Outages whose estimated loading of every branch is below the
+    fraction C{screen} of its rating are not solved. Outages of bridge
+    branches are identified by the screening itself. Screening only
+    considers flows, so voltage violations of skipped outages are not
+    detected.
+
+    Returns a dict with the following keys:
+        - C{violations}  violation table, with one row per violation and
+          columns C{CT_K} (position of the outage in C{outages}, -1 for
+          the base case), C{CT_TYPE} (one of C{CT_NONCONV}, C{CT_ISLAND},
+          C{CT_FLOW}, C{CT_VMIN}, C{CT_VMAX}), C{CT_ELEM} (branch row or
+          bus number, in external ordering, of the violated limit),
+          C{CT_VALUE} and C{CT_LIMIT} (MVA flow and rating, or voltage
+          magnitude and limit in p.u.)
+        - C{outages}     the list of outages
+        - C{success}     convergence flag of each outage (C{True} if
+          screened out or islanding)
+        - C{screened}    flag of each outage that was not solved
+        - C{iterations}  Newton iterations taken by each outage
+        - C{et}          elapsed time in seconds
+
+    @see: L{runpf}, L{lodf_chunks}, L{ybus_model}
+    """
+    ## default arguments
+    if casedata is None:
+        casedata = join(dirname(__file__), 'case9')
+    ppopt = ppoption(ppopt)
+    nproc = nproc or cpu_count()
+
+    t0 = time()
+    verbose = ppopt['VERBOSE']
+    if verbose:
+        v = ppver('all')
+        stdout.write('PYPOWER Version %s, %s -- AC Contingency Analysis\n' %
+                     (v['Version'], v['Date']))
+
+    ## read data & convert to internal indexing
+    ppc = loadcase(casedata)
+    if ppc['branch'].shape[1] < QT + 1:
+        ppc['branch'] = c_[ppc['branch'], zeros((ppc['branch'].shape[0],
+                                        QT + 1 - ppc['branch'].shape[1]))]
+    ppc = ext2int(ppc)
+    baseMVA, bus, gen, branch = \
+        ppc['baseMVA'], ppc['bus'], ppc['gen'], ppc['branch']
+    o = ppc['order']
+    nl, ng = branch.shape[0], gen.shape[0]
+
+    ## maps from external rows to internal indices (-1 if out of service)
+    bon = o['branch']['status']['on']
+    gon = o['gen']['status']['on'][o['gen']['e2i']]
+    bi = -ones(o['ext']['branch'].shape[0], int)
+    gi = -ones(o['ext']['gen'].shape[0], int)
+    bi[bon] = arange(nl)
+    gi[gon] = arange(ng)
+
+    if outages is None:
+        outages = [('branch', i) for i in bon]
+    no = len(outages)
+    kind = array([c[0] == 'gen' for c in outages], int)   ## 0 branch, 1 gen
+    idx = array([gi[c[1]] if c[0] == 'gen' else bi[c[1]] for c in outages],
+                int).reshape(no)
+
+    model = {
+        'baseMVA': baseMVA,
+        'bus': bus,
+        'gen': gen,
+        'branch': branch,
+        'bus_i2e': o['bus']['i2e'],
+        'branch_i2e': bon,
+        'ppopt': ppoption(ppopt, VERBOSE=0)
+    }
+    _init(model)
+
+    ## base case
+    _, viol, success, _, Sf = _solve((-1, (0, -1)))
+    model['V0'] = _model['V0'] = _model['V']
+    if not success:
+        stdout.write('runcontingency: base case did not converge\n')
+
+    ## screen branch outages
+    screened = idx < 0
+    if screen > 0 and success:
+        P0, Q0 = Sf.real, Sf.imag
+        rate = branch[:, RATE_A]
+        lim = rate > 0
+        b = find(~screened & (kind == 0))
+        bridge = zeros(len(b), bool)
+        harmless = zeros(len(b), bool)
+        pos = [0]
+
+        def check(k, L, br):
+            n = len(k)
+            P = P0[lim, None] + L[lim, :] * P0[k]
+            loading = sqrt(P**2 + Q0[lim, None]**2) / rate[lim, None]
+            bridge[pos[0]:pos[0] + n] = br
+            harmless[pos[0]:pos[0] + n] = \
+                loading.max(0) < screen if lim.any() else True
+            pos[0] += n
+
+        lodf_chunks(baseMVA, bus, branch, idx[b], callback=check)
+        screened[b[bridge | harmless]] = True
+        for j in b[bridge]:
+            viol.append([j, CT_ISLAND, bon[idx[j]], 0, 0])
+
+    ## solve remaining contingencies
+    succ = ones(no, bool)
+    its = zeros(no, int)
+    tasks = [(j, (kind[j], idx[j])) for j in find(~screened)]
+    if nproc == 1 or len(tasks) < 2:
+        results = map(_solve, tasks)
+    else:
+        pool = Pool(nproc, _init, (model,))
+        results = pool.imap_unordered(_solve, tasks,
+                                      max(1, len(tasks) // (4 * nproc)))
+    for j, rows, s, i, _ in results:
+        viol.extend(rows)
+        succ[j], its[j] = s, i
+    if nproc != 1 and len(tasks) >= 2:
+        pool.close()
+        pool.join()
+
+    viol = array(viol, float).reshape(len(viol), 5)
+    viol = viol[viol[:, CT_K].argsort(kind='mergesort')]
+    et = time() - t0
+
+    if verbose:
+        stdout.write('%d outages, %d solved, %d did not converge, '
+                     '%d violations in %.2f seconds\n' %
+                     (no, len(tasks), sum(~succ), viol.shape[0], et))
+
+    return {
+        'violations': viol,
+        'outages': outages,
+        'success': succ,
+        'screened': screened,
+        'iterations': its,
+        'et': et
+    }
+
+
+def _init(model):
+    """Sets up the model used to solve contingencies in a process.
+    """
+    global _model
+    _model = dict(model)
+    _model['ym'] = ybus_model(model['baseMVA'], model['bus'], model['branch'])
+    _model['ref'], _model['pv'], _model['pq'] = \
+        bustypes(model['bus'], model['gen'])
+    _model['Sbus'] = makeSbus(model['baseMVA'], model['bus'], model['gen'])
+    _model['lu'] = lufactor()
+    _model['nisland'] = len(find_islands(model['bus'], model['branch']))
+    if 'V0' not in model:
+        bus, gen = model['bus'], model['gen']
+        gbus = gen[:, GEN_BUS].astype(int)
+        V0 = bus[:, VM] * exp(1j * pi/180 * bus[:, VA])
+        V0[gbus] = gen[:, VG] / abs(V0[gbus]) * V0[gbus]
+        _model['V0'] = V0
+
+
+def _solve(task):
+    """Solves one contingency (-1 for the base case), returning its
+    violations, convergence flag, iterations and "from" end flows.
+    """
+    k, (kind, i) = task
+    m = _model
+    ym, ppopt = m['ym'], m['ppopt']
+    ref, pv, pq, Sbus = m['ref'], m['pv'], m['pq'], m['Sbus']
+
+    outage = kind == 0 and i >= 0
+    if outage:                      ## branch outage
+        ym.set_branch_status(i, 0)
+    elif kind == 1:                 ## generator outage
+        gen = m['gen'].copy()
+        gen[i, GEN_STATUS] = 0
+        ref, pv, pq = bustypes(m['bus'], gen)
+        Sbus = makeSbus(m['baseMVA'], m['bus'], gen)
+
+    ## the branch is restored even if the solve fails, since the model is
+    ## shared by all the contingencies of the process
+    try:
+        if outage and _islanding(m):
+            return k, [[k, CT_ISLAND, m['branch_i2e'][i], 0, 0]], True, 0, None
+
+        V, success, iterations, _ = newtonpf(ym.Ybus, Sbus, m['V0'].copy(),
+                                             ref, pv, pq, ppopt, m['lu'])
+        if k < 0:
+            m['V'] = V
+        rows, Sf = _violations(m, k, V, success)
+    finally:
+        if outage:                  ## restore branch
+            ym.set_branch_status(i, 1)
+
+    return k, rows, success, iterations, Sf
+
+
+def _islanding(m):
+    """Returns C{True} if the branches in service in the model split the
+    network into more islands than the base case.
+    """
+    branch = m['branch'].copy()
+    branch[:, BR_STATUS] = m['ym'].status
+    return len(find_islands(m['bus'], branch)) > m['nisland']
+
+
+def _violations(m, k, V, success):
+    """Rows of the violation table of a solution.
+    """
+    if not success:
+        return [[k, CT_NONCONV, -1, 0, 0]], None
+
+    baseMVA, bus, branch, ym = m['baseMVA'], m['bus'], m['branch'], m['ym']
+    f, t = ym.f, ym.t
+    Sf = V[f] * conj(ym.Yf * V) * baseMVA
+    St = V[t] * conj(ym.Yt * V) * baseMVA
+
+    rows = []
+    rate = branch[:, RATE_A]
+    S = maximum(abs(Sf), abs(St))
+    for l in find((rate > 0) & (S > rate)):
+        rows.append([k, CT_FLOW, m['branch_i2e'][l], S[l], rate[l]])
+    Vm = abs(V)
+    for b in find(Vm < bus[:, VMIN]):
+        rows.append([k, CT_VMIN, m['bus_i2e'][b], Vm[b], bus[b, VMIN]])
+    for b in find(Vm > bus[:, VMAX]):
+        rows.append([k, CT_VMAX, m['bus_i2e'][b], Vm[b], bus[b, VMAX]])
+
+    return rows, Sf
@@ -0,0 +1,173 @@
+# Copyright (C) 2011 Richard Lincoln
+#
+# PYPOWER is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published
+# by the Free Software Foundation, either version 3 of the License,
+# or (at your option) any later version.
+#
+# PYPOWER is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with PYPOWER. If not, see <http://www.gnu.org/licenses/>.
+
+"""Runs a continuation power flow.
+"""
+
+from sys import stdout, stderr
+
+from os.path import dirname, join
+
+from time import time
+
+from numpy import exp, pi, c_, zeros, ix_, tile, any
+
+from pypower.bustypes import bustypes
+from pypower.ext2int import ext2int
+from pypower.int2ext import int2ext
+from pypower.loadcase import loadcase
+from pypower.ppoption import ppoption
+from pypower.ppver import ppver
+from pypower.makeYbus import makeYbus
+from pypower.makeSbus import makeSbus
+from pypower.newtonpf import newtonpf
+from pypower.pfsoln import pfsoln
+from pypower.cpf import cpf
+from pypower.lufactor import lufactor
+
+from pypower.idx_bus import PD, QD, VM, VA
+from pypower.idx_brch import PF, QF, PT, QT
+from pypower.idx_gen import PG, QG, VG, GEN_BUS
+
+
+def runcpf(basecasedata=None, targetcasedata=None, ppopt=None):
+    """Runs a continuation power flow.
+
+    Traces the AC power flow solutions (the PV or nose curve) of a case as
+    the bus loads and generator real power outputs move from those of the
+    base case C{basecasedata} (C{lam = 0}) towards those of the target
+    case C{targetcasedata} (C{lam = 1}) and beyond, i.e. the transfer
+    direction is the difference between the two cases, whose other data
+    must be identical. If no target case is given, the loads and the real
+    power outputs of all generators of the base case are doubled, a
+    uniform increase at constant power factor.
+
+    The base case is solved by L{newtonpf} and the curve traced from its
+    solution by L{cpf}, which takes its step size, parameterization and
+    stopping criterion from the C{CPF_*} options (see L{ppoption}).
+    Generator reactive power limits are not enforced.
+
+    Returns a results dict and a success flag, as L{runpf} does, for the
+    last point traced, with the loads and generator outputs at that value
+    of C{lam}, and a C{cpf} key holding the dict returned by L{cpf}, whose
+    C{V} matrix has one row per bus of the external case (the case values
+    for isolated buses).
+
+    @see: L{cpf}, L{runpf}
+    """
+    ## default arguments
+    if basecasedata is None:
+        basecasedata = join(dirname(__file__), 'case9')
+    ppopt = ppoption(ppopt)
+
+    ## options
+    verbose = ppopt["VERBOSE"]
+    if ppopt["PF_DC"] or ppopt["PF_ALG"] != 1 or ppopt["ENFORCE_Q_LIMS"]:
+        stderr.write('runcpf: only the AC Newton power flow without Q limits '
+                     'is supported, using it\n')
+
+    ## read data
+    ppcb = loadcase(basecasedata)
+
+    ## add zero columns to branch for flows if needed
+    if ppcb["branch"].shape[1] < QT:
+        ppcb["branch"] = c_[ppcb["branch"],
+                            zeros((ppcb["branch"].shape[0],
+                                   QT - ppcb["branch"].shape[1] + 1))]
+
+    ## convert to internal indexing
+    ppcb = ext2int(ppcb)
+    if targetcasedata is None:
+        ppct = dict(ppcb)
+        ppct['bus'], ppct['gen'] = ppcb['bus'].copy(), ppcb['gen'].copy()
+        ppct['bus'][:, [PD, QD]] *= 2
+        ppct['gen'][:, PG] *= 2
+    else:
+        ppct = ext2int(loadcase(targetcasedata))
+    baseMVA, bus, gen, branch = \
+        ppcb["baseMVA"], ppcb["bus"], ppcb["gen"], ppcb["branch"]
+    if ppct['bus'].shape != bus.shape or ppct['gen'].shape != gen.shape or \
+            any(ppct['gen'][:, GEN_BUS] != gen[:, GEN_BUS]):
+        raise ValueError('runcpf: base and target cases must have the same '
+                         'buses and generators')
+
+    t0 = time()
+    if verbose > 0:
+        v = ppver('all')
+        stdout.write('PYPOWER Version %s, %s -- AC Continuation Power Flow\n'
+                     % (v["Version"], v["Date"]))
+
+    ## get bus index lists of each type of bus
+    ref, pv, pq = bustypes(bus, gen)
+
+    ## build admittance matrices and injections at lam = 0 and 1,
+    ## all gens in the internal case are on
+    Ybus, Yf, Yt = makeYbus(baseMVA, bus, branch)
+    Sbusb = makeSbus(baseMVA, bus, gen)
+    Sbust = makeSbus(baseMVA, ppct['bus'], ppct['gen'])
+
+    ## solve the base case
+    gbus = gen[:, GEN_BUS].astype(int)
+    V0 = bus[:, VM] * exp(1j * pi/180 * bus[:, VA])
+    V0[gbus] = gen[:, VG] / abs(V0[gbus]) * V0[gbus]
+    lu = lufactor()
+    V, success, _, _ = newtonpf(Ybus, Sbusb, V0, ref, pv, pq, ppopt, lu)
+
+    ## trace the curve
+    lam = 0.0
+    info = None
+    if success:
+        V, lam, success, info = \
+            cpf(Ybus, Sbusb, Sbust, V, ref, pv, pq, ppopt, lu)
+    elif verbose:
+        stdout.write('runcpf: base case power flow did not converge\n')
+
+    ## loads and dispatch at the last point
+    for key, cols in [('bus', [PD, QD]), ('gen', [PG])]:
+        x, xt = ppcb[key], ppct[key]
+        ppcb[key] = x.copy()
+        ppcb[key][:, cols] = x[:, cols] + lam * (xt[:, cols] - x[:, cols])
+    bus, gen = ppcb["bus"], ppcb["gen"]
+
+    ## update data matrices with solution
+    bus, gen, branch = pfsoln(baseMVA, bus, gen, branch, Ybus, Yf, Yt, V,
+                              ref, pv, pq)
+    ppcb["bus"], ppcb["gen"], ppcb["branch"] = bus, gen, branch
+    ppcb["et"] = time() - t0
+    ppcb["success"] = success
+
+    ## traced voltages in external bus ordering
+    if info is not None:
+        o = ppcb["order"]
+        bus0 = o["ext"]["bus"]
+        Vt = tile(bus0[:, VM] * exp(1j * pi/180 * bus0[:, VA]),
+                  (info['V'].shape[1], 1)).T
+        Vt[o["bus"]["status"]["on"], :] = info['V']
+        info['V'] = Vt
+
+    ##-----  output results  -----
+    ## convert back to original bus numbering
+    results = int2ext(ppcb)
+
+    ## zero out result fields of out-of-service gens & branches
+    o = results["order"]
+    if len(o["gen"]["status"]["off"]) > 0:
+        results["gen"][ix_(o["gen"]["status"]["off"], [PG, QG])] = 0
+    if len(o["branch"]["status"]["off"]) > 0:
+        results["branch"][ix_(o["branch"]["status"]["off"],
+                              [PF, QF, PT, QT])] = 0
+    results["cpf"] = info
+
+    return results, success
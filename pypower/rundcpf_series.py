@@ -0,0 +1,150 @@
+# Copyright (C) 2011 Richard Lincoln
+#
+# PYPOWER is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published
+# by the Free Software Foundation, either version 3 of the License,
+# or (at your option) any later version.
+#
+# PYPOWER is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with PYPOWER. If not, see <http://www.gnu.org/licenses/>.
+
+"""Runs a time series of DC power flows.
+"""
+
+from sys import stdout
+
+from os.path import dirname, join
+
+from time import time
+
+from numpy import ones, zeros, arange, pi, tile, r_, atleast_2d, \
+    flatnonzero as find
+from scipy.sparse import csr_matrix as sparse
+
+from pypower.bustypes import bustypes
+from pypower.ext2int import ext2int
+from pypower.loadcase import loadcase
+from pypower.ppoption import ppoption
+from pypower.ppver import ppver
+from pypower.makeBdc import makeBdc
+from pypower.dcpf import dcpf
+from pypower.lufactor import lufactor
+
+from pypower.idx_bus import PD, VA, GS
+from pypower.idx_gen import PG, GEN_BUS
+
+
+def rundcpf_series(casedata=None, Pd=None, Pg=None, ppopt=None):
+    """Runs a time series of DC power flows.
+
+    Solves one DC power flow per period for a case whose topology and
+    parameters are fixed, while bus real power loads and generator real
+    power outputs vary. C{Pd} is an C{nb x T} matrix of bus loads in MW and
+    C{Pg} an C{ng x T} matrix of generator outputs in MW, one column per
+    period, where C{nb} and C{ng} are the numbers of rows in the C{bus} and
+    C{gen} matrices of the case (external ordering). Either may be omitted,
+    in which case the values from the case are used for every period. A
+    single column is broadcast across all periods.
+
+    The case is loaded and converted to internal indexing, and the B
+    matrices built, only once. The reduced B matrix is factored once by
+    L{dcpf} and the angles of all periods are found with a single solve
+    with C{T} right-hand sides.
+
+    Returns a dict with the following keys, each an array with one column
+    per period:
+        - C{Va}  bus voltage angles in degrees, C{nb x T}
+        - C{Pf}  branch real power flows at the "from" end in MW,
+          C{nl x T} (zero for out-of-service branches)
+        - C{Pg}  generator real power outputs in MW, C{ng x T}, with the
+          reference bus generators taking up the mismatch (zero for
+          off-line generators)
+        - C{et}  elapsed solution time in seconds
+
+    @see: L{rundcpf}, L{dcpf}, L{runpf_batch}
+    """
+    ## default arguments
+    if casedata is None:
+        casedata = join(dirname(__file__), 'case9')
+    ppopt = ppoption(ppopt)
+    verbose = ppopt["VERBOSE"]
+
+    ## read data & convert to internal indexing
+    ppc = ext2int(loadcase(casedata))
+    baseMVA, bus, gen, branch = \
+        ppc["baseMVA"], ppc["bus"], ppc["gen"], ppc["branch"]
+    o = ppc["order"]
+    nb, ng = bus.shape[0], gen.shape[0]
+
+    ## map period data to internal indexing, one column per period
+    bon = o["bus"]["status"]["on"]
+    gon = o["gen"]["status"]["on"][o["gen"]["e2i"]]
+    Pd = bus[:, [PD]] if Pd is None else _columns(Pd)[bon, :]
+    Pg = gen[:, [PG]] if Pg is None else _columns(Pg)[gon, :]
+    T = max(Pd.shape[1], Pg.shape[1])
+    if any([x.shape[1] not in (1, T) for x in [Pd, Pg]]):
+        raise ValueError('rundcpf_series: Pd and Pg must have the same '
+                         'number of columns (or a single column)')
+    Pd, Pg = [tile(x, (1, T // x.shape[1])) for x in [Pd, Pg]]
+
+    ## get bus index lists of each type of bus
+    ref, pv, pq = bustypes(bus, gen)
+
+    ## build B matrices and phase shift injections
+    B, Bf, Pbusinj, Pfinj = makeBdc(baseMVA, bus, branch)
+
+    ##-----  run the power flows  -----
+    t0 = time()
+    if verbose > 0:
+        v = ppver('all')
+        stdout.write('PYPOWER Version %s, %s -- DC Power Flow, %d periods\n'
+                     % (v["Version"], v["Date"], T))
+
+    ## bus real power injections [generation - load] adjusted for phase
+    ## shifters and real shunts, all gens in the internal case are on
+    gbus = gen[:, GEN_BUS].astype(int)
+    Cg = sparse((ones(ng), (gbus, arange(ng))), (nb, ng))
+    Pbus = (Cg * Pg - Pd) / baseMVA - \
+        (Pbusinj + bus[:, GS] / baseMVA)[:, None]
+
+    ## solve for all periods at once
+    Va0 = tile(bus[:, [VA]] * (pi / 180), (1, T))
+    Va = dcpf(B, Pbus, Va0, ref, pv, pq, lufactor())
+    Pf = (Bf * Va + Pfinj[:, None]) * baseMVA
+
+    ## update Pg for slack generator (1st gen at ref bus)
+    refgen = r_[[find(gbus == r)[0] for r in ref]].astype(int)
+    Pg[refgen, :] = Pg[refgen, :] + (B[ref, :] * Va - Pbus[ref, :]) * baseMVA
+
+    et = time() - t0
+
+    ##-----  convert back to external indexing  -----
+    Va_ext = tile(o["ext"]["bus"][:, [VA]], (1, T))
+    Va_ext[bon, :] = Va * (180 / pi)
+    Pf_ext = zeros((o["ext"]["branch"].shape[0], T))
+    Pf_ext[o["branch"]["status"]["on"], :] = Pf
+    Pg_ext = zeros((o["ext"]["gen"].shape[0], T))
+    Pg_ext[gon, :] = Pg
+
+    if verbose:
+        stdout.write('DC power flow solved for %d periods in %.2f seconds\n'
+                     % (T, et))
+
+    return {
+        'Va': Va_ext,
+        'Pf': Pf_ext,
+        'Pg': Pg_ext,
+        'et': et
+    }
+
+
+def _columns(x):
+    """Returns C{x} as a matrix with at least one column.
+    """
+    x = atleast_2d(x)
+    return x.T if x.shape[0] == 1 else x
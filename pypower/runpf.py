@@ -23,8 +23,10 @@ from os.path import dirname, join
 
 from time import time
 
-from numpy import r_, c_, ix_, zeros, pi, ones, exp, argmax
+from numpy import r_, c_, ix_, zeros, pi, ones, exp, argmax, angle, \
+    array_equal, in1d
 from numpy import flatnonzero as find
+from scipy.sparse import csr_matrix as sparse
 
 from pypower.bustypes import bustypes
 from pypower.ext2int import ext2int
@@ -43,6 +45,9 @@ from pypower.pfsoln import pfsoln
 from pypower.printpf import printpf
 from pypower.savecase import savecase
 from pypower.int2ext import int2ext
+from pypower.warmstart_cache import runpf_cache
+from pypower.fdpf_cache import runpf_fdpf_cache
+from pypower.lufactor import lufactor
 
 from pypower.idx_bus import PD, QD, VM, VA, GS, BUS_TYPE, PQ, REF
 from pypower.idx_brch import PF, PT, QF, QT
@@ -76,7 +81,27 @@ def runpf(casedata=None, ppopt=None, fname='', solvedcase=''):
     power limit. If the reference bus is converted to PQ, the first
     remaining PV bus will be used as the slack bus for the next iteration.
     This may result in the real power output at this generator being
-    slightly off from the specified values.
+    slightly off from the specified values. With Newton's method the
+    conversion is done within the iterations, continuing from the current
+    voltages, instead of re-running the power flow (see L{newtonpf}).
+
+    If the C{PF_WARM_START} option is positive, the AC power flow starts
+    from the voltages of the last converged solution of a case with the
+    same topology and network parameters, if there is one, instead of from
+    the voltages in the case. Generator voltage set points and the angle of
+    the reference bus are still taken from the case. Solutions are kept for
+    up to C{PF_WARM_START} networks (see L{warmstart_cache}).
+
+    Similarly, if the C{PF_FD_CACHE} option is positive, the factored B
+    matrices of the fast-decoupled methods are kept for up to
+    C{PF_FD_CACHE} combinations of network, bus types and algorithm, and
+    later power flows that match one of them only do the forward and back
+    substitutions of the iterations (see L{fdpf_cache}).
+
+    With Newton's method, the C{info} dict returned by L{newtonpf},
+    including its final Jacobian factorization, is added to the results
+    as C{results['newton']}, with bus indices in internal ordering (see
+    L{ac_sensitivity}).
 
     Enforcing of generator Q limits inspired by contributions from Mu Lin,
     Lincoln University, New Zealand (1/14/05).
@@ -93,6 +118,8 @@ def runpf(casedata=None, ppopt=None, fname='', solvedcase=''):
     verbose = ppopt["VERBOSE"]
     qlim = ppopt["ENFORCE_Q_LIMS"]  ## enforce Q limits on gens?
     dc = ppopt["PF_DC"]             ## use DC formulation?
+    warm = ppopt["PF_WARM_START"]   ## warm start from cached voltages?
+    fdcache = ppopt["PF_FD_CACHE"]  ## keep factored FDPF B matrices?
 
     ## read data
     ppc = loadcase(casedata)
@@ -148,7 +175,7 @@ def runpf(casedata=None, ppopt=None, fname='', solvedcase=''):
         ## (note: other gens at ref bus are accounted for in Pbus)
         ##      Pg = Pinj + Pload + Gs
         ##      newPg = oldPg + newPinj - oldPinj
-        refgen = zeros(len(ref))
+        refgen = zeros(len(ref), int)
         for k in range(len(ref)):
             temp = find(gbus == ref[k])
             refgen[k] = on[temp[0]]
@@ -173,6 +200,19 @@ def runpf(casedata=None, ppopt=None, fname='', solvedcase=''):
         ## initial state
         # V0    = ones(bus.shape[0])            ## flat start
         V0  = bus[:, VM] * exp(1j * pi/180 * bus[:, VA])
+
+        ## or warm start from the last solution of the same network
+        if warm:
+            runpf_cache.maxsize = warm
+            key = runpf_cache.key(ppc)
+            Vw = runpf_cache.get(key)
+            if Vw is not None:
+                ## keep the reference angle of the case
+                r = ref[0]
+                V0 = Vw * exp(1j * (pi/180 * bus[r, VA] - angle(Vw[r])))
+                if verbose > 1:
+                    stdout.write('warm start from cached voltages\n')
+
         V0[gbus] = gen[on, VG] / abs(V0[gbus]) * V0[gbus]
 
         if qlim:
@@ -181,7 +221,35 @@ def runpf(casedata=None, ppopt=None, fname='', solvedcase=''):
             limited = []                       ## list of indices of gens @ Q lims
             fixedQg = zeros(gen.shape[0])      ## Qg of gens at Q limits
 
-        repeat = True
+        alg = ppopt["PF_ALG"]
+        if alg == 1:
+            ## build admittance matrices
+            Ybus, Yf, Yt = makeYbus(baseMVA, bus, branch)
+
+            ## compute complex bus power injections [generation - load]
+            Sbus = makeSbus(baseMVA, bus, gen)
+
+            ## run the power flow, Newton's method converts PV buses at
+            ## Q limits to PQ buses within its iterations
+            if qlim:
+                Cg = sparse((ones(len(on)), (gbus, range(len(on)))),
+                            (bus.shape[0], len(on)))
+                Qmax = (Cg * gen[on, QMAX] - bus[:, QD]) / baseMVA
+                Qmin = (Cg * gen[on, QMIN] - bus[:, QD]) / baseMVA
+                V, success, _, info = newtonpf(Ybus, Sbus, V0, ref, pv, pq,
+                                               ppopt, Qmin=Qmin, Qmax=Qmax)
+                ref, pv, pq = info['ref'], info['pv'], info['pq']
+                bus[info['limited'], BUS_TYPE] = PQ
+            else:
+                V, success, _, info = newtonpf(Ybus, Sbus, V0, ref, pv, pq,
+                                               ppopt)
+
+            ## update data matrices with solution, including Pg at a former
+            ## reference bus, which was fixed at its value when converted
+            refs = r_[ref, ref0[~in1d(ref0, ref)]] if qlim else ref
+            bus, gen, branch = pfsoln(baseMVA, bus, gen, branch, Ybus, Yf, Yt, V, refs, pv, pq)
+
+        repeat = alg != 1
         while repeat:
             ## build admittance matrices
             Ybus, Yf, Yt = makeYbus(baseMVA, bus, branch)
@@ -190,12 +258,24 @@ def runpf(casedata=None, ppopt=None, fname='', solvedcase=''):
             Sbus = makeSbus(baseMVA, bus, gen)
 
             ## run the power flow
-            alg = ppopt["PF_ALG"]
-            if alg == 1:
-                V, success, _ = newtonpf(Ybus, Sbus, V0, ref, pv, pq, ppopt)
-            elif alg == 2 or alg == 3:
-                Bp, Bpp = makeB(baseMVA, bus, branch, alg)
-                V, success, _ = fdpf(Ybus, Sbus, V0, Bp, Bpp, ref, pv, pq, ppopt)
+            if alg == 2 or alg == 3:
+                ## factored B matrices of the same network & bus types?
+                lu = None
+                if fdcache:
+                    runpf_fdpf_cache.maxsize = fdcache
+                    fdkey = runpf_fdpf_cache.key(baseMVA, bus, gen, branch,
+                                                 pv, pq, alg)
+                    lu = runpf_fdpf_cache.get(fdkey)
+                if lu is None or not (lu[0].nfactor and lu[1].nfactor):
+                    Bp, Bpp = makeB(baseMVA, bus, branch, alg)
+                    lu = (lufactor(), lufactor())
+                else:
+                    Bp = Bpp = None
+                V, success, _ = fdpf(Ybus, Sbus, V0, Bp, Bpp, ref, pv, pq,
+                                     ppopt, lu)
+                ## nothing is factored if V0 had already converged
+                if fdcache and lu[0].nfactor and lu[1].nfactor:
+                    runpf_fdpf_cache.put(fdkey, lu)
             elif alg == 4:
                 V, success, _ = gausspf(Ybus, Sbus, V0, ref, pv, pq, ppopt)
             else:
@@ -208,16 +288,16 @@ def runpf(casedata=None, ppopt=None, fname='', solvedcase=''):
 
             if qlim:             ## enforce generator Q limits
                 ## find gens with violated Q constraints
-                mx = find( gen[:, GEN_STATUS] > 0 & gen[:, QG] > gen[:, QMAX] )
-                mn = find( gen[:, GEN_STATUS] > 0 & gen[:, QG] < gen[:, QMIN] )
+                mx = find( (gen[:, GEN_STATUS] > 0) & (gen[:, QG] > gen[:, QMAX]) )
+                mn = find( (gen[:, GEN_STATUS] > 0) & (gen[:, QG] < gen[:, QMIN]) )
 
                 if len(mx) > 0 or len(mn) > 0:  ## we have some Q limit violations
-                    if len(pv):
+                    if len(pv) == 0:
                         if verbose:
                             if len(mx) > 0:
-                                print 'Gen %d [only one left] exceeds upper Q limit : INFEASIBLE PROBLEM\n' % mx
+                                print 'Gen %d [only one left] exceeds upper Q limit : INFEASIBLE PROBLEM\n' % mx[0]
                             else:
-                                print 'Gen %d [only one left] exceeds lower Q limit : INFEASIBLE PROBLEM\n' % mn
+                                print 'Gen %d [only one left] exceeds lower Q limit : INFEASIBLE PROBLEM\n' % mn[0]
 
                         success = 0
                         break
@@ -226,18 +306,18 @@ def runpf(casedata=None, ppopt=None, fname='', solvedcase=''):
                     if qlim == 2:    ## fix largest violation, ignore the rest
                         k = argmax(r_[gen[mx, QG] - gen[mx, QMAX],
                                       gen[mn, QMIN] - gen[mn, QG]])
-                        if k > len(mx):
-                            mn = mn[k - len(mx)]
-                            mx = []
+                        if k >= len(mx):
+                            mn = mn[[k - len(mx)]]
+                            mx = mx[[]]
                         else:
-                            mx = mx[k]
-                            mn = []
+                            mx = mx[[k]]
+                            mn = mn[[]]
 
                     if verbose and len(mx) > 0:
-                        print 'Gen %d at upper Q limit, converting to PQ bus\n' % mx
+                        print 'Gen %s at upper Q limit, converting to PQ bus\n' % mx
 
                     if verbose and len(mn) > 0:
-                        print 'Gen %d at lower Q limit, converting to PQ bus\n' % mn
+                        print 'Gen %s at lower Q limit, converting to PQ bus\n' % mn
 
                     ## save corresponding limit values
                     fixedQg[mx] = gen[mx, QMAX]
@@ -247,23 +327,24 @@ def runpf(casedata=None, ppopt=None, fname='', solvedcase=''):
                     ## convert to PQ bus
                     gen[mx, QG] = fixedQg[mx]      ## set Qg to binding limit
                     gen[mx, GEN_STATUS] = 0        ## temporarily turn off gen,
-                    for i in range(mx):            ## [one at a time, since they may be at same bus]
-                        bi = gen[mx[i], GEN_BUS]   ## adjust load accordingly,
+                    for i in range(len(mx)):       ## [one at a time, since they may be at same bus]
+                        bi = int(gen[mx[i], GEN_BUS])   ## adjust load accordingly,
                         bus[bi, [PD, QD]] = (bus[bi, [PD, QD]] - gen[mx[i], [PG, QG]])
-                    if len(ref) > 1 and any(bus[gen[mx, GEN_BUS], BUS_TYPE] == REF):
+                    mxbus = gen[mx, GEN_BUS].astype(int)
+                    if len(ref) > 1 and any(bus[mxbus, BUS_TYPE] == REF):
                         raise ValueError, ('Sorry, PYPOWER cannot enforce Q '
                                            'limits for slack buses in systems '
                                            'with multiple slacks.')
 
-                    bus[gen[mx, GEN_BUS], BUS_TYPE] = PQ   ## & set bus type to PQ
+                    bus[mxbus, BUS_TYPE] = PQ   ## & set bus type to PQ
 
                     ## update bus index lists of each type of bus
                     ref_temp = ref
                     ref, pv, pq = bustypes(bus, gen)
-                    if verbose and ref != ref_temp:
-                        print 'Bus %d is new slack bus\n' % ref
+                    if verbose and not array_equal(ref, ref_temp):
+                        print 'Bus %d is new slack bus\n' % ref[0]
 
-                    limited = r_[limited, mx]
+                    limited = r_[limited, mx].astype(int)
                 else:
                     repeat = 0 ## no more generator Q limits violated
             else:
@@ -272,17 +353,22 @@ def runpf(casedata=None, ppopt=None, fname='', solvedcase=''):
         if qlim and len(limited) > 0:
             ## restore injections from limited gens [those at Q limits]
             gen[limited, QG] = fixedQg[limited]    ## restore Qg value,
-            for i in range(limited):               ## [one at a time, since they may be at same bus]
-                bi = gen[limited[i], GEN_BUS]      ## re-adjust load,
+            for i in range(len(limited)):          ## [one at a time, since they may be at same bus]
+                bi = int(gen[limited[i], GEN_BUS]) ## re-adjust load,
                 bus[bi, [PD, QD]] = bus[bi, [PD, QD]] + gen[limited[i], [PG, QG]]
 
             gen[limited, GEN_STATUS] = 1           ## and turn gen back on
-            if ref != ref0:
-                ## adjust voltage angles to make original ref bus correct
-                bus[:, VA] = bus[:, VA] - bus[ref0, VA] + Varef0
+
+        if qlim and not array_equal(ref, ref0):
+            ## adjust voltage angles to make original ref bus correct
+            bus[:, VA] = bus[:, VA] - bus[ref0, VA] + Varef0
+
+        if warm and success:
+            runpf_cache.put(key, V)
 
     ppc["et"] = time() - t0
     ppc["success"] = success
+    newton = info if not dc and alg == 1 else None
 
     ##-----  output results  -----
     ## convert back to original bus numbering & print results
@@ -296,6 +382,10 @@ def runpf(casedata=None, ppopt=None, fname='', solvedcase=''):
     if len(results["order"]["branch"]["status"]["off"]) > 0:
         results["branch"][ix_(results["order"]["branch"]["status"]["off"], [PF, QF, PT, QT])] = 0
 
+    ## statistics & final factorization of Newton's method
+    if newton is not None:
+        results["newton"] = newton
+
     if fname:
         fd = None
         try:
@@ -0,0 +1,168 @@
+# Copyright (C) 2011 Richard Lincoln
+#
+# PYPOWER is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published
+# by the Free Software Foundation, either version 3 of the License,
+# or (at your option) any later version.
+#
+# PYPOWER is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with PYPOWER. If not, see <http://www.gnu.org/licenses/>.
+
+"""Runs a batch of AC power flows with varying loads and dispatch.
+"""
+
+from sys import stdout, stderr
+
+from os.path import dirname, join
+
+from time import time
+
+from numpy import exp, pi, conj, ones, zeros, arange, tile, atleast_2d, \
+    flatnonzero as find
+from scipy.sparse import csr_matrix as sparse
+
+from pypower.bustypes import bustypes
+from pypower.ext2int import ext2int
+from pypower.loadcase import loadcase
+from pypower.ppoption import ppoption
+from pypower.ppver import ppver
+from pypower.makeYbus import makeYbus
+from pypower.newtonpf_batch import newtonpf_batch
+from pypower.lufactor import lufactor
+
+from pypower.idx_bus import PD, QD, VM, VA
+from pypower.idx_brch import F_BUS, T_BUS
+from pypower.idx_gen import PG, QG, VG, GEN_BUS
+
+
+def runpf_batch(casedata=None, Pd=None, Qd=None, Pg=None, ppopt=None,
+                chunk=256):
+    """Runs a batch of AC power flows with varying loads and dispatch.
+
+    Solves one AC power flow (Newton's method) per scenario for a case
+    whose topology and parameters are fixed, while bus real and reactive
+    loads and generator real power outputs vary. C{Pd} and C{Qd} are
+    C{ns x nb} matrices of bus loads in MW and MVAr and C{Pg} is an
+    C{ns x ng} matrix of generator real power outputs in MW, where C{nb} and
+    C{ng} are the numbers of rows in the C{bus} and C{gen} matrices of the
+    case (external ordering). Any of them may be omitted, in which case the
+    corresponding values from the case are used for every scenario. A
+    single row is broadcast across all scenarios.
+
+    The case is loaded and converted to internal indexing, and C{Ybus},
+    C{Yf}, C{Yt} and the bus types are computed, only once. The scenarios
+    are then solved by L{newtonpf_batch} in groups of at most C{chunk},
+    which bounds the size of the stacked Jacobian.
+
+    Returns a dict with the following keys, each an array with one row
+    per scenario:
+        - C{V}          complex bus voltages, C{ns x nb}
+        - C{Sf}, C{St}  complex branch flows at the "from" and "to" ends
+          in MVA, C{ns x nl} (zero for out-of-service branches)
+        - C{success}    convergence flags, C{ns}
+        - C{iterations} Newton iterations taken, C{ns}
+        - C{et}         elapsed solution time in seconds
+
+    Generator reactive power limits are not enforced, and the slack bus
+    absorbs any mismatch between total generation and load.
+
+    @see: L{runpf}, L{newtonpf_batch}
+    """
+    ## default arguments
+    if casedata is None:
+        casedata = join(dirname(__file__), 'case9')
+    ppopt = ppoption(ppopt)
+
+    ## options
+    verbose = ppopt["VERBOSE"]
+    if ppopt["PF_DC"] or ppopt["PF_ALG"] != 1 or ppopt["ENFORCE_Q_LIMS"]:
+        stderr.write('runpf_batch: only the AC Newton power flow without '
+                     'Q limits is supported, using it\n')
+
+    ## read data & convert to internal indexing
+    ppc = ext2int(loadcase(casedata))
+    baseMVA, bus, gen, branch = \
+        ppc["baseMVA"], ppc["bus"], ppc["gen"], ppc["branch"]
+    o = ppc["order"]
+    nb, ng = bus.shape[0], gen.shape[0]
+
+    ## map scenario data to internal indexing
+    bon = o["bus"]["status"]["on"]
+    gon = o["gen"]["status"]["on"][o["gen"]["e2i"]]
+    Pd = bus[:, PD] if Pd is None else atleast_2d(Pd)[:, bon]
+    Qd = bus[:, QD] if Qd is None else atleast_2d(Qd)[:, bon]
+    Pg = gen[:, PG] if Pg is None else atleast_2d(Pg)[:, gon]
+    Pd, Qd, Pg = atleast_2d(Pd), atleast_2d(Qd), atleast_2d(Pg)
+    ns = max([Pd.shape[0], Qd.shape[0], Pg.shape[0]])
+    if any([x.shape[0] not in (1, ns) for x in [Pd, Qd, Pg]]):
+        raise ValueError('runpf_batch: Pd, Qd and Pg must have the same '
+                         'number of rows (or a single row)')
+    Pd, Qd, Pg = [tile(x, (ns // x.shape[0], 1)) for x in [Pd, Qd, Pg]]
+
+    ## get bus index lists of each type of bus
+    ref, pv, pq = bustypes(bus, gen)
+
+    ## build admittance matrices
+    Ybus, Yf, Yt = makeYbus(baseMVA, bus, branch)
+    f = branch[:, F_BUS].astype(int)
+    t = branch[:, T_BUS].astype(int)
+
+    ## complex bus power injections [generation - load] for each scenario,
+    ## all gens in the internal case are on
+    gbus = gen[:, GEN_BUS].astype(int)
+    Cg = sparse((ones(ng), (gbus, arange(ng))), (nb, ng))
+    Sbus = ((Cg * (Pg + 1j * gen[:, QG]).T).T - (Pd + 1j * Qd)) / baseMVA
+
+    ## initial state
+    V0 = bus[:, VM] * exp(1j * pi/180 * bus[:, VA])
+    V0[gbus] = gen[:, VG] / abs(V0[gbus]) * V0[gbus]
+    V0 = tile(V0, (ns, 1))
+
+    ##-----  run the power flows  -----
+    t0 = time()
+    if verbose > 0:
+        v = ppver('all')
+        stdout.write('PYPOWER Version %s, %s -- AC Power Flow (Newton), '
+                     '%d scenarios\n' % (v["Version"], v["Date"], ns))
+
+    V = zeros((ns, nb), complex)
+    success = zeros(ns, bool)
+    iterations = zeros(ns, int)
+    lu = lufactor()
+    for k in range(0, ns, chunk):
+        s = arange(k, min(k + chunk, ns))
+        V[s], success[s], iterations[s] = \
+            newtonpf_batch(Ybus, Sbus[s], V0[s], ref, pv, pq, ppopt, lu)
+
+    ## branch flows
+    Sf = V[:, f] * conj((Yf * V.T).T) * baseMVA
+    St = V[:, t] * conj((Yt * V.T).T) * baseMVA
+
+    et = time() - t0
+
+    ##-----  convert back to external indexing  -----
+    bus0 = o["ext"]["bus"]
+    V_ext = tile(bus0[:, VM] * exp(1j * pi/180 * bus0[:, VA]), (ns, 1))
+    V_ext[:, bon] = V
+    Sf_ext = zeros((ns, o["ext"]["branch"].shape[0]), complex)
+    St_ext = zeros((ns, o["ext"]["branch"].shape[0]), complex)
+    Sf_ext[:, o["branch"]["status"]["on"]] = Sf
+    St_ext[:, o["branch"]["status"]["on"]] = St
+
+    if verbose and not all(success):
+        stdout.write('%d of %d scenarios did not converge: %s\n' %
+                     (ns - sum(success), ns, find(~success)))
+
+    return {
+        'V': V_ext,
+        'Sf': Sf_ext,
+        'St': St_ext,
+        'success': success,
+        'iterations': iterations,
+        'et': et
+    }
@@ -0,0 +1,193 @@
+# Copyright (C) 2011 Richard Lincoln
+#
+# PYPOWER is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published
+# by the Free Software Foundation, either version 3 of the License,
+# or (at your option) any later version.
+#
+# PYPOWER is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with PYPOWER. If not, see <http://www.gnu.org/licenses/>.
+
+"""Runs a power flow on each island of a network.
+"""
+
+from sys import stdout
+
+from os.path import dirname, join
+
+from time import time
+
+from multiprocessing import Pool, cpu_count
+
+from numpy import zeros, c_, argmax, bincount, searchsorted, ix_, \
+    flatnonzero as find
+
+from pypower.loadcase import loadcase
+from pypower.ext2int import ext2int
+from pypower.int2ext import int2ext
+from pypower.ppoption import ppoption
+from pypower.ppver import ppver
+from pypower.runpf import runpf
+from pypower.printpf import printpf
+from pypower.find_islands import find_islands
+
+from pypower.idx_bus import BUS_TYPE, REF, VM, VA
+from pypower.idx_brch import F_BUS, PF, QF, PT, QT
+from pypower.idx_gen import GEN_BUS, PG, QG, PMAX
+
+
+def runpf_islands(casedata=None, ppopt=None, nproc=1):
+    """Runs a power flow on each island of a network.
+
+    Like L{runpf}, but first finds the islands of the network formed by
+    the in-service branches with L{find_islands} and solves the power flow
+    of each island independently with L{runpf}, so that a network split by
+    branch outages is solved with one reference bus per island rather than
+    a single one for the whole network (see L{bustypes}).
+
+    An island that has a reference bus with an in-service generator keeps
+    it. Otherwise the bus with the largest total real power capacity
+    (C{PMAX}) of in-service generators becomes its reference bus. Islands
+    without any in-service generator cannot be solved and are
+    de-energized, their bus voltages and branch flows set to zero.
+
+    The islands are solved on C{nproc} worker processes (all CPUs if
+    C{None}), or in the calling process if C{nproc = 1}. The solutions are
+    merged into a single results dict, as returned by L{runpf}, with an
+    C{islands} key holding a dict with:
+        - C{buses}      list of arrays of the bus numbers of each island,
+          ordered by decreasing size
+        - C{energized}  flags of the islands with a generator
+        - C{success}    convergence flags of the power flows of the
+          energized islands (C{False} for de-energized islands)
+    The success flag returned is true if the power flows of all energized
+    islands converged.
+
+    @see: L{runpf}, L{find_islands}
+    """
+    ## default arguments
+    if casedata is None:
+        casedata = join(dirname(__file__), 'case9')
+    ppopt = ppoption(ppopt)
+    nproc = nproc or cpu_count()
+
+    ## options
+    verbose = ppopt["VERBOSE"]
+
+    ## read data, as floats since the solutions are written back into it
+    ppc = loadcase(casedata)
+    for key in ('bus', 'gen', 'branch'):
+        ppc[key] = ppc[key].astype(float)
+
+    ## add zero columns to branch for flows if needed
+    if ppc["branch"].shape[1] < QT:
+        ppc["branch"] = c_[ppc["branch"],
+                           zeros((ppc["branch"].shape[0],
+                                  QT - ppc["branch"].shape[1] + 1))]
+
+    ## convert to internal indexing
+    ppc = ext2int(ppc)
+    baseMVA, bus, gen, branch = \
+        ppc["baseMVA"], ppc["bus"], ppc["gen"], ppc["branch"]
+    nb = bus.shape[0]
+
+    t0 = time()
+    if verbose > 0:
+        v = ppver('all')
+        stdout.write('PYPOWER Version %s, %s -- Power Flow by Island\n' %
+                     (v["Version"], v["Date"]))
+
+    ## islands of buses, generators and branches, all of which are in
+    ## service in the internal case
+    groups = find_islands(bus, branch)
+    ni = len(groups)
+    island = zeros(nb, int)
+    for k, b in enumerate(groups):
+        island[b] = k
+    gbus = gen[:, GEN_BUS].astype(int)
+    gisl = island[gbus]
+    lisl = island[branch[:, F_BUS].astype(int)]
+
+    ## one case per energized island
+    energized = bincount(gisl, minlength=ni) > 0
+    tasks = []
+    opt = ppoption(ppopt, VERBOSE=0, OUT_ALL=0)
+    for k in find(energized):
+        b, g = groups[k], find(gisl == k)
+        sub = {'version': '2', 'baseMVA': baseMVA, 'bus': bus[b].copy(),
+               'gen': gen[g].copy(), 'branch': branch[lisl == k].copy()}
+        if not any(bus[gbus[g], BUS_TYPE] == REF):
+            ## bus with the largest generating capacity
+            cap = bincount(gbus[g], gen[g, PMAX], nb)
+            r = gbus[g][argmax(cap[gbus[g]])]
+            sub['bus'][searchsorted(b, r), BUS_TYPE] = REF
+            if verbose > 1:
+                stdout.write('island %d: bus %d is the new reference bus\n' %
+                             (k, ppc["order"]["bus"]["i2e"][r]))
+        tasks.append((k, sub, opt))
+
+    ## solve the islands
+    if nproc == 1 or len(tasks) < 2:
+        solved = map(_solve, tasks)
+    else:
+        pool = Pool(min(nproc, len(tasks)))
+        solved = pool.map(_solve, tasks)
+        pool.close()
+        pool.join()
+
+    ## merge the solutions
+    success = zeros(ni, bool)
+    for k, bus_k, gen_k, branch_k, s in solved:
+        bus[groups[k]] = bus_k[:, :bus.shape[1]]
+        gen[gisl == k] = gen_k[:, :gen.shape[1]]
+        branch[lisl == k] = branch_k[:, :branch.shape[1]]
+        success[k] = s
+
+    ## de-energized islands
+    for k in find(~energized):
+        bus[ix_(groups[k], [VM, VA])] = 0
+        branch[ix_(lisl == k, [PF, QF, PT, QT])] = 0
+
+    ppc["bus"], ppc["gen"], ppc["branch"] = bus, gen, branch
+    ppc["et"] = time() - t0
+    ppc["success"] = all(success[energized])
+
+    if verbose:
+        stdout.write('%d islands, %d de-energized, %d did not converge\n' %
+                     (ni, ni - sum(energized), sum(energized & ~success)))
+
+    ##-----  output results  -----
+    ## convert back to original bus numbering & print results
+    i2e = ppc["order"]["bus"]["i2e"]
+    results = int2ext(ppc)
+
+    ## zero out result fields of out-of-service gens & branches
+    o = results["order"]
+    if len(o["gen"]["status"]["off"]) > 0:
+        results["gen"][ix_(o["gen"]["status"]["off"], [PG, QG])] = 0
+    if len(o["branch"]["status"]["off"]) > 0:
+        results["branch"][ix_(o["branch"]["status"]["off"],
+                              [PF, QF, PT, QT])] = 0
+
+    results["islands"] = {
+        'buses': [i2e[b] for b in groups],
+        'energized': energized,
+        'success': success
+    }
+
+    printpf(results, stdout, ppopt)
+
+    return results, results["success"]
+
+
+def _solve(task):
+    """Solves the power flow of one island.
+    """
+    k, ppc, ppopt = task
+    r, success = runpf(ppc, ppopt)
+    return k, r["bus"], r["gen"], r["branch"], success
@@ -0,0 +1,324 @@
+# Copyright (C) 2011 Richard Lincoln
+#
+# PYPOWER is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published
+# by the Free Software Foundation, either version 3 of the License,
+# or (at your option) any later version.
+#
+# PYPOWER is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with PYPOWER. If not, see <http://www.gnu.org/licenses/>.
+
+"""Runs power flow and OPF scenarios on a pool of worker processes.
+"""
+
+import ctypes
+
+from sys import stdout
+from os import getpid
+from os.path import dirname, join
+from time import time
+
+from multiprocessing import Pool, cpu_count
+from multiprocessing.sharedctypes import RawArray
+
+from numpy import ndarray, frombuffer, ascontiguousarray, exp, pi, c_, \
+    ix_, zeros, dtype
+from scipy.sparse import issparse, csc_matrix, csr_matrix
+
+from pypower.loadcase import loadcase
+from pypower.ext2int import ext2int
+from pypower.int2ext import int2ext
+from pypower.ppoption import ppoption
+from pypower.bustypes import bustypes
+from pypower.makeYbus import makeYbus
+from pypower.makeSbus import makeSbus
+from pypower.makeB import makeB
+from pypower.newtonpf import newtonpf
+from pypower.fdpf import fdpf
+from pypower.lufactor import lufactor
+from pypower.gausspf import gausspf
+from pypower.pfsoln import pfsoln
+from pypower.runpf import runpf
+from pypower.opf import opf
+
+from pypower.idx_bus import PD, QD, VM, VA, MU_VMIN
+from pypower.idx_brch import PF, QF, PT, QT, MU_ANGMAX
+from pypower.idx_gen import PG, QG, VG, GEN_BUS, MU_QMIN
+
+
+## model attached by each worker process, see _init()
+_model = None
+
+
+class scenario_pool(object):
+    """Runs power flow and OPF scenarios on a pool of worker processes.
+
+    The case is loaded and converted to internal indexing once, in the
+    parent process. The internal case and, for AC power flows, C{Ybus},
+    C{Yf} and C{Yt} (and C{Bp}, C{Bpp} for the fast-decoupled methods) are
+    copied into shared memory that every worker maps without copying, so
+    the workers never call L{loadcase}, L{ext2int} or L{makeYbus}::
+
+        pool = scenario_pool('case300', ppopt, nproc=4)
+        for k, results in pool.run(scenarios):
+            ...
+        pool.close()
+
+    Each scenario is a dict with any of the keys C{'PD'}, C{'QD'} (bus
+    loads, one value per row of the C{bus} matrix of the case) and C{'PG'},
+    C{'QG'}, C{'VG'} (one value per row of C{gen}), all in external
+    ordering. Values for isolated buses and off-line generators are
+    ignored.
+
+    L{run} yields C{(k, results)} tuples in the order the scenarios finish,
+    where C{k} is the position of the scenario in the input. C{results} is
+    the dict L{runpf} (or L{runopf}) would return, without its C{order}
+    field. Power flows with C{ENFORCE_Q_LIMS} or C{PF_DC} set are run with
+    L{runpf} on the shared internal case, and OPFs with L{opf}, so only
+    the data conversion is skipped for them.
+
+    The number of scenarios solved and the time spent by each worker are
+    accumulated in the C{stats} attribute, a dict keyed by worker process
+    id, and printed after each L{run} if C{VERBOSE} is set.
+
+    @see: L{runpf}, L{runopf}, L{runpf_batch}
+    """
+
+    def __init__(self, casedata=None, ppopt=None, nproc=None, opf=False):
+        ## default arguments
+        if casedata is None:
+            casedata = join(dirname(__file__), 'case9')
+        ppopt = ppoption(ppopt)
+
+        #: number of worker processes
+        self.nproc = nproc or cpu_count()
+
+        #: scenarios solved and time spent by each worker, keyed by pid
+        self.stats = {}
+
+        self.verbose = ppopt['VERBOSE']
+
+        ## read data & convert to internal indexing
+        ppc = loadcase(casedata)
+        nb, nl, ng = \
+            ppc['bus'].shape[0], ppc['branch'].shape[0], ppc['gen'].shape[0]
+        if opf:     ## add zero columns for multipliers as in opf()
+            ncol = [MU_VMIN + 1, MU_QMIN + 1, MU_ANGMAX + 1]
+        else:       ## add zero columns for flows as in runpf()
+            ncol = [0, 0, QT + 1]
+        for key, n, nc in zip(['bus', 'gen', 'branch'], [nb, ng, nl], ncol):
+            if ppc[key].shape[1] < nc:
+                ppc[key] = c_[ppc[key], zeros((n, nc - ppc[key].shape[1]))]
+        ppc = ext2int(ppc)
+
+        ## maps from external scenario data to internal rows
+        o = ppc['order']
+        model = {
+            'ppc': ppc,
+            'bon': o['bus']['status']['on'],
+            'gon': o['gen']['status']['on'][o['gen']['e2i']],
+            'ppopt': ppoption(ppopt, VERBOSE=0, OUT_ALL=0),
+            'opf': opf
+        }
+
+        ## network matrices for AC power flow
+        if not opf and not ppopt['ENFORCE_Q_LIMS'] and not ppopt['PF_DC']:
+            baseMVA, bus, branch = ppc['baseMVA'], ppc['bus'], ppc['branch']
+            model['ref'], model['pv'], model['pq'] = bustypes(bus, ppc['gen'])
+            model['Ybus'], model['Yf'], model['Yt'] = \
+                makeYbus(baseMVA, bus, branch)
+            if ppopt['PF_ALG'] in (2, 3):
+                model['Bp'], model['Bpp'] = \
+                    makeB(baseMVA, bus, branch, ppopt['PF_ALG'])
+
+        self._pool = Pool(self.nproc, _init, (_share(model),))
+
+    def run(self, scenarios):
+        """Solves the given scenarios, yielding C{(k, results)} tuples in
+        completion order.
+        """
+        t0 = time()
+        stats = {}
+        for k, results, pid, et in \
+                self._pool.imap_unordered(_solve, enumerate(scenarios)):
+            n, t = stats.get(pid, (0, 0.0))
+            stats[pid] = (n + 1, t + et)
+            yield k, results
+
+        wall = time() - t0
+        for pid, (n, t) in stats.items():
+            s = self.stats.setdefault(pid, {'scenarios': 0, 'time': 0.0})
+            s['scenarios'] += n
+            s['time'] += t
+
+        if self.verbose:
+            stdout.write('\n  worker   scenarios   busy (s)   scenarios/s')
+            stdout.write('\n --------  ---------  ----------  -----------')
+            for pid in sorted(stats):
+                n, t = stats[pid]
+                stdout.write('\n %8d  %9d  %10.3f  %11.1f' %
+                             (pid, n, t, n / t if t > 0 else 0))
+            ns = sum([n for n, _ in stats.values()])
+            stdout.write('\n %8s  %9d  %10.3f  %11.1f\n' %
+                         ('total', ns, wall, ns / wall if wall > 0 else 0))
+
+    def close(self):
+        """Shuts down the worker processes.
+        """
+        self._pool.close()
+        self._pool.join()
+
+
+class _shared_array(object):
+    """Numpy array stored in shared memory.
+    """
+
+    def __init__(self, a):
+        a = ascontiguousarray(a)
+        self.buf = RawArray(ctypes.c_char, max(a.nbytes, 1))
+        self.dtype = a.dtype.str
+        self.shape = a.shape
+        self.view()[...] = a
+
+    def view(self):
+        d = dtype(self.dtype)
+        n = 1
+        for s in self.shape:
+            n = n * s
+        return frombuffer(self.buf, d, n).reshape(self.shape)
+
+
+class _shared_sparse(object):
+    """CSR or CSC matrix stored in shared memory.
+    """
+
+    def __init__(self, A):
+        A = A.copy()
+        A.sum_duplicates()
+        A.sort_indices()
+        self.format = A.format
+        self.shape = A.shape
+        self.data = _shared_array(A.data)
+        self.indices = _shared_array(A.indices)
+        self.indptr = _shared_array(A.indptr)
+
+    def view(self):
+        fmt = csc_matrix if self.format == 'csc' else csr_matrix
+        A = fmt((self.data.view(), self.indices.view(), self.indptr.view()),
+                self.shape, copy=False)
+        A.has_sorted_indices = True
+        return A
+
+
+def _share(x):
+    """Copies the arrays and sparse matrices in C{x} to shared memory.
+    """
+    if isinstance(x, dict):
+        return dict([(k, _share(v)) for k, v in x.items()])
+    if isinstance(x, ndarray) and x.dtype.kind in 'biufc':
+        return _shared_array(x)
+    if issparse(x) and x.format in ('csr', 'csc'):
+        return _shared_sparse(x)
+    return x
+
+
+def _attach(x):
+    """Maps the shared memory copies made by L{_share}.
+    """
+    if isinstance(x, dict):
+        return dict([(k, _attach(v)) for k, v in x.items()])
+    if isinstance(x, (_shared_array, _shared_sparse)):
+        return x.view()
+    return x
+
+
+def _init(shared):
+    """Attaches a worker process to the shared model.
+    """
+    global _model
+    _model = _attach(shared)
+
+
+def _solve(task):
+    """Solves one scenario in a worker process.
+    """
+    k, scenario = task
+    t0 = time()
+
+    m = _model
+    ppc = dict(m['ppc'])
+    bus, gen = ppc['bus'].copy(), ppc['gen'].copy()
+    for col, key in [(PD, 'PD'), (QD, 'QD')]:
+        if key in scenario:
+            bus[:, col] = scenario[key][m['bon']]
+    for col, key in [(PG, 'PG'), (QG, 'QG'), (VG, 'VG')]:
+        if key in scenario:
+            gen[:, col] = scenario[key][m['gon']]
+    ppc['bus'], ppc['gen'] = bus, gen
+    ppc['branch'] = ppc['branch'].copy()
+
+    if m['opf']:
+        results = opf(ppc, m['ppopt'])
+    elif 'Ybus' not in m:
+        results, _ = runpf(ppc, m['ppopt'])
+    else:
+        results = _acpf(ppc, m)
+    del results['order']
+
+    return k, results, getpid(), time() - t0
+
+
+def _acpf(ppc, m):
+    """AC power flow using the shared admittance matrices.
+    """
+    t0 = time()
+    baseMVA, bus, gen, branch = \
+        ppc['baseMVA'], ppc['bus'], ppc['gen'], ppc['branch']
+    Ybus, Yf, Yt = m['Ybus'], m['Yf'], m['Yt']
+    ref, pv, pq = m['ref'], m['pv'], m['pq']
+    ppopt = m['ppopt']
+
+    ## initial state, all gens in the internal case are on
+    gbus = gen[:, GEN_BUS].astype(int)
+    V0 = bus[:, VM] * exp(1j * pi/180 * bus[:, VA])
+    V0[gbus] = gen[:, VG] / abs(V0[gbus]) * V0[gbus]
+
+    ## complex bus power injections [generation - load]
+    Sbus = makeSbus(baseMVA, bus, gen)
+
+    ## run the power flow
+    alg = ppopt['PF_ALG']
+    if alg == 2 or alg == 3:
+        ## factors of the B matrices are kept by the worker
+        if 'lu' not in m:
+            m['lu'] = (lufactor(), lufactor())
+        V, success, _ = fdpf(Ybus, Sbus, V0, m['Bp'], m['Bpp'],
+                             ref, pv, pq, ppopt, m['lu'])
+    elif alg == 4:
+        V, success, _ = gausspf(Ybus, Sbus, V0, ref, pv, pq, ppopt)
+    else:
+        V, success, _, _ = newtonpf(Ybus, Sbus, V0, ref, pv, pq, ppopt)
+
+    ## update data matrices with solution
+    ppc['bus'], ppc['gen'], ppc['branch'] = \
+        pfsoln(baseMVA, bus, gen, branch, Ybus, Yf, Yt, V, ref, pv, pq)
+    ppc['et'] = time() - t0
+    ppc['success'] = success
+
+    ## convert back to original bus numbering
+    results = int2ext(ppc)
+
+    ## zero out result fields of out-of-service gens & branches
+    o = results['order']
+    if len(o['gen']['status']['off']) > 0:
+        results['gen'][ix_(o['gen']['status']['off'], [PG, QG])] = 0
+    if len(o['branch']['status']['off']) > 0:
+        results['branch'][ix_(o['branch']['status']['off'],
+                              [PF, QF, PT, QT])] = 0
+
+    return results
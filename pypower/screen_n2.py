@@ -0,0 +1,167 @@
+# Copyright (C) 2011 Richard Lincoln
+#
+# PYPOWER is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published
+# by the Free Software Foundation, either version 3 of the License,
+# or (at your option) any later version.
+#
+# PYPOWER is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with PYPOWER. If not, see <http://www.gnu.org/licenses/>.
+
+"""Screens double branch outages for overloads using LODFs.
+"""
+
+from multiprocessing import Pool
+
+from numpy import zeros, arange, asarray, pi, triu_indices, repeat, tile, \
+    concatenate, c_, flatnonzero as find
+
+from pypower.bustypes import bustypes
+from pypower.makeBdc import makeBdc
+from pypower.makeSbus import makeSbus
+from pypower.dcpf import dcpf
+from pypower.lodf_chunks import lodf_chunks
+
+from pypower.idx_bus import VA, GS
+from pypower.idx_brch import RATE_A
+
+
+## data used by each worker process, see _init()
+_data = None
+
+
+def screen_n2(baseMVA, bus, gen, branch, outages=None, threshold=1.0,
+              F0=None, block=32, nproc=1, lodf=None, tol=1e-8):
+    """Screens double branch outages for overloads using LODFs.
+
+    Computes the DC flows after the simultaneous outage of each pair of
+    branches in C{outages} (all branches by default), for a case in
+    internal indexing, from the single outage LODFs with the compound
+    outage formula::
+
+        dF_l = ((L_lk + L_lm L_mk) F_k + (L_lm + L_lk L_km) F_m)
+               / (1 - L_km L_mk)
+
+    where C{L} is the LODF matrix and C{F} the pre-outage flows: the DC
+    power flow solution of the case, or C{F0} (MW) if given. The pairs
+    are evaluated in vectorized blocks of C{block} by C{block} outages,
+    which bounds the working memory to C{nl x block^2} values.
+
+    The LODF columns of the outages are computed once by L{lodf_chunks},
+    into memory or, if C{lodf} is the name of a file, into a memory-mapped
+    array, so that they need not fit in memory. Blocks are distributed
+    over C{nproc} worker processes if it is greater than 1.
+
+    Returns two arrays. The first lists the overloads, one row per pair
+    and branch whose flow exceeds C{threshold} times its C{RATE_A}
+    rating (branches with a zero rating are not monitored), with columns:
+    the two outaged branches, the overloaded branch, its post-outage flow
+    in MW and its rating. The second lists the pairs (as two columns of
+    branch indices) whose outage splits the network into islands,
+    including pairs in which either branch is a bridge by itself; their
+    flows are not evaluated. Branch indices are rows of C{branch}.
+
+    @see: L{lodf_chunks}, L{runcontingency}
+    """
+    nl = branch.shape[0]
+    if outages is None:
+        outages = arange(nl)
+    outages = asarray(outages, int).flatten()
+    no = len(outages)
+
+    ## base case DC flows
+    if F0 is None:
+        ref, pv, pq = bustypes(bus, gen)
+        B, Bf, Pbusinj, Pfinj = makeBdc(baseMVA, bus, branch)
+        Pbus = makeSbus(baseMVA, bus, gen).real - Pbusinj - \
+            bus[:, GS] / baseMVA
+        Va = dcpf(B, Pbus, bus[:, VA] * (pi / 180), ref, pv, pq)
+        F0 = (Bf * Va + Pfinj) * baseMVA
+
+    ## LODF columns of the outaged branches
+    L, bridge = lodf_chunks(baseMVA, bus, branch, outages, out=lodf, tol=tol)
+
+    ## blocks of pairs (i, j), i < j, of positions in outages
+    starts = range(0, no, block)
+    tasks = [(a, b) for ia, a in enumerate(starts) for b in starts[ia:]]
+
+    data = {
+        'L': L,
+        'bridge': bridge,
+        'outages': outages,
+        'F0': F0,
+        'rate': branch[:, RATE_A],
+        'threshold': threshold,
+        'block': block,
+        'tol': tol
+    }
+    if nproc > 1 and len(tasks) > 1:
+        pool = Pool(nproc, _init, (data,))
+        results = pool.map(_screen, tasks)
+        pool.close()
+        pool.join()
+    else:
+        _init(data)
+        results = map(_screen, tasks)
+
+    viol = [v for v, _ in results if len(v)]
+    isl = [i for _, i in results if len(i)]
+    viol = concatenate(viol) if viol else zeros((0, 5))
+    isl = concatenate(isl) if isl else zeros((0, 2), int)
+
+    return viol, isl
+
+
+def _init(data):
+    """Sets up the data used to screen blocks in a process.
+    """
+    global _data
+    _data = data
+
+
+def _screen(task):
+    """Screens the pairs of outages of one block.
+    """
+    a, b = task
+    d = _data
+    L, outages, F0, rate, tol = \
+        d['L'], d['outages'], d['F0'], d['rate'], d['tol']
+    lim = rate * d['threshold']
+    no = len(outages)
+    A = arange(a, min(a + d['block'], no))
+    B = arange(b, min(b + d['block'], no))
+    k, m = outages[A], outages[B]
+
+    ## pairs of the block, each pair once
+    if a == b:
+        i, j = triu_indices(len(A), 1)
+    else:
+        i = repeat(arange(len(A)), len(B))
+        j = tile(arange(len(B)), len(A))
+    LA, LB = asarray(L[:, A]), asarray(L[:, B])
+    Lkm = LB[k[i], j]       ## L[k, m], flow change on k per unit flow on m
+    Lmk = LA[m[j], i]       ## L[m, k]
+    D = 1 - Lkm * Lmk
+
+    ## pairs that split the network
+    isl = (abs(D) < tol) | d['bridge'][A[i]] | d['bridge'][B[j]]
+    islands = c_[k[i[isl]], m[j[isl]]]
+    i, j, Lkm, Lmk, D = i[~isl], j[~isl], Lkm[~isl], Lmk[~isl], D[~isl]
+
+    ## post-outage flows of the monitored branches, nm x npairs
+    mon = find(rate > 0)
+    Fk, Fm = F0[k[i]], F0[m[j]]
+    ck = (Fk + Lkm * Fm) / D
+    cm = (Fm + Lmk * Fk) / D
+    F = F0[mon, None] + LA[mon][:, i] * ck + LB[mon][:, j] * cm
+
+    over = abs(F) > lim[mon, None]
+    l, p = over.nonzero()
+    viol = c_[k[i[p]], m[j[p]], mon[l], F[l, p], rate[mon[l]]]
+
+    return viol, islands
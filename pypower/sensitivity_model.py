@@ -0,0 +1,187 @@
+# Copyright (C) 2011 Richard Lincoln
+#
+# PYPOWER is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published
+# by the Free Software Foundation, either version 3 of the License,
+# or (at your option) any later version.
+#
+# PYPOWER is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with PYPOWER. If not, see <http://www.gnu.org/licenses/>.
+
+"""DC sensitivity factors of a network, cached by topology.
+"""
+
+from collections import OrderedDict
+
+from numpy import arange, asarray, isscalar, flatnonzero as find
+
+from pypower.casehash import casehash
+from pypower.makePTDF import makePTDF
+
+from pypower.idx_bus import BUS_TYPE, REF
+from pypower.idx_brch import F_BUS, T_BUS, BR_STATUS
+from pypower.idx_gen import GEN_BUS
+
+
+class sensitivity_model(object):
+    """DC sensitivity factors of a network, cached by topology.
+
+    Computes the DC power transfer distribution factors (PTDF) of a case in
+    internal indexing once, for the reference bus as slack, and derives
+    from them, without further factorizations::
+
+        sm = sensitivity_model(baseMVA, bus, gen, branch)
+        H = sm.ptdf(slack=w)                ## distributed slack
+        L = sm.lodf(outages)                ## line outage factors
+        O = sm.otdf(k, slack=w)             ## PTDF after the outage of k
+        G = sm.gsdf(slack=w)                ## generation shift factors
+        sm.set_branch_status(l, 0)          ## new topology
+
+    The C{slack} of L{ptdf}, L{otdf} and L{gsdf} is a bus index or a vector
+    of weights (see L{makePTDF}); by default the reference bus is used.
+    The PTDF for another slack is obtained by subtracting from each column
+    the flows due to a unit injection at the slack bus, or the weighted
+    combination of them, so changing the slack is a single vectorized
+    operation on the cached matrix.
+
+    The factors of each topology are cached under the L{casehash} of the
+    case. L{set_branch_status} changes the topology, so that later queries
+    use (and compute, if needed) the factors of the new topology, while
+    those of the previous one stay cached for when it is restored. At most
+    C{maxsize} topologies are kept, the least recently used being evicted
+    first.
+
+    @see: L{makePTDF}, L{makeLODF}, L{lodf_chunks}
+    """
+
+    def __init__(self, baseMVA, bus, gen, branch, maxsize=4, tol=1e-8):
+        self.baseMVA = baseMVA
+        self.bus = bus
+        self.gen = gen
+        self.branch = branch.copy()
+
+        #: maximum number of topologies cached
+        self.maxsize = maxsize
+
+        #: tolerance used to detect bridge branches, see L{lodf_chunks}
+        self.tol = tol
+
+        #: numbers of queries that found and did not find cached factors
+        self.hits = 0
+        self.misses = 0
+
+        self._cache = OrderedDict()
+
+    def key(self):
+        """Returns the L{casehash} of the current topology.
+        """
+        return casehash(self.baseMVA, self.bus, self.gen, self.branch)
+
+    def set_branch_status(self, l, status):
+        """Puts branches C{l} in (C{status = 1}) or out of (C{0}) service.
+        """
+        self.branch[l, BR_STATUS] = status
+
+    def clear(self):
+        """Removes all cached factors.
+        """
+        self._cache.clear()
+        self.hits = 0
+        self.misses = 0
+
+    def ptdf(self, slack=None, bus_idx=None, branch_idx=None):
+        """Returns the PTDF matrix for the given C{slack}, with the rows of
+        C{branch_idx} and the columns of C{bus_idx} (all by default).
+        """
+        H = self._factors()['H']
+        if branch_idx is not None:
+            H = H[asarray(branch_idx, int), :]
+        H = self._slack(H, slack)
+        if bus_idx is not None:
+            H = H[:, asarray(bus_idx, int)]
+        return H
+
+    def lodf(self, outages=None, branch_idx=None):
+        """Returns the LODF columns of the branches C{outages} (all by
+        default), with the rows of C{branch_idx}, and the bridge flags of
+        the outages. Bridge outages have zero columns with C{-1} for the
+        outaged branch, as in L{lodf_chunks}.
+        """
+        c = self._factors()
+        if 'L' not in c:
+            c['L'], c['bridge'] = \
+                self._lodf(c['H'], arange(self.branch.shape[0]))
+        L, bridge = c['L'], c['bridge']
+        if outages is not None:
+            outages = asarray(outages, int)
+            L, bridge = L[:, outages], bridge[outages]
+        if branch_idx is not None:
+            L = L[asarray(branch_idx, int), :]
+        return L, bridge
+
+    def otdf(self, outage, slack=None, bus_idx=None, branch_idx=None):
+        """Returns the outage transfer distribution factors for the outage
+        of branch C{outage}, the PTDF of the network without it, with the
+        rows of C{branch_idx} and the columns of C{bus_idx}.
+        """
+        H = self.ptdf(slack, bus_idx)
+        L, _ = self.lodf([outage])
+        O = H + L * H[outage, :]
+        if branch_idx is not None:
+            O = O[asarray(branch_idx, int), :]
+        return O
+
+    def gsdf(self, slack=None, gen_idx=None, branch_idx=None):
+        """Returns the generation shift factors, the changes in branch
+        flows per unit increase of the output of each generator (or those
+        of C{gen_idx}), balanced by the C{slack}.
+        """
+        gbus = self.gen[:, GEN_BUS].astype(int)
+        if gen_idx is not None:
+            gbus = gbus[asarray(gen_idx, int)]
+        return self.ptdf(slack, gbus, branch_idx)
+
+    def _factors(self):
+        """Returns the cached factors of the current topology.
+        """
+        key = self.key()
+        c = self._cache.pop(key, None)
+        if c is None:
+            self.misses += 1
+            slack = find(self.bus[:, BUS_TYPE] == REF)[0]
+            c = {'H': makePTDF(self.baseMVA, self.bus, self.branch, slack)}
+        else:
+            self.hits += 1
+        self._cache[key] = c            ## most recently used
+        while len(self._cache) > max(self.maxsize, 1):
+            self._cache.popitem(last=False)
+        return c
+
+    def _slack(self, H, slack):
+        """Converts PTDF columns from the reference bus to C{slack}.
+        """
+        if slack is None:
+            return H
+        if isscalar(slack):
+            return H - H[:, [slack]]
+        w = asarray(slack, float)
+        return H - (H.dot(w) / w.sum())[:, None]
+
+    def _lodf(self, H, outages):
+        """LODF columns of C{outages} from the PTDF C{H}.
+        """
+        f = self.branch[outages, F_BUS].astype(int)
+        t = self.branch[outages, T_BUS].astype(int)
+        n = arange(len(outages))
+        L = H[:, f] - H[:, t]
+        h = L[outages, n]
+        bridge = abs(1 - h) < self.tol
+        L[:, bridge] = 0
+        L[:, ~bridge] = L[:, ~bridge] / (1 - h[~bridge])
+        L[outages, n] = -1
+        return L, bridge
@@ -0,0 +1,152 @@
+# Copyright (C) 2011 Richard Lincoln
+#
+# PYPOWER is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published
+# by the Free Software Foundation, either version 3 of the License,
+# or (at your option) any later version.
+#
+# PYPOWER is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with PYPOWER. If not, see <http://www.gnu.org/licenses/>.
+
+"""Tests for C{ac_sensitivity}.
+"""
+
+from numpy import array, zeros, conj, c_
+
+from pypower.case30 import case30
+from pypower.ext2int import ext2int
+from pypower.ppoption import ppoption
+from pypower.bustypes import bustypes
+from pypower.makeYbus import makeYbus
+from pypower.makeSbus import makeSbus
+from pypower.newtonpf import newtonpf
+from pypower.runpf import runpf
+from pypower.warmstart_cache import runpf_cache
+from pypower.lufactor import lufactor
+from pypower.ac_sensitivity import ac_sensitivity
+
+from pypower.idx_bus import VM
+from pypower.idx_brch import F_BUS, T_BUS
+
+from pypower.t.t_begin import t_begin
+from pypower.t.t_is import t_is
+from pypower.t.t_ok import t_ok
+from pypower.t.t_end import t_end
+
+
+def t_ac_sensitivity(quiet=False):
+    """Tests for C{ac_sensitivity}.
+
+    Compares the sensitivities with finite differences of power flow
+    solutions.
+    """
+    t_begin(22, quiet)
+
+    ppopt = ppoption(VERBOSE=0, OUT_ALL=0, PF_TOL=1e-12)
+    ppc = ext2int(case30())
+    baseMVA, bus, gen, branch = \
+        ppc['baseMVA'], ppc['bus'], ppc['gen'], ppc['branch']
+    Ybus, Yf, Yt = makeYbus(baseMVA, bus, branch)
+    ref, pv, pq = bustypes(bus, gen)
+    Sbus = makeSbus(baseMVA, bus, gen)
+    f = branch[:, F_BUS].astype(int)
+    tb = branch[:, T_BUS].astype(int)
+    V0, success, _, info = newtonpf(Ybus, Sbus, bus[:, VM] + 0j, ref, pv, pq,
+                                    ppopt)
+
+    ## finite differences w.r.t. injections at buses inj
+    inj = array([3, 17, pv[0], ref[0], pq[5]])
+    ib = array([2, 20, 29, 0, pv[1]])
+    il = array([12, 0, 25, 7])
+    h = 1e-6
+    n = len(inj)
+    dVa, dVm, dSf, dSt, lf = [], [], [], [], []
+    for q in [1, 1j]:
+        for k in inj:
+            S = Sbus.copy()
+            S[k] += q * h
+            V = newtonpf(Ybus, S, V0, ref, pv, pq, ppopt)[0]
+            dV = V / V0
+            dVa.append(dV.imag / h)        ## angle & relative magnitude
+            dVm.append((abs(V) - abs(V0)) / h)
+            Sf0 = V0[f] * conj(Yf * V0)
+            St0 = V0[tb] * conj(Yt * V0)
+            dSf.append((V[f] * conj(Yf * V) - Sf0) / h)
+            dSt.append((V[tb] * conj(Yt * V) - St0) / h)
+            Sref = V[ref] * conj(Ybus[ref, :] * V)
+            Sref0 = V0[ref] * conj(Ybus[ref, :] * V0)
+            lf.append(1 + (Sref - Sref0).real.sum() / h)
+    dVa, dVm, dSf, dSt = [array(x).T for x in (dVa, dVm, dSf, dSt)]
+    lf = array(lf[:n])
+    lf[inj == ref[0]] = 0
+
+    for name, lu in [('', None), ('newtonpf factors : ', info['lu'])]:
+        s = ac_sensitivity(Ybus, V0, ref, pv, pq, lu, Yf, Yt, branch)
+        t = name + 'dV_dP : '
+        a, m = s.dV_dP(inj, ib)
+        t_is(c_[a, m], c_[dVa[ib, :n], dVm[ib, :n]], 5, t)
+        t = name + 'dV_dQ : '
+        a, m = s.dV_dQ(inj, ib)
+        t_is(c_[a, m], c_[dVa[ib, n:], dVm[ib, n:]], 5, t)
+        t = name + 'dSbr_dP : '
+        Sf, St = s.dSbr_dP(inj, il)
+        t_is(c_[Sf, St], c_[dSf[il, :n], dSt[il, :n]], 5, t)
+        t = name + 'dSbr_dQ : '
+        Sf, St = s.dSbr_dQ(inj)
+        t_is(c_[Sf, St], c_[dSf[:, n:], dSt[:, n:]], 5, t)
+        t = name + 'loss_factors : '
+        t_is(s.loss_factors(inj), lf, 5, t)
+
+    t = 'all buses : '
+    a, m = s.dV_dP()
+    t_is(a[ib][:, inj], dVa[ib, :n], 5, t)
+    t_is(s.loss_factors()[inj], lf, 5, t)
+
+    t = 'runpf : '
+    r, success = runpf(case30(), ppopt)
+    t_ok(success and r['newton']['lu'] is not None, [t, 'Jacobian factors'])
+    s = ac_sensitivity(Ybus, V0, ref, pv, pq, r['newton']['lu'])
+    t_is(s.loss_factors(inj), lf, 5, [t, 'loss factors'])
+
+    ## starting from a solution, no Jacobian is factored
+    t = 'converged V0 : '
+    _, success, i, info = newtonpf(Ybus, Sbus, V0, ref, pv, pq, ppopt)
+    t_ok(success and i == 0 and info['lu'] is None, [t, 'no factors'])
+    s = ac_sensitivity(Ybus, V0, ref, pv, pq, info['lu'])
+    t_is(s.loss_factors(inj), lf, 5, [t, 'loss factors'])
+    s = ac_sensitivity(Ybus, V0, ref, pv, pq, lufactor())
+    t_is(s.loss_factors(inj), lf, 5, [t, 'unfactored lu'])
+
+    ## factors reused at the last iteration are not returned
+    t = 'PF_NR_REUSE : '
+    ppopt3 = ppoption(ppopt, PF_NR_REUSE=3, PF_MAX_IT=2)
+    _, _, i, info = newtonpf(Ybus, Sbus, bus[:, VM] + 0j, ref, pv, pq, ppopt3)
+    t_ok(i == 2 and info['nfactor'] == 1 and info['lu'] is None,
+         [t, 'no factors after reused iteration'])
+    ppopt3 = ppoption(ppopt3, PF_MAX_IT=30)
+    V, success, _, info = newtonpf(Ybus, Sbus, bus[:, VM] + 0j, ref, pv, pq,
+                                   ppopt3)
+    t_ok(success, [t, 'success'])
+    s = ac_sensitivity(Ybus, V, ref, pv, pq, info['lu'])
+    t_is(s.loss_factors(inj), lf, 5, [t, 'loss factors'])
+
+    t = 'runpf warm start : '
+    runpf_cache.clear()
+    ppopt2 = ppoption(ppopt, PF_WARM_START=1)
+    runpf(case30(), ppopt2)
+    r, success = runpf(case30(), ppopt2)
+    t_ok(success and r['newton']['nfactor'] == 0, [t, 'no factorization'])
+    s = ac_sensitivity(Ybus, V0, ref, pv, pq, r['newton']['lu'])
+    t_is(s.loss_factors(inj), lf, 5, [t, 'loss factors'])
+    runpf_cache.clear()
+
+    t_end()
+
+
+if __name__ == '__main__':
+    t_ac_sensitivity(quiet=False)
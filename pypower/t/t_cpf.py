@@ -0,0 +1,118 @@
+# Copyright (C) 2011 Richard Lincoln
+#
+# PYPOWER is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published
+# by the Free Software Foundation, either version 3 of the License,
+# or (at your option) any later version.
+#
+# PYPOWER is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with PYPOWER. If not, see <http://www.gnu.org/licenses/>.
+
+"""Tests for continuation power flow.
+"""
+
+from numpy import conj, diff, exp, pi, abs, all
+
+from pypower.case9 import case9
+from pypower.ext2int import ext2int
+from pypower.ppoption import ppoption
+from pypower.bustypes import bustypes
+from pypower.makeYbus import makeYbus
+from pypower.makeSbus import makeSbus
+from pypower.newtonpf import newtonpf
+from pypower.cpf import cpf
+from pypower.runcpf import runcpf
+from pypower.runpf import runpf
+
+from pypower.idx_bus import PD, QD, VM, VA
+from pypower.idx_gen import PG, VG, GEN_BUS
+
+from pypower.t.t_begin import t_begin
+from pypower.t.t_is import t_is
+from pypower.t.t_ok import t_ok
+from pypower.t.t_end import t_end
+
+
+def t_cpf(quiet=False):
+    """Tests for continuation power flow.
+    """
+    t_begin(14, quiet)
+
+    ppopt = ppoption(VERBOSE=0, OUT_ALL=0)
+    ppc = ext2int(case9())
+    baseMVA, bus, gen, branch = \
+        ppc['baseMVA'], ppc['bus'], ppc['gen'], ppc['branch']
+    target = case9()
+    target['bus'][:, [PD, QD]] *= 2
+    target['gen'][:, PG] *= 2
+    Ybus, _, _ = makeYbus(baseMVA, bus, branch)
+    ref, pv, pq = bustypes(bus, gen)
+    Sbusb = makeSbus(baseMVA, bus, gen)
+    Sbust = makeSbus(baseMVA, target['bus'], target['gen'])
+    gbus = gen[:, GEN_BUS].astype(int)
+    V0 = bus[:, VM] * exp(1j * pi/180 * bus[:, VA])
+    V0[gbus] = gen[:, VG] / abs(V0[gbus]) * V0[gbus]
+    V0 = newtonpf(Ybus, Sbusb, V0, ref, pv, pq, ppopt)[0]
+
+    def maxmis(V, lam):
+        S = Sbusb + lam * (Sbust - Sbusb)
+        mis = V * conj(Ybus * V) - S
+        return max(abs(mis[pv].real).max(), abs(mis[pq]).max())
+
+    t = 'nose : '
+    V, lam, success, info = cpf(Ybus, Sbusb, Sbust, V0, ref, pv, pq, ppopt)
+    t_ok(success and info['event'] == 'NOSE', [t, 'success'])
+    lams, max_lam = info['lam'], info['max_lam']
+    t_ok(all(diff(lams[:-1]) > 0) and lams[-1] < lams[-2],
+         [t, 'lambda increases up to the nose'])
+    t_ok(max([maxmis(info['V'][:, k], lams[k])
+              for k in range(len(lams))]) < 1e-8, [t, 'points on the curve'])
+    Vn = info['V'][:, lams.argmax()]
+    _, ok, _, _ = newtonpf(Ybus, Sbusb + 0.999 * max_lam * (Sbust - Sbusb),
+                           Vn, ref, pv, pq, ppopt)
+    t_ok(ok, [t, 'power flow solvable just below the nose'])
+    _, ok, _, _ = newtonpf(Ybus, Sbusb + 1.001 * max_lam * (Sbust - Sbusb),
+                           Vn, ref, pv, pq, ppopt)
+    t_ok(not ok, [t, 'no power flow solution beyond the nose'])
+
+    t = 'local parameterization : '
+    opt = ppoption(ppopt, CPF_PARAMETERIZATION=1)
+    _, _, success, info = cpf(Ybus, Sbusb, Sbust, V0, ref, pv, pq, opt)
+    t_ok(success, [t, 'success'])
+    t_is(info['max_lam'], max_lam, 3, [t, 'max lambda'])
+
+    t = 'fixed step : '
+    opt = ppoption(ppopt, CPF_ADAPT_STEP=False)
+    _, _, success, info = cpf(Ybus, Sbusb, Sbust, V0, ref, pv, pq, opt)
+    t_ok(success, [t, 'success'])
+    t_is(info['max_lam'], max_lam, 3, [t, 'max lambda'])
+
+    t = 'full curve : '
+    opt = ppoption(ppopt, CPF_STOP_AT='FULL')
+    V, lam, success, info = cpf(Ybus, Sbusb, Sbust, V0, ref, pv, pq, opt)
+    t_ok(success and info['event'] == 'FULL' and lam == 0,
+         [t, 'back to lambda = 0'])
+    t_ok(maxmis(V, 0) < 1e-8 and all(abs(V[pq]) < abs(V0[pq])),
+         [t, 'low voltage solution'])
+
+    t = 'runcpf : '
+    opt = ppoption(ppopt, CPF_STOP_AT=1.0)
+    r, success = runcpf(case9(), target, opt)
+    t_ok(success and r['cpf']['event'] == 'TARGET', [t, 'success'])
+    rt, _ = runpf(target, ppopt)
+    t_is(r['bus'][:, [PD, QD, VM, VA]], rt['bus'][:, [PD, QD, VM, VA]], 6,
+         [t, 'solution at target'])
+    r, success = runcpf(case9(), None, opt)
+    t_is(r['bus'][:, [VM, VA]], rt['bus'][:, [VM, VA]], 6,
+         [t, 'default target'])
+
+    t_end()
+
+
+if __name__ == '__main__':
+    t_cpf(quiet=False)
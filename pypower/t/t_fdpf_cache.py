@@ -0,0 +1,124 @@
+# Copyright (C) 2011 Richard Lincoln
+#
+# PYPOWER is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published
+# by the Free Software Foundation, either version 3 of the License,
+# or (at your option) any later version.
+#
+# PYPOWER is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with PYPOWER. If not, see <http://www.gnu.org/licenses/>.
+
+"""Tests for C{fdpf_cache}.
+"""
+
+from numpy import exp, pi
+
+from pypower.case9 import case9
+from pypower.case30 import case30
+from pypower.loadcase import loadcase
+from pypower.ext2int import ext2int
+from pypower.ppoption import ppoption
+from pypower.runpf import runpf
+from pypower.bustypes import bustypes
+from pypower.makeYbus import makeYbus
+from pypower.makeSbus import makeSbus
+from pypower.makeB import makeB
+from pypower.fdpf import fdpf
+from pypower.lufactor import lufactor
+from pypower.fdpf_cache import fdpf_cache, runpf_fdpf_cache
+
+from pypower.idx_bus import PD, QD, VM, VA
+from pypower.idx_brch import BR_STATUS
+
+from pypower.t.t_begin import t_begin
+from pypower.t.t_is import t_is
+from pypower.t.t_ok import t_ok
+from pypower.t.t_end import t_end
+
+
+def t_fdpf_cache(quiet=False):
+    """Tests for C{fdpf_cache}.
+    """
+    t_begin(15, quiet)
+
+    ppc = loadcase(case30())
+    ppci = ext2int(ppc)
+    baseMVA, bus, gen, branch = \
+        ppci['baseMVA'], ppci['bus'], ppci['gen'], ppci['branch']
+    ref, pv, pq = bustypes(bus, gen)
+    ppopt = ppoption(VERBOSE=0, OUT_ALL=0, PF_ALG=2)
+
+    t = 'key : '
+    fc = fdpf_cache(2)
+    key = fc.key(baseMVA, bus, gen, branch, pv, pq, 2)
+    t_ok(fc.key(baseMVA, bus, gen, branch, pv, pq, 3) != key,
+         [t, 'depends on algorithm'])
+    t_ok(fc.key(baseMVA, bus, gen, branch, pv[1:], pq, 2) != key,
+         [t, 'depends on bus types'])
+    branch2 = branch.copy()
+    branch2[3, BR_STATUS] = 0
+    t_ok(fc.key(baseMVA, bus, gen, branch2, pv, pq, 2) != key,
+         [t, 'depends on branch status'])
+
+    t = 'fdpf : '
+    Ybus, _, _ = makeYbus(baseMVA, bus, branch)
+    Sbus = makeSbus(baseMVA, bus, gen)
+    V0 = bus[:, VM] * exp(1j * pi / 180 * bus[:, VA])
+    Bp, Bpp = makeB(baseMVA, bus, branch, 2)
+    V1, success, i1 = fdpf(Ybus, Sbus, V0.copy(), Bp, Bpp, ref, pv, pq, ppopt)
+    lu = (lufactor(), lufactor())
+    fdpf(Ybus, Sbus, V0.copy(), Bp, Bpp, ref, pv, pq, ppopt, lu)
+    t_ok(lu[0].nfactor == 1 and lu[1].nfactor == 1, [t, 'factors kept'])
+    V2, success, i2 = fdpf(Ybus, 1.05 * Sbus, V0.copy(), None, None,
+                           ref, pv, pq, ppopt, lu)
+    V3, _, _ = fdpf(Ybus, 1.05 * Sbus, V0.copy(), Bp, Bpp, ref, pv, pq, ppopt)
+    t_ok(success and lu[0].nfactor == 1 and lu[1].nfactor == 1,
+         [t, 'factors reused'])
+    t_is(V2, V3, 12, [t, 'V with reused factors'])
+
+    t = 'LRU : '
+    fc.put('a', lu)
+    fc.put('b', lu)
+    t_ok(fc.get('a') is lu, [t, 'get'])
+    fc.put('c', lu)
+    t_ok(len(fc) == 2 and fc.get('b') is None, [t, 'least recent evicted'])
+    t_ok(fc.hits == 1 and fc.misses == 1, [t, 'hits and misses'])
+
+    t = 'runpf : '
+    runpf_fdpf_cache.clear()
+    ppopt = ppoption(ppopt, PF_FD_CACHE=4)
+    r1, success = runpf(ppc, ppopt)
+    t_ok(success and len(runpf_fdpf_cache) == 1, [t, 'factors cached'])
+    ppc2 = loadcase(ppc)
+    ppc2['bus'][:, [PD, QD]] = 1.05 * ppc2['bus'][:, [PD, QD]]
+    r2, success = runpf(ppc2, ppopt)
+    r0, _ = runpf(ppc2, ppoption(ppopt, PF_FD_CACHE=0))
+    t_ok(success and runpf_fdpf_cache.hits == 1, [t, 'factors reused'])
+    t_is(r2['bus'][:, [VM, VA]], r0['bus'][:, [VM, VA]], 12, [t, 'V'])
+
+    ## no factors are cached by a power flow that starts from a solution
+    t = 'runpf from solution : '
+    runpf_fdpf_cache.clear()
+    ppc9 = loadcase(case9())
+    r0, _ = runpf(ppc9, ppoption(ppopt, PF_FD_CACHE=0))
+    ppc9['bus'][:, [VM, VA]] = r0['bus'][:, [VM, VA]]
+    r1, success = runpf(ppc9, ppopt)
+    t_ok(success and len(runpf_fdpf_cache) == 0, [t, 'nothing cached'])
+    ppc9['bus'][:, [PD, QD]] = 1.05 * ppc9['bus'][:, [PD, QD]]
+    r2, success = runpf(ppc9, ppopt)
+    r0, _ = runpf(ppc9, ppoption(ppopt, PF_FD_CACHE=0))
+    t_ok(success and len(runpf_fdpf_cache) == 1, [t, 'perturbed load'])
+    t_is(r2['bus'][:, [VM, VA]], r0['bus'][:, [VM, VA]], 12, [t, 'V'])
+
+    runpf_fdpf_cache.clear()
+
+    t_end()
+
+
+if __name__ == '__main__':
+    t_fdpf_cache(quiet=False)
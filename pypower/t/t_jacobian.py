@@ -17,7 +17,8 @@
 """Numerical tests of partial derivative code.
 """
 
-from numpy import ones, conj, eye, exp, pi, array
+from numpy import ones, conj, eye, exp, pi, array, r_, ix_
+from numpy import flatnonzero as find
 
 from pypower.case30 import case30
 from pypower.ppoption import ppoption
@@ -29,8 +30,10 @@ from pypower.dSbus_dV import dSbus_dV
 from pypower.dSbr_dV import dSbr_dV
 from pypower.dAbr_dV import dAbr_dV
 from pypower.dIbr_dV import dIbr_dV
+from pypower.makeJidx import makeJidx
+from pypower.makeJac import makeJac
 
-from pypower.idx_bus import VM, VA
+from pypower.idx_bus import BUS_TYPE, PV, PQ, VM, VA
 from pypower.idx_brch import F_BUS, T_BUS
 
 from pypower.t.t_begin import t_begin
@@ -44,7 +47,7 @@ def t_jacobian(quiet=False):
     @author: Ray Zimmerman (PSERC Cornell)
     @author: Richard Lincoln
     """
-    t_begin(28, quiet)
+    t_begin(30, quiet)
 
     ## run powerflow to get solved case
     ppopt = ppoption(VERBOSE=0, OUT_ALL=0)
@@ -93,6 +96,24 @@ def t_jacobian(quiet=False):
     t_is(dSbus_dVm_full, num_dSbus_dVm, 5, 'dSbus_dVm (full)')
     t_is(dSbus_dVa_full, num_dSbus_dVa, 5, 'dSbus_dVa (full)')
 
+    ##-----  check makeJac code  -----
+    pv = find(bus[:, BUS_TYPE] == PV)
+    pq = find(bus[:, BUS_TYPE] == PQ)
+    pvpq = r_[pv, pq]
+    J_full = r_[
+        r_['1', dSbus_dVa_sp[ix_(pvpq, pvpq)].real, dSbus_dVm_sp[ix_(pvpq, pq)].real],
+        r_['1', dSbus_dVa_sp[ix_(pq, pvpq)].imag, dSbus_dVm_sp[ix_(pq, pq)].imag]
+    ]
+    Jidx = makeJidx(Ybus, pv, pq)
+    t_is(makeJac(Ybus, V, Jidx).todense(), J_full, 12, 'makeJac')
+    V2 = V * exp(1j * 0.01)
+    dSbus_dVm2, dSbus_dVa2 = dSbus_dV(Ybus, V2)
+    J2_full = r_[
+        r_['1', dSbus_dVa2[ix_(pvpq, pvpq)].real.todense(), dSbus_dVm2[ix_(pvpq, pq)].real.todense()],
+        r_['1', dSbus_dVa2[ix_(pq, pvpq)].imag.todense(), dSbus_dVm2[ix_(pq, pq)].imag.todense()]
+    ]
+    t_is(makeJac(Ybus, V2, Jidx).todense(), J2_full, 12, 'makeJac (refill)')
+
     ##-----  check dSbr_dV code  -----
     ## full matrices
     dSf_dVa_full, dSf_dVm_full, dSt_dVa_full, dSt_dVm_full, _, _ = \
@@ -0,0 +1,95 @@
+# Copyright (C) 2011 Richard Lincoln
+#
+# PYPOWER is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published
+# by the Free Software Foundation, either version 3 of the License,
+# or (at your option) any later version.
+#
+# PYPOWER is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with PYPOWER. If not, see <http://www.gnu.org/licenses/>.
+
+"""Tests for C{lodf_chunks}.
+"""
+
+from os import close, remove
+from tempfile import mkstemp
+
+from numpy import arange, array, memmap, flatnonzero as find
+
+from pypower.case30 import case30
+from pypower.ext2int import ext2int
+from pypower.makePTDF import makePTDF
+from pypower.makeLODF import makeLODF
+from pypower.lodf_chunks import lodf_chunks
+
+from pypower.idx_brch import F_BUS, T_BUS
+
+from pypower.t.t_begin import t_begin
+from pypower.t.t_is import t_is
+from pypower.t.t_ok import t_ok
+from pypower.t.t_end import t_end
+
+
+def t_lodf_chunks(quiet=False):
+    """Tests for C{lodf_chunks}.
+    """
+    t_begin(9, quiet)
+
+    ppc = ext2int(case30())
+    baseMVA, bus, branch = \
+        ppc['baseMVA'], ppc['bus'].astype(float), ppc['branch'].astype(float)
+    nl = branch.shape[0]
+
+    ## dense reference, bridges have unit PTDF for their own transfer
+    H = makePTDF(baseMVA, bus, branch)
+    L0 = makeLODF(branch, H)
+    h = H[arange(nl), branch[:, F_BUS].astype(int)] - \
+        H[arange(nl), branch[:, T_BUS].astype(int)]
+    br0 = find(abs(1 - h) < 1e-8)
+
+    t = 'all outages : '
+    L, bridge = lodf_chunks(baseMVA, bus, branch, chunk=7)
+    t_ok(len(br0) > 0 and (find(bridge) == br0).all(), [t, 'bridges'])
+    ok = find(~bridge)
+    t_is(L[:, ok], L0[:, ok], 8, [t, 'LODF'])
+    t_ok((L[:, br0] == 0).sum() == len(br0) * (nl - 1) and
+         (L[br0, br0] == -1).all(), [t, 'bridge columns'])
+
+    t = 'selected outages : '
+    k = array([20, 3, ok[-1], br0[0]])
+    Lk, bk = lodf_chunks(baseMVA, bus, branch, k, chunk=3)
+    t_is(Lk, L[:, k], 12, [t, 'LODF'])
+    t_ok((bk == bridge[k]).all(), [t, 'bridges'])
+
+    t = 'callback : '
+    chunks = []
+    def cb(k, L, bridge):
+        chunks.append((k.copy(), L.copy()))
+    out, _ = lodf_chunks(baseMVA, bus, branch, k, chunk=3, callback=cb)
+    t_ok(out is None and [len(c[0]) for c in chunks] == [3, 1],
+         [t, 'chunks'])
+    t_is(chunks[1][1], L[:, k[3:]], 12, [t, 'LODF'])
+
+    t = 'memmap : '
+    fd, fname = mkstemp()
+    close(fd)
+    try:
+        Lm, _ = lodf_chunks(baseMVA, bus, branch, k, chunk=2, out=fname)
+        t_ok(isinstance(Lm, memmap), [t, 'output type'])
+        del Lm
+        Lm = memmap(fname, dtype=float, mode='r', shape=(nl, len(k)))
+        t_is(Lm, L[:, k], 12, [t, 'LODF'])
+        del Lm
+    finally:
+        remove(fname)
+
+    t_end()
+
+
+if __name__ == '__main__':
+    t_lodf_chunks(quiet=False)
@@ -0,0 +1,109 @@
+# Copyright (C) 2011 Richard Lincoln
+#
+# PYPOWER is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published
+# by the Free Software Foundation, either version 3 of the License,
+# or (at your option) any later version.
+#
+# PYPOWER is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with PYPOWER. If not, see <http://www.gnu.org/licenses/>.
+
+"""Tests for C{lufactor}.
+"""
+
+from warnings import catch_warnings, simplefilter
+
+from numpy import ones, zeros, exp, pi, r_, c_, ix_
+
+from scipy.sparse.linalg import spsolve
+
+from pypower.case30 import case30
+from pypower.loadcase import loadcase
+from pypower.ext2int import ext2int
+from pypower.bustypes import bustypes
+from pypower.makeYbus import makeYbus
+from pypower.makeBdc import makeBdc
+from pypower.makeJidx import makeJidx
+from pypower.makeJac import makeJac
+from pypower.lufactor import lufactor
+from pypower.dcpf import dcpf
+
+from pypower.idx_bus import PD, VM, VA
+
+from pypower.t.t_begin import t_begin
+from pypower.t.t_is import t_is
+from pypower.t.t_ok import t_ok
+from pypower.t.t_end import t_end
+
+
+def t_lufactor(quiet=False):
+    """Tests for C{lufactor}.
+    """
+    t_begin(14, quiet)
+
+    ppc = ext2int(loadcase(case30()))
+    baseMVA, bus, gen, branch = \
+        ppc['baseMVA'], ppc['bus'], ppc['gen'], ppc['branch']
+    ref, pv, pq = bustypes(bus, gen)
+    Ybus, _, _ = makeYbus(baseMVA, bus, branch)
+    V = bus[:, VM] * exp(1j * pi / 180 * bus[:, VA])
+
+    Jidx = makeJidx(Ybus, pv, pq)
+    J = makeJac(Ybus, V, Jidx).copy()
+    b = ones(J.shape[0])
+    B0 = c_[b, r_[1:J.shape[0] + 1]]
+
+    t = 'SUPERLU : '
+    lu = lufactor('SUPERLU')
+    t_is(lu.factor(J).solve(b), spsolve(J, b), 10, [t, 'solve'])
+    t_is(lu.solve(B0, True), spsolve(J.T.tocsc(), B0), 10,
+         [t, 'transposed solve'])
+    t_ok(lu.nanalyse == 1 and lu.nfactor == 1, [t, 'first factor'])
+
+    J2 = makeJac(Ybus, V * exp(1j * 0.05), Jidx)
+    t_is(lu.factor(J2).solve(b), spsolve(J2, b), 10, [t, 'refactor'])
+    t_ok(lu.nanalyse == 1 and lu.nfactor == 2, [t, 'ordering reused'])
+    t_is(lu.solve(B0, True), spsolve(J2.T.tocsc(), B0), 10,
+         [t, 'transposed solve, refactored'])
+
+    B = c_[b, r_[1:J.shape[0] + 1]]
+    t_is(lu.solve(B), spsolve(J2.tocsc(), B), 10, [t, 'multiple rhs'])
+
+    lu.factor(J2.tocsc())
+    t_ok(lu.nanalyse == 2, [t, 'new analysis on format change'])
+    t_is(lu.solve(b), spsolve(J2, b), 10, [t, 'solve csc'])
+
+    ## no ordering is kept from a singular first factorization
+    lu = lufactor('SUPERLU')
+    J0 = J.copy()
+    J0.data[:] = 0
+    with catch_warnings():
+        simplefilter('ignore')
+        lu.factor(J0)
+    t_ok(lu.nanalyse == 1 and not lu.same_pattern(J), [t, 'singular'])
+    t_is(lu.factor(J).solve(b), spsolve(J, b), 10,
+         [t, 'new analysis after singular'])
+
+    t = 'dcpf : '
+    Bbus, _, _, _ = makeBdc(baseMVA, bus, branch)
+    Pbus = -bus[:, PD] / baseMVA
+    Va0 = zeros(bus.shape[0])
+    pvpq = r_[pv, pq]
+    Va_ref = zeros(bus.shape[0])
+    Va_ref[pvpq] = spsolve(Bbus[ix_(pvpq, pvpq)].tocsc(), Pbus[pvpq])
+    lu = lufactor()
+    t_is(dcpf(Bbus, Pbus, Va0, ref, pv, pq, lu), Va_ref, 10, [t, 'Va'])
+    t_is(dcpf(Bbus, 2 * Pbus, Va0, ref, pv, pq, lu), 2 * Va_ref, 10,
+         [t, 'Va, reused factor'])
+    t_ok(lu.nanalyse == 1 and lu.nfactor == 2, [t, 'ordering reused'])
+
+    t_end()
+
+
+if __name__ == '__main__':
+    t_lufactor(quiet=False)
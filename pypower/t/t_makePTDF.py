@@ -19,7 +19,8 @@
 
 from os.path import dirname, join
 
-from numpy import ones, zeros, eye, arange, dot, matrix, flatnonzero as find
+from numpy import ones, zeros, eye, arange, dot, matrix, array, ix_, \
+    flatnonzero as find
 
 from scipy.sparse import csr_matrix as sparse
 
@@ -42,7 +43,7 @@ def t_makePTDF(quiet=False):
     @author: Ray Zimmerman (PSERC Cornell)
     @author: Richard Lincoln
     """
-    ntests = 24
+    ntests = 30
     t_begin(ntests, quiet)
 
     tdir = dirname(__file__)
@@ -113,6 +114,22 @@ def t_makePTDF(quiet=False):
     t_is(zeros(nbr),  dot(Hg, (-Pd)),  3,  'zeros == Hg  * (-Pd)')
     t_is(zeros(nbr),  dot(Hd, Pg),  3,  'zeros == Hd  * Pg')
 
+    ## selected rows & columns
+    ib = array([6, 1, 4])
+    il = array([2, 7])
+    t_is(makePTDF(baseMVA, bus, branch, 0, branch_idx=il), H1[il, :], 12,
+         'H1[il, :]')
+    t_is(makePTDF(baseMVA, bus, branch, 0, bus_idx=ib), H1[:, ib], 12,
+         'H1[:, ib]')
+    t_is(makePTDF(baseMVA, bus, branch, 3, ib, il), H4[ix_(il, ib)], 12,
+         'H4[il, ib]')
+    t_is(makePTDF(baseMVA, bus, branch, Pd, branch_idx=il), Hg[il, :], 12,
+         'Hg[il, :]')
+    t_is(makePTDF(baseMVA, bus, branch, Pd, ib, il), Hg[ix_(il, ib)], 12,
+         'Hg[il, ib]')
+    t_is(makePTDF(baseMVA, bus, branch, Dd, ib, il), Hd[ix_(il, ib)], 12,
+         'Hd[il, ib] from slack matrix')
+
     t_end()
 
 
@@ -0,0 +1,98 @@
+# Copyright (C) 2011 Richard Lincoln
+#
+# PYPOWER is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published
+# by the Free Software Foundation, either version 3 of the License,
+# or (at your option) any later version.
+#
+# PYPOWER is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with PYPOWER. If not, see <http://www.gnu.org/licenses/>.
+
+"""Tests for C{memmap_sink}.
+"""
+
+from os.path import join
+from shutil import rmtree
+from tempfile import mkdtemp
+
+from numpy import load, isnan
+
+from pypower.case9 import case9
+from pypower.loadcase import loadcase
+from pypower.ppoption import ppoption
+from pypower.runpf import runpf
+from pypower.runopf import runopf
+from pypower.memmap_sink import memmap_sink
+
+from pypower.idx_bus import PD, VM, VA, LAM_P
+from pypower.idx_gen import PG
+from pypower.idx_brch import PF, QT
+
+from pypower.t.t_begin import t_begin
+from pypower.t.t_is import t_is
+from pypower.t.t_ok import t_ok
+from pypower.t.t_end import t_end
+
+
+def t_memmap_sink(quiet=False):
+    """Tests for C{memmap_sink}.
+    """
+    t_begin(10, quiet)
+
+    ppopt = ppoption(VERBOSE=0, OUT_ALL=0)
+    ppc = loadcase(case9())
+    scale = [1.0, 0.9, 1.1]
+    T = len(scale)
+    path = mkdtemp()
+    try:
+        t = 'power flow : '
+        sink = memmap_sink(join(path, 'pf'), T, ppc)
+        t_ok(sink['VM'].shape == (T, 9) and sink['PF'].shape == (T, 9) and
+             sink['PG'].shape == (T, 3), [t, 'sizes'])
+        res = []
+        for k in range(T):
+            c = loadcase(ppc)
+            c['bus'][:, PD] = scale[k] * c['bus'][:, PD]
+            results, _ = runpf(c, ppopt)
+            sink.write(k, results)
+            res.append(results)
+        sink.flush()
+        t_is(sink['VA'][1], res[1]['bus'][:, VA], 12, [t, 'VA'])
+        t_is(sink['QT'][2], res[2]['branch'][:, QT], 12, [t, 'QT'])
+        t_ok(isnan(sink['LAM_P']).all(), [t, 'missing LAM_P'])
+        t_ok(sink['success'].all(), [t, 'success'])
+        del sink
+
+        t = 'reopen : '
+        sink = memmap_sink(join(path, 'pf'), mode='r')
+        t_ok(set(sink.fields) == set(['VM', 'VA', 'PF', 'QF', 'PT', 'QT',
+                                      'PG', 'QG', 'LAM_P']) and sink.T == T,
+             [t, 'fields'])
+        t_is(sink['PF'][0], res[0]['branch'][:, PF], 12, [t, 'PF'])
+        t_is(load(join(path, 'pf', 'VM.npy'), mmap_mode='r')[2],
+             res[2]['bus'][:, VM], 12, [t, 'numpy.load'])
+        del sink
+
+        t = 'OPF : '
+        sink = memmap_sink(join(path, 'opf'), 2, ppc, ['PG', 'LAM_P'])
+        for k in range(2):
+            c = loadcase(ppc)
+            c['bus'][:, PD] = scale[k] * c['bus'][:, PD]
+            r = runopf(c, ppopt)
+            sink.write(k, r)
+        t_is(sink['LAM_P'][1], r['bus'][:, LAM_P], 12, [t, 'LAM_P'])
+        t_is(sink['PG'][1], r['gen'][:, PG], 12, [t, 'PG'])
+        del sink
+    finally:
+        rmtree(path)
+
+    t_end()
+
+
+if __name__ == '__main__':
+    t_memmap_sink(quiet=False)
@@ -0,0 +1,123 @@
+# Copyright (C) 2011 Richard Lincoln
+#
+# PYPOWER is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published
+# by the Free Software Foundation, either version 3 of the License,
+# or (at your option) any later version.
+#
+# PYPOWER is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with PYPOWER. If not, see <http://www.gnu.org/licenses/>.
+
+"""Tests for C{opf_considx}.
+"""
+
+from numpy import ones, zeros, exp, arange
+from numpy.random import RandomState
+from scipy.sparse import csr_matrix as sparse, vstack, hstack
+
+from pypower.case30 import case30
+from pypower.ppoption import ppoption
+from pypower.ext2int import ext2int
+from pypower.opf_setup import opf_setup
+from pypower.makeYbus import makeYbus
+from pypower.dSbus_dV import dSbus_dV
+from pypower.dSbr_dV import dSbr_dV
+from pypower.dIbr_dV import dIbr_dV
+from pypower.dAbr_dV import dAbr_dV
+from pypower.opf_consfcn import opf_consfcn
+from pypower.opf_considx import opf_considx
+
+from pypower.idx_gen import GEN_BUS
+from pypower.idx_brch import F_BUS, RATE_A
+
+from pypower.t.t_begin import t_begin
+from pypower.t.t_is import t_is
+from pypower.t.t_ok import t_ok
+from pypower.t.t_end import t_end
+
+
+def t_opf_considx(quiet=False):
+    """Tests for C{opf_considx}.
+    """
+    t_begin(9, quiet)
+
+    ppopt = ppoption(VERBOSE=0, OUT_ALL=0)
+    om = opf_setup(ext2int(case30()), ppopt)
+    ppc = om.get_ppc()
+    bus, gen, branch = ppc['bus'], ppc['gen'], ppc['branch']
+    vv, _, _, _ = om.get_idx()
+    nb, ng, nx = bus.shape[0], gen.shape[0], om.getN('var')
+    il = (branch[:, RATE_A] != 0).nonzero()[0]
+    nl2 = len(il)
+    Ybus, Yf, Yt = makeYbus(ppc['baseMVA'], bus, branch)
+    Yf, Yt = Yf[il, :], Yt[il, :]
+
+    rs = RandomState(42)
+    x = 0.9 + 0.2 * rs.rand(nx)
+    V = x[vv['i1']['Vm']:vv['iN']['Vm']] * \
+        exp(1j * x[vv['i1']['Va']:vv['iN']['Va']])
+    iVaVm = arange(vv['i1']['Va'], vv['iN']['Vm'])
+    iPgQg = arange(vv['i1']['Pg'], vv['iN']['Qg'])
+
+    ## gradients from the derivative functions, as the transposes of the
+    ## stacked Jacobian blocks
+    dSbus_dVm, dSbus_dVa = dSbus_dV(Ybus, V)
+    Cg = sparse((ones(ng), (gen[:, GEN_BUS], range(ng))), (nb, ng))
+    blank = sparse((nb, ng))
+    dg0 = zeros((nx, 2 * nb))
+    dg0[iVaVm, :] = vstack([hstack([dSbus_dVa.real, dSbus_dVm.real]),
+                            hstack([dSbus_dVa.imag, dSbus_dVm.imag])
+                            ]).T.toarray()
+    dg0[iPgQg, :] = -vstack([hstack([Cg, blank]),
+                             hstack([blank, Cg])]).T.toarray()
+
+    def dh_ref(lim, Yf, Yt):
+        dFbr_dV = dIbr_dV if lim == 2 else dSbr_dV
+        dFf_dVa, dFf_dVm, dFt_dVa, dFt_dVm, Ff, Ft = \
+            dFbr_dV(branch[il, :], Yf, Yt, V)
+        if lim == 1:
+            dFf_dVa, dFf_dVm, dFt_dVa, dFt_dVm, Ff, Ft = [A.real for A in
+                [dFf_dVa, dFf_dVm, dFt_dVa, dFt_dVm, Ff, Ft]]
+        df_dVa, df_dVm, dt_dVa, dt_dVm = \
+            dAbr_dV(dFf_dVa, dFf_dVm, dFt_dVa, dFt_dVm, Ff, Ft)
+        dh = zeros((nx, 2 * nl2))
+        dh[iVaVm, :] = vstack([hstack([df_dVa, df_dVm]),
+                               hstack([dt_dVa, dt_dVm])]).T.toarray()
+        return dh
+
+    cidx = opf_considx(om, Ybus, Yf, Yt, il)
+    for lim, name in [(0, '|S|'), (1, 'P'), (2, '|I|')]:
+        t = 'OPF_FLOW_LIM = %d (%s) : ' % (lim, name)
+        ppopt['OPF_FLOW_LIM'] = lim
+        _, _, dh, dg = opf_consfcn(x, om, Ybus, Yf, Yt, ppopt, il, cidx)
+        t_is(dg.toarray(), dg0, 12, [t, 'dg'])
+        t_is(dh.toarray(), dh_ref(lim, Yf, Yt), 12, [t, 'dh'])
+
+    t = 'in place : '
+    t_ok(dg is cidx['dg'] and dh is cidx['dh'] and dg.format == 'csc' and
+         dh.format == 'csc' and dg.shape == (nx, 2 * nb) and
+         dh.shape == (nx, 2 * nl2), [t, 'CSC matrices of index map'])
+    _, _, dh1, dg1 = opf_consfcn(x, om, Ybus, Yf, Yt, ppopt, il)
+    t_ok(dh1 is not dh and (dh1 - dh).nnz == 0 and (dg1 - dg).nnz == 0,
+         [t, 'same values without index map'])
+
+    t = 'missing elements : '
+    Yf2 = Yf.tolil()
+    Yf2[0, branch[il[0], F_BUS]] = 0
+    Yf2 = Yf2.tocsr()
+    Yf2.eliminate_zeros()
+    cidx = opf_considx(om, Ybus, Yf2, Yt, il)
+    ppopt['OPF_FLOW_LIM'] = 0
+    _, _, dh, _ = opf_consfcn(x, om, Ybus, Yf2, Yt, ppopt, il, cidx)
+    t_is(dh.toarray(), dh_ref(0, Yf2, Yt), 12, [t, 'dh'])
+
+    t_end()
+
+
+if __name__ == '__main__':
+    t_opf_considx(quiet=False)
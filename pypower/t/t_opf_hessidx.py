@@ -0,0 +1,162 @@
+# Copyright (C) 2011 Richard Lincoln
+#
+# PYPOWER is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published
+# by the Free Software Foundation, either version 3 of the License,
+# or (at your option) any later version.
+#
+# PYPOWER is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with PYPOWER. If not, see <http://www.gnu.org/licenses/>.
+
+"""Tests for C{opf_hessidx}.
+"""
+
+from numpy import array, ones, exp, arange, r_
+from numpy.random import RandomState
+from scipy.sparse import csr_matrix as sparse, vstack, hstack, tril
+
+from pypower.case30 import case30
+from pypower.ppoption import ppoption
+from pypower.ext2int import ext2int
+from pypower.opf_setup import opf_setup
+from pypower.makeYbus import makeYbus
+from pypower.dSbr_dV import dSbr_dV
+from pypower.dIbr_dV import dIbr_dV
+from pypower.d2Sbus_dV2 import d2Sbus_dV2
+from pypower.d2ASbr_dV2 import d2ASbr_dV2
+from pypower.d2AIbr_dV2 import d2AIbr_dV2
+from pypower.opf_costfcn import opf_costfcn
+from pypower.opf_hessfcn import opf_hessfcn
+from pypower.opf_hessidx import opf_hessidx
+
+from pypower.idx_brch import F_BUS, T_BUS, RATE_A
+
+from pypower.t.t_begin import t_begin
+from pypower.t.t_is import t_is
+from pypower.t.t_ok import t_ok
+from pypower.t.t_end import t_end
+
+
+def t_opf_hessidx(quiet=False):
+    """Tests for C{opf_hessidx}.
+    """
+    t_begin(7, quiet)
+
+    ppopt = ppoption(VERBOSE=0, OUT_ALL=0)
+    rs = RandomState(42)
+
+    def setup(ppc):
+        om = opf_setup(ext2int(ppc), ppopt)
+        om.build_cost_params()
+        ppc = om.get_ppc()
+        bus, branch = ppc['bus'], ppc['branch']
+        il = (branch[:, RATE_A] != 0).nonzero()[0]
+        Ybus, Yf, Yt = makeYbus(ppc['baseMVA'], bus, branch)
+        return om, il, Ybus, Yf[il, :], Yt[il, :]
+
+    def hess_ref(x, lmbda, om, Ybus, Yf, Yt, il, cost_mult):
+        ## Hessian from the second derivative functions, stacked as in
+        ## the original opf_hessfcn
+        ppc = om.get_ppc()
+        branch = ppc['branch']
+        vv, _, _, _ = om.get_idx()
+        nb, nl2, nx = Ybus.shape[0], len(il), om.getN('var')
+        V = x[vv['i1']['Vm']:vv['iN']['Vm']] * \
+            exp(1j * x[vv['i1']['Va']:vv['iN']['Va']])
+        iVaVm = arange(vv['i1']['Va'], vv['iN']['Vm'])
+
+        lamP, lamQ = lmbda['eqnonlin'][:nb], lmbda['eqnonlin'][nb:]
+        muF, muT = lmbda['ineqnonlin'][:nl2], lmbda['ineqnonlin'][nl2:]
+        Gp = d2Sbus_dV2(Ybus, V, lamP)
+        Gq = d2Sbus_dV2(Ybus, V, lamQ)
+        d2G = vstack([hstack(Gp[:2]), hstack(Gp[2:])]).real + \
+              vstack([hstack(Gq[:2]), hstack(Gq[2:])]).imag
+
+        if ppopt['OPF_FLOW_LIM'] == 2:
+            dIf_dVa, dIf_dVm, dIt_dVa, dIt_dVm, If, It = \
+                dIbr_dV(branch[il, :], Yf, Yt, V)
+            Hf = d2AIbr_dV2(dIf_dVa, dIf_dVm, If, Yf, V, muF)
+            Ht = d2AIbr_dV2(dIt_dVa, dIt_dVm, It, Yt, V, muT)
+        else:
+            Cf = sparse((ones(nl2), (arange(nl2), branch[il, F_BUS])),
+                        (nl2, nb))
+            Ct = sparse((ones(nl2), (arange(nl2), branch[il, T_BUS])),
+                        (nl2, nb))
+            dSf_dVa, dSf_dVm, dSt_dVa, dSt_dVm, Sf, St = \
+                dSbr_dV(branch[il, :], Yf, Yt, V)
+            if ppopt['OPF_FLOW_LIM'] == 1:
+                dSf_dVa, dSf_dVm, dSt_dVa, dSt_dVm, Sf, St = [A.real for A in
+                    [dSf_dVa, dSf_dVm, dSt_dVa, dSt_dVm, Sf, St]]
+            Hf = d2ASbr_dV2(dSf_dVa, dSf_dVm, Sf, Cf, Yf, V, muF)
+            Ht = d2ASbr_dV2(dSt_dVa, dSt_dVm, St, Ct, Yt, V, muT)
+        d2H = vstack([hstack(Hf[:2]), hstack(Hf[2:])]) + \
+              vstack([hstack(Ht[:2]), hstack(Ht[2:])])
+
+        _, _, d2f = opf_costfcn(x, om, True)
+        H = d2f.toarray() * cost_mult
+        H[iVaVm[:, None], iVaVm] += (d2G + d2H).toarray()
+        return H
+
+    def point(om, il):
+        nb, nx = om.get_ppc()['bus'].shape[0], om.getN('var')
+        x = 0.9 + 0.2 * rs.rand(nx)
+        lmbda = {'eqnonlin': rs.randn(2 * nb),
+                 'ineqnonlin': rs.rand(2 * len(il))}
+        return x, lmbda
+
+    om, il, Ybus, Yf, Yt = setup(case30())
+    x, lmbda = point(om, il)
+    hidx = opf_hessidx(om, Ybus, Yf, Yt, il)
+    for lim, name in [(0, '|S|'), (1, 'P'), (2, '|I|')]:
+        t = 'OPF_FLOW_LIM = %d (%s) : ' % (lim, name)
+        ppopt['OPF_FLOW_LIM'] = lim
+        Lxx = opf_hessfcn(x, lmbda, om, Ybus, Yf, Yt, ppopt, il, 2.0, hidx)
+        t_is(Lxx.toarray(), hess_ref(x, lmbda, om, Ybus, Yf, Yt, il, 2.0),
+             10, [t, 'Lxx'])
+
+    t = 'in place : '
+    L = hidx['L']
+    t_ok(Lxx is hidx['H'] and Lxx.format == 'csr' and L.format == 'csc' and
+         (Lxx - Lxx.T).nnz == 0 and (L - tril(Lxx)).nnz == 0,
+         [t, 'symmetric matrix and lower triangle of index map'])
+    t_ok((L.indices >= arange(L.shape[1]).repeat(L.indptr[1:] -
+                                                 L.indptr[:-1])).all(),
+         [t, 'pattern of lower triangle'])
+    Lxx1 = opf_hessfcn(x, lmbda, om, Ybus, Yf, Yt, ppopt, il, 2.0)
+    t_ok(Lxx1 is not Lxx and abs(Lxx1 - Lxx).max() == 0,
+         [t, 'same values without index map'])
+
+    ## quadratic generator costs moved to generalized costs, with a dead
+    ## zone on every other row and coupled rows
+    t = 'generalized costs : '
+    ppc = case30()
+    ng = ppc['gen'].shape[0]
+    nb = ppc['bus'].shape[0]
+    ppc['N'] = sparse((ppc['baseMVA'] * ones(ng),
+                       (arange(ng), 2 * nb + arange(ng))),
+                      (ng, 2 * nb + 2 * ng))
+    ppc['fparm'] = ones((ng, 1)) * array([[1, 0, 0, 1]])
+    ppc['fparm'][::2, :] = [2, 30, 5, 1.5]
+    ppc['H'] = sparse((r_[2 * ppc['gencost'][:, 4], 0.01, 0.01],
+                       (r_[arange(ng), 0, 1], r_[arange(ng), 1, 0])),
+                      (ng, ng))
+    ppc['Cw'] = ppc['gencost'][:, 5]
+    ppc['gencost'][:, 4:7] = 0
+    om, il, Ybus, Yf, Yt = setup(ppc)
+    x, lmbda = point(om, il)
+    hidx = opf_hessidx(om, Ybus, Yf, Yt, il)
+    ppopt['OPF_FLOW_LIM'] = 0
+    Lxx = opf_hessfcn(x, lmbda, om, Ybus, Yf, Yt, ppopt, il, 2.0, hidx)
+    t_is(Lxx.toarray(), hess_ref(x, lmbda, om, Ybus, Yf, Yt, il, 2.0),
+         10, [t, 'Lxx'])
+
+    t_end()
+
+
+if __name__ == '__main__':
+    t_opf_hessidx(quiet=False)
@@ -19,17 +19,24 @@
 
 from os.path import dirname, join
 
-from numpy import array, r_
+from numpy import array, r_, ones
 
 from scipy.io import loadmat
 
 from pypower.ppoption import ppoption
 from pypower.loadcase import loadcase
+from pypower.case30 import case30
 from pypower.runpf import runpf
 from pypower.rundcpf import rundcpf
+from pypower.ext2int import ext2int
+from pypower.bustypes import bustypes
+from pypower.makeYbus import makeYbus
+from pypower.makeSbus import makeSbus
+from pypower.newtonpf import newtonpf
+from pypower.gscolor import gscolor
 
 from pypower.idx_bus import \
-    BUS_I, VA
+    BUS_I, VM, VA
 
 from pypower.idx_gen import \
     GEN_BUS, QMAX, QMIN, PG, QG, PMIN, PMAX
@@ -49,7 +56,7 @@ def t_pf(quiet=False):
     @author: Ray Zimmerman (PSERC Cornell)
     @author: Richard Lincoln
     """
-    t_begin(33, quiet)
+    t_begin(52, quiet)
 
     tdir = dirname(__file__)
     casefile = join(tdir, 't_case9_pf')
@@ -74,6 +81,32 @@ def t_pf(quiet=False):
     t_is(gen, gen_soln, 6, [t, 'gen'])
     t_is(branch, branch_soln, 6, [t, 'branch'])
 
+    ## run Newton PF, reusing the factored Jacobian
+    t = 'Newton PF (reused J) : ';
+    ppopt = ppoption(ppopt, PF_ALG=1, PF_NR_REUSE=3, PF_MAX_IT=30)
+    results, success = runpf(casefile, ppopt)
+    bus, gen, branch = results['bus'], results['gen'], results['branch']
+    t_ok(success, [t, 'success'])
+    t_is(bus, bus_soln, 6, [t, 'bus'])
+    t_is(gen, gen_soln, 6, [t, 'gen'])
+    t_is(branch, branch_soln, 6, [t, 'branch'])
+
+    ppc = ext2int(loadcase(casefile))
+    baseMVA, bus, gen, branch = \
+        ppc['baseMVA'], ppc['bus'], ppc['gen'], ppc['branch']
+    ref, pv, pq = bustypes(bus, gen)
+    Ybus, _, _ = makeYbus(baseMVA, bus, branch)
+    Sbus = makeSbus(baseMVA, bus, gen)
+    V0 = ones(bus.shape[0], complex)
+    _, _, i, info = newtonpf(Ybus, Sbus, V0, ref, pv, pq,
+                             ppoption(ppopt, VERBOSE=0))
+    t_ok(info['iterations'] == i and info['nfactor'] < i,
+         [t, 'fewer factorizations than iterations'])
+    _, _, i, info = newtonpf(Ybus, Sbus, V0, ref, pv, pq,
+                             ppoption(ppopt, VERBOSE=0, PF_NR_REUSE=0))
+    t_ok(info['nfactor'] == i, [t, 'refactor every iteration'])
+    ppopt = ppoption(ppopt, PF_NR_REUSE=0, PF_MAX_IT=10)
+
     ## run fast-decoupled PF (XB version)
     t = 'Fast Decoupled (XB) PF : ';
     ppopt = ppoption(ppopt, PF_ALG=2)
@@ -104,6 +137,46 @@ def t_pf(quiet=False):
     t_is(gen, gen_soln, 5, [t, 'gen'])
     t_is(branch, branch_soln, 5, [t, 'branch'])
 
+    ## run accelerated Gauss-Seidel PF
+    t = 'Gauss-Seidel PF (accelerated) : ';
+    ppopt = ppoption(ppopt, PF_ALG=4, PF_GS_ACCEL=1.4)
+    results, success = runpf(casefile, ppopt)
+    bus, gen, branch = results['bus'], results['gen'], results['branch']
+    t_ok(success, [t, 'success'])
+    t_is(bus, bus_soln, 5, [t, 'bus'])
+    t_is(gen, gen_soln, 5, [t, 'gen'])
+    t_is(branch, branch_soln, 5, [t, 'branch'])
+    ppopt = ppoption(ppopt, PF_GS_ACCEL=1.0)
+
+    pvpq = r_[pv, pq]
+    classes = gscolor(Ybus, pvpq)
+    t_ok(sorted(r_[tuple(classes)]) == range(len(pvpq)),
+         [t, 'each bus colored once'])
+    t_ok(all([Ybus[pvpq[c], :][:, pvpq[c]].nnz == len(c) for c in classes]),
+         [t, 'no connected buses in a color class'])
+
+    ## run Newton PF with Q limits enforced within the iterations
+    t = 'Newton PF w/ Q limits : '
+    ppc = loadcase(case30())
+    ppc['gen'][1, QMAX] = 20
+    ppc['gen'][3, QMAX] = 10
+    ppopt = ppoption(ppopt, VERBOSE=0, ENFORCE_Q_LIMS=1, PF_TOL=1e-10)
+    r1, success1 = runpf(ppc, ppoption(ppopt, PF_ALG=1))
+    r2, success2 = runpf(ppc, ppoption(ppopt, PF_ALG=2, PF_MAX_IT_FD=100))
+    t_ok(success1 and success2, [t, 'success'])
+    t_is(r1['gen'][[1, 3], QG], [20, 10], 6, [t, 'Qg at limits'])
+    t_is(r1['bus'][:, [VM, VA]], r2['bus'][:, [VM, VA]], 6,
+         [t, 'bus, same as FD'])
+    t_is(r1['gen'][:, [PG, QG]], r2['gen'][:, [PG, QG]], 6,
+         [t, 'gen, same as FD'])
+
+    ppc['gen'][0, QMAX] = -5
+    r1, success = runpf(ppc, ppoption(ppopt, PF_ALG=1))
+    t_ok(success, [t, 'slack at limit : success'])
+    t_is(r1['gen'][0, QG], -5, 6, [t, 'slack at limit : Qg'])
+    t_is(r1['bus'][0, VA], 0, 6, [t, 'slack at limit : reference angle'])
+    ppopt = ppoption(ppopt, VERBOSE=verbose, ENFORCE_Q_LIMS=0, PF_TOL=1e-8)
+
     ## get solved AC power flow case from MAT-file
     ## defines bus_soln, gen_soln, branch_soln
     soln9_dcpf = loadmat(join(tdir, 'soln9_dcpf.mat'), struct_as_record=False)
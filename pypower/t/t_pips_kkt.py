@@ -0,0 +1,117 @@
+# Copyright (C) 2011 Richard Lincoln
+#
+# PYPOWER is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published
+# by the Free Software Foundation, either version 3 of the License,
+# or (at your option) any later version.
+#
+# PYPOWER is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with PYPOWER. If not, see <http://www.gnu.org/licenses/>.
+
+"""Tests for C{pips_kkt}.
+"""
+
+from numpy import array, zeros, r_, c_, dot, diag
+from numpy.random import RandomState
+from scipy.sparse import csr_matrix, rand
+
+from pypower.pips import pips
+from pypower.pips_kkt import pips_kkt
+
+from pypower.t.t_begin import t_begin
+from pypower.t.t_is import t_is
+from pypower.t.t_ok import t_ok
+from pypower.t.t_end import t_end
+
+
+def t_pips_kkt(quiet=False):
+    """Tests for C{pips_kkt}.
+    """
+    t_begin(13, quiet)
+
+    rs = RandomState(42)
+    nx, niq, neq = 12, 9, 4
+    L = rand(nx, nx, 0.2, random_state=rs)
+    Lxx = (L + L.T).tocsr()
+    dh = rand(nx, niq, 0.3, 'csc', random_state=rs)
+    dg = rand(nx, neq, 0.3, 'csc', random_state=rs)
+
+    def kkt_dense(Lxx, dh, w, dg, d=None):
+        M = Lxx.toarray()
+        if d is not None:
+            M = M + diag(d)
+        if dh is not None:
+            M = M + dot(dh.toarray() * w, dh.toarray().T)
+        if dg is None:
+            return M
+        G = dg.toarray()
+        return r_[c_[M, G], c_[G.T, zeros((G.shape[1], G.shape[1]))]]
+
+    t = 'assemble : '
+    kkt = pips_kkt()
+    w = rs.rand(niq)
+    K = kkt.assemble(Lxx, dh, w, dg)
+    t_is(K.toarray(), kkt_dense(Lxx, dh, w, dg), 12, [t, 'KKT matrix'])
+    t_ok(K.format == 'csr' and K.has_sorted_indices, [t, 'sorted CSR'])
+
+    t = 'same pattern : '
+    Lxx.data, dh.data, dg.data = [rs.rand(len(A.data)) for A in (Lxx, dh, dg)]
+    w = rs.rand(niq)
+    K2 = kkt.assemble(Lxx, dh, w, dg)
+    t_is(K2.toarray(), kkt_dense(Lxx, dh, w, dg), 12, [t, 'KKT matrix'])
+    t_ok(K2 is K and kkt.nanalyse == 1, [t, 'pattern reused'])
+    t_ok(kkt.assemble(Lxx.tocsc(), dh.tocsr(), w, dg) is K,
+         [t, 'other input formats'])
+
+    t = 'new pattern : '
+    dh = rand(nx, niq, 0.3, 'csc', random_state=rs)
+    K = kkt.assemble(Lxx, dh, w, dg)
+    t_is(K.toarray(), kkt_dense(Lxx, dh, w, dg), 12, [t, 'KKT matrix'])
+    t_ok(kkt.nanalyse == 2, [t, 'pattern analysed'])
+
+    t = 'bounds diagonal : '
+    d = rs.rand(nx)
+    K = kkt.assemble(Lxx, dh, w, dg, d)
+    t_is(K.toarray(), kkt_dense(Lxx, dh, w, dg, d), 12, [t, 'KKT matrix'])
+    t_ok(kkt.nanalyse == 3 and kkt.assemble(Lxx, dh, w, dg, 2 * d) is K,
+         [t, 'pattern reused'])
+
+    t = 'no constraints : '
+    t_is(pips_kkt().assemble(Lxx, None, None, dg).toarray(),
+         kkt_dense(Lxx, None, None, dg), 12, [t, 'equalities only'])
+    t_is(pips_kkt().assemble(Lxx, dh, w, None).toarray(),
+         kkt_dense(Lxx, dh, w, None), 12, [t, 'inequalities only'])
+
+    t = 'pips : '
+    def f2(x):
+        f = -x[0] * x[1] - x[1] * x[2]
+        df = -r_[x[1], x[0] + x[2], x[1]]
+        return f, df
+    def gh2(x):
+        h = dot(array([[1, -1, 1], [1, 1, 1]]), x**2) + array([-2.0, -10.0])
+        dh = 2 * csr_matrix(array([[ x[0], x[0]],
+                                   [-x[1], x[1]],
+                                   [ x[2], x[2]]]))
+        return h, array([]), dh, None
+    def hess2(x, lam, cost_mult=1):
+        mu = lam["ineqnonlin"]
+        a = r_[dot(2 * array([1, 1]), mu), -1, 0]
+        b = r_[-1, dot(2 * array([-1, 1]), mu), -1]
+        c = r_[0, -1, dot(2 * array([1, 1]), mu)]
+        return csr_matrix(array([a, b, c]))
+    s = pips(f2, array([1.0, 1.0, 0.0]), gh_fcn=gh2, hess_fcn=hess2)
+    t_is(s['f'], -7.07106725919, 10, [t, 'solution'])
+    o = s['output']
+    t_ok(o['nanalyse'] >= 1 and all([o[k] >= 0 for k in ('et', 'et_fcn',
+         'et_hess', 'et_kkt', 'et_factor', 'et_solve')]), [t, 'timing'])
+
+    t_end()
+
+
+if __name__ == '__main__':
+    t_pips_kkt(quiet=False)
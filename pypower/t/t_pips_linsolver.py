@@ -0,0 +1,118 @@
+# Copyright (C) 2011 Richard Lincoln
+#
+# PYPOWER is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published
+# by the Free Software Foundation, either version 3 of the License,
+# or (at your option) any later version.
+#
+# PYPOWER is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with PYPOWER. If not, see <http://www.gnu.org/licenses/>.
+
+"""Tests for C{pips_linsolver}.
+"""
+
+from warnings import catch_warnings, simplefilter
+
+from numpy import array, ones, all, isnan, r_, dot
+from numpy.random import RandomState
+from numpy.linalg import solve
+from scipy.sparse import csr_matrix, bmat, rand, eye
+
+from pypower.pips import pips
+from pypower.pips_linsolver import pips_linsolver
+from pypower.lufactor import UmfpackContext
+
+from pypower.t.t_begin import t_begin
+from pypower.t.t_is import t_is
+from pypower.t.t_ok import t_ok
+from pypower.t.t_end import t_end
+
+
+def t_pips_linsolver(quiet=False):
+    """Tests for C{pips_linsolver}.
+    """
+    t_begin(21, quiet)
+
+    ## symmetric indefinite KKT matrix [H G.T; G 0]
+    rs = RandomState(42)
+    nx, neq = 30, 10
+    H = rand(nx, nx, 0.1, random_state=rs)
+    H = H + H.T + 5 * eye(nx)
+    G = rand(neq, nx, 0.3, random_state=rs) + eye(neq, nx)
+    K = csr_matrix(bmat([[H, G.T], [G, None]]))
+    b = rs.rand(nx + neq)
+    x = solve(K.toarray(), b)
+
+    with catch_warnings():
+        simplefilter('ignore')
+
+        for solver, ordering in [('', 'COLAMD'), ('SUPERLU', 'COLAMD'),
+                                 ('SUPERLU', 'MMD_AT_PLUS_A'),
+                                 ('SUPERLU', 'NATURAL'), ('MINRES', 'COLAMD'),
+                                 ('GMRES', 'MMD_AT_PLUS_A')]:
+            t = '%s %s : ' % (solver or 'default', ordering)
+            ls = pips_linsolver(solver, ordering, nx=nx)
+            t_is(ls.factor(K).solve(b), x, 6, [t, 'solution'])
+            t_ok(ls.nfallback == 0 and ls.solver == (solver or
+                 ('SUPERLU' if UmfpackContext is None else 'UMFPACK')),
+                 [t, 'no fallback'])
+
+        t = 'UMFPACK : '
+        ls = pips_linsolver('UMFPACK')
+        t_ok(ls.solver == ('SUPERLU' if UmfpackContext is None
+                           else 'UMFPACK'), [t, 'used if available'])
+
+        t = 'fallback : '
+        ls = pips_linsolver('MINRES', max_it=1, nx=nx)
+        t_is(ls.factor(K).solve(b), x, 8, [t, 'solution'])
+        t_ok(ls.solver != 'MINRES' and ls.nfallback == 1,
+             [t, 'direct solver used'])
+
+        t = 'singular : '
+        ls = pips_linsolver('SUPERLU')
+        x0 = ls.factor(csr_matrix((nx, nx))).solve(ones(nx))
+        t_ok(all(isnan(x0)) and ls.solver is None, [t, 'nan, no solver'])
+
+        t = 'unknown solver : '
+        try:
+            pips_linsolver('CHOLMOD')
+            t_ok(False, [t, 'ValueError'])
+        except ValueError:
+            t_ok(True, [t, 'ValueError'])
+
+        t = 'pips : '
+        def f2(x):
+            f = -x[0] * x[1] - x[1] * x[2]
+            df = -r_[x[1], x[0] + x[2], x[1]]
+            return f, df
+        def gh2(x):
+            h = dot(array([[1, -1, 1], [1, 1, 1]]), x**2) + \
+                array([-2.0, -10.0])
+            dh = 2 * csr_matrix(array([[ x[0], x[0]],
+                                       [-x[1], x[1]],
+                                       [ x[2], x[2]]]))
+            return h, array([]), dh, None
+        def hess2(x, lam, cost_mult=1):
+            mu = lam["ineqnonlin"]
+            a = r_[dot(2 * array([1, 1]), mu), -1, 0]
+            b = r_[-1, dot(2 * array([-1, 1]), mu), -1]
+            c = r_[0, -1, dot(2 * array([1, 1]), mu)]
+            return csr_matrix(array([a, b, c]))
+        for solver in ['SUPERLU', 'MINRES', 'GMRES']:
+            s = pips(f2, array([1.0, 1.0, 0.0]), gh_fcn=gh2, hess_fcn=hess2,
+                     opt={'linsolver': solver})
+            t_is(s['f'], -7.07106725919, 6, [t, solver])
+        o = s['output']
+        t_ok(o['linsolver'] in ('GMRES', 'SUPERLU', 'UMFPACK') and
+             o['nfallback'] in (0, 1), [t, 'output'])
+
+    t_end()
+
+
+if __name__ == '__main__':
+    t_pips_linsolver(quiet=False)
@@ -0,0 +1,129 @@
+# Copyright (C) 2011 Richard Lincoln
+#
+# PYPOWER is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published
+# by the Free Software Foundation, either version 3 of the License,
+# or (at your option) any later version.
+#
+# PYPOWER is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with PYPOWER. If not, see <http://www.gnu.org/licenses/>.
+
+"""Tests for C{runcontingency}.
+"""
+
+from numpy import array, sqrt, maximum, flatnonzero as find
+
+from pypower.case30 import case30
+from pypower.loadcase import loadcase
+from pypower.ppoption import ppoption
+from pypower.runpf import runpf
+from pypower.runcontingency import runcontingency, CT_K, CT_TYPE, \
+    CT_ELEM, CT_VALUE, CT_NONCONV, CT_ISLAND, CT_FLOW, CT_VMIN, CT_VMAX
+
+from pypower.idx_bus import BUS_I, VM, VMIN, VMAX
+from pypower.idx_brch import BR_STATUS, RATE_A, PF, QF, PT, QT
+from pypower.idx_gen import GEN_STATUS
+
+from pypower.t.t_begin import t_begin
+from pypower.t.t_is import t_is
+from pypower.t.t_ok import t_ok
+from pypower.t.t_end import t_end
+
+
+def t_runcontingency(quiet=False):
+    """Tests for C{runcontingency}.
+    """
+    t_begin(13, quiet)
+
+    ppc = loadcase(case30())
+    ppopt = ppoption(VERBOSE=0, OUT_ALL=0)
+    nl = ppc['branch'].shape[0]
+
+    t = 'all branches : '
+    r = runcontingency(ppc, None, ppopt, nproc=1)
+    viol = r['violations']
+    t_ok(len(r['outages']) == nl and not r['screened'].any(), [t, 'outages'])
+    t_is(viol[viol[:, CT_K] < 0], _expected(ppc, ppopt, -1), 6,
+         [t, 'base case violations'])
+    k = 5
+    c = loadcase(ppc)
+    c['branch'][k, BR_STATUS] = 0
+    t_is(viol[viol[:, CT_K] == k], _expected(c, ppopt, k), 6,
+         [t, 'branch outage violations'])
+    nc = find(~r['success'])
+    t_ok((viol[viol[:, CT_TYPE] == CT_NONCONV, CT_K] == nc).all(),
+         [t, 'non-convergence'])
+    isl = viol[viol[:, CT_TYPE] == CT_ISLAND]
+    ki = isl[:, CT_K].astype(int)
+    t_ok(len(ki) > 0 and (isl[:, CT_ELEM] == ki).all() and
+         r['success'][ki].all() and (r['iterations'][ki] == 0).all(),
+         [t, 'islanding outages'])
+
+    t = 'generators : '
+    outages = [('gen', 1), ('gen', 0), ('branch', k)]
+    r2 = runcontingency(ppc, outages, ppopt, nproc=1)
+    viol2 = r2['violations']
+    c = loadcase(ppc)
+    c['gen'][1, GEN_STATUS] = 0
+    t_is(viol2[viol2[:, CT_K] == 0], _expected(c, ppopt, 0), 6,
+         [t, 'gen outage violations'])
+    c = loadcase(ppc)
+    c['gen'][0, GEN_STATUS] = 0
+    t_is(viol2[viol2[:, CT_K] == 1], _expected(c, ppopt, 1), 6,
+         [t, 'ref gen outage violations'])
+    v = viol2[viol2[:, CT_K] == 2]
+    v[:, CT_K] = k
+    t_is(v, viol[viol[:, CT_K] == k], 12, [t, 'branch outage'])
+
+    t = 'process pool : '
+    r3 = runcontingency(ppc, outages, ppopt, nproc=2)
+    t_is(r3['violations'], viol2, 12, [t, 'violations'])
+    t_is(r3['iterations'], r2['iterations'], 12, [t, 'iterations'])
+
+    t = 'screening : '
+    r4 = runcontingency(ppc, None, ppopt, nproc=1, screen=0.8)
+    viol4 = r4['violations']
+    isl4 = viol4[viol4[:, CT_TYPE] == CT_ISLAND, CT_K].astype(int)
+    t_ok(set(isl4) == set(ki) and r4['screened'][isl4].all(),
+         [t, 'bridges'])
+    solved = find(~r4['screened'])
+    t_ok(len(solved) < nl and
+         all([(viol4[viol4[:, CT_K] == j] == viol[viol[:, CT_K] == j]).all()
+              for j in solved]), [t, 'solved outages'])
+
+    t = 'out-of-service : '
+    c = loadcase(ppc)
+    c['branch'][3, BR_STATUS] = 0
+    r5 = runcontingency(c, [('branch', 3), ('branch', 4)], ppopt, nproc=1)
+    t_ok(r5['screened'].tolist() == [True, False], [t, 'skipped'])
+
+    t_end()
+
+
+def _expected(ppc, ppopt, k):
+    """Violation table of a power flow solved with L{runpf}.
+    """
+    r, success = runpf(ppc, ppopt)
+    if not success:
+        return array([[k, CT_NONCONV, -1, 0, 0]])
+    bus, branch = r['bus'], r['branch']
+    rows = []
+    S = maximum(sqrt(branch[:, PF]**2 + branch[:, QF]**2),
+                sqrt(branch[:, PT]**2 + branch[:, QT]**2))
+    rate = branch[:, RATE_A]
+    for l in find((rate > 0) & (S > rate)):
+        rows.append([k, CT_FLOW, l, S[l], rate[l]])
+    for b in find(bus[:, VM] < bus[:, VMIN]):
+        rows.append([k, CT_VMIN, bus[b, BUS_I], bus[b, VM], bus[b, VMIN]])
+    for b in find(bus[:, VM] > bus[:, VMAX]):
+        rows.append([k, CT_VMAX, bus[b, BUS_I], bus[b, VM], bus[b, VMAX]])
+    return array(rows).reshape(len(rows), 5)
+
+
+if __name__ == '__main__':
+    t_runcontingency(quiet=False)
@@ -0,0 +1,74 @@
+# Copyright (C) 2011 Richard Lincoln
+#
+# PYPOWER is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published
+# by the Free Software Foundation, either version 3 of the License,
+# or (at your option) any later version.
+#
+# PYPOWER is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with PYPOWER. If not, see <http://www.gnu.org/licenses/>.
+
+"""Tests for C{rundcpf_series}.
+"""
+
+from numpy import array
+
+from pypower.case30 import case30
+from pypower.loadcase import loadcase
+from pypower.ppoption import ppoption
+from pypower.rundcpf import rundcpf
+from pypower.rundcpf_series import rundcpf_series
+
+from pypower.idx_bus import PD, VA
+from pypower.idx_gen import PG
+from pypower.idx_brch import PF, BR_STATUS
+
+from pypower.t.t_begin import t_begin
+from pypower.t.t_is import t_is
+from pypower.t.t_ok import t_ok
+from pypower.t.t_end import t_end
+
+
+def t_rundcpf_series(quiet=False):
+    """Tests for C{rundcpf_series}.
+    """
+    scale = [1.0, 0.8, 1.1, 1.2]
+    T = len(scale)
+    t_begin(3 * T + 4, quiet)
+
+    ppopt = ppoption(VERBOSE=0, OUT_ALL=0)
+    ppc = loadcase(case30())
+    ppc['branch'][5, BR_STATUS] = 0      ## take a branch out of service
+
+    Pd = array([s * ppc['bus'][:, PD] for s in scale]).T
+    Pg = array([s * ppc['gen'][:, PG] for s in scale]).T
+
+    r = rundcpf_series(ppc, Pd, Pg, ppopt)
+    t_ok(r['Va'].shape == (ppc['bus'].shape[0], T), 'Va size')
+    t_ok(r['Pf'].shape == (ppc['branch'].shape[0], T), 'Pf size')
+    t_ok(r['Pg'].shape == (ppc['gen'].shape[0], T), 'Pg size')
+
+    for k in range(T):
+        t = 'period %d : ' % k
+        ppck = loadcase(ppc)
+        ppck['bus'][:, PD] = Pd[:, k]
+        ppck['gen'][:, PG] = Pg[:, k]
+        results, _ = rundcpf(ppck, ppopt)
+        t_is(r['Va'][:, k], results['bus'][:, VA], 8, [t, 'Va'])
+        t_is(r['Pf'][:, k], results['branch'][:, PF], 8, [t, 'Pf'])
+        t_is(r['Pg'][:, k], results['gen'][:, PG], 8, [t, 'Pg'])
+
+    t = 'broadcast : '
+    r2 = rundcpf_series(ppc, Pd, Pg[:, 0], ppopt)
+    t_is(r2['Pf'][:, 0], r['Pf'][:, 0], 12, [t, 'Pf'])
+
+    t_end()
+
+
+if __name__ == '__main__':
+    t_rundcpf_series(quiet=False)
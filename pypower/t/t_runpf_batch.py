@@ -0,0 +1,77 @@
+# Copyright (C) 2011 Richard Lincoln
+#
+# PYPOWER is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published
+# by the Free Software Foundation, either version 3 of the License,
+# or (at your option) any later version.
+#
+# PYPOWER is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with PYPOWER. If not, see <http://www.gnu.org/licenses/>.
+
+"""Tests for C{runpf_batch}.
+"""
+
+from numpy import array, exp, pi, c_, r_
+
+from pypower.case30 import case30
+from pypower.loadcase import loadcase
+from pypower.ppoption import ppoption
+from pypower.runpf import runpf
+from pypower.runpf_batch import runpf_batch
+
+from pypower.idx_bus import PD, QD, VM, VA
+from pypower.idx_gen import PG
+from pypower.idx_brch import PF, QF, PT, QT, BR_STATUS
+
+from pypower.t.t_begin import t_begin
+from pypower.t.t_is import t_is
+from pypower.t.t_ok import t_ok
+from pypower.t.t_end import t_end
+
+
+def t_runpf_batch(quiet=False):
+    """Tests for C{runpf_batch}.
+    """
+    scale = [1.0, 0.8, 1.1, 1.2]
+    ns = len(scale)
+    t_begin(4 * ns + 3, quiet)
+
+    ppopt = ppoption(VERBOSE=0, OUT_ALL=0)
+    ppc = loadcase(case30())
+    ppc['branch'][5, BR_STATUS] = 0      ## take a branch out of service
+
+    Pd = array([s * ppc['bus'][:, PD] for s in scale])
+    Qd = array([s * ppc['bus'][:, QD] for s in scale])
+    Pg = array([s * ppc['gen'][:, PG] for s in scale])
+
+    r = runpf_batch(ppc, Pd, Qd, Pg, ppopt, chunk=3)
+    t_ok(all(r['success']), 'all scenarios converged')
+    t_ok(r['V'].shape == (ns, ppc['bus'].shape[0]), 'V size')
+    t_ok(r['Sf'].shape == (ns, ppc['branch'].shape[0]), 'Sf size')
+
+    for k in range(ns):
+        t = 'scenario %d : ' % k
+        ppck = loadcase(ppc)
+        ppck['bus'][:, PD] = Pd[k]
+        ppck['bus'][:, QD] = Qd[k]
+        ppck['gen'][:, PG] = Pg[k]
+        results, success = runpf(ppck, ppopt)
+        bus, branch = results['bus'], results['branch']
+        V = bus[:, VM] * exp(1j * pi / 180 * bus[:, VA])
+        t_ok(success, [t, 'runpf success'])
+        t_is(r['V'][k], V, 8, [t, 'V'])
+        t_is(c_[r['Sf'][k].real, r['Sf'][k].imag], branch[:, [PF, QF]], 6,
+             [t, 'Sf'])
+        t_is(c_[r['St'][k].real, r['St'][k].imag], branch[:, [PT, QT]], 6,
+             [t, 'St'])
+
+    t_end()
+
+
+if __name__ == '__main__':
+    t_runpf_batch(quiet=False)
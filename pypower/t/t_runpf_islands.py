@@ -0,0 +1,124 @@
+# Copyright (C) 2011 Richard Lincoln
+#
+# PYPOWER is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published
+# by the Free Software Foundation, either version 3 of the License,
+# or (at your option) any later version.
+#
+# PYPOWER is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with PYPOWER. If not, see <http://www.gnu.org/licenses/>.
+
+"""Tests for C{runpf_islands}.
+"""
+
+from numpy import array, r_
+
+from pypower.case9 import case9
+from pypower.ext2int import ext2int
+from pypower.ppoption import ppoption
+from pypower.runpf import runpf
+from pypower.find_islands import find_islands
+from pypower.runpf_islands import runpf_islands
+
+from pypower.idx_bus import BUS_I, BUS_TYPE, REF, PV, NONE, VM, VA
+from pypower.idx_brch import F_BUS, T_BUS, BR_STATUS, PF, QF, PT, QT
+from pypower.idx_gen import GEN_BUS, GEN_STATUS, PG, QG, VG
+
+from pypower.t.t_begin import t_begin
+from pypower.t.t_is import t_is
+from pypower.t.t_ok import t_ok
+from pypower.t.t_end import t_end
+
+
+def t_runpf_islands(quiet=False):
+    """Tests for C{runpf_islands}.
+    """
+    t_begin(18, quiet)
+
+    ppopt = ppoption(VERBOSE=0, OUT_ALL=0)
+    flows = [PF, QF, PT, QT]
+
+    ## case9 split by outages of branch 3-6 (bus 3 with a generator and no
+    ## load) and of branches 4-5 and 5-6 (bus 5 with a load only)
+    ppc = _float(case9())
+    ppc['branch'][[1, 2, 3], BR_STATUS] = 0
+
+    ## the same case with the two isolated buses removed
+    ref = _float(case9())
+    ref['branch'][[1, 2, 3], BR_STATUS] = 0
+    ref['bus'][[2, 4], BUS_TYPE] = NONE
+    ref['gen'][2, GEN_STATUS] = 0
+    main = array([0, 1, 3, 5, 6, 7, 8])
+    lmain = array([0, 4, 5, 6, 7, 8])
+
+    t = 'find_islands : '
+    ppi = ext2int(ppc)
+    groups = find_islands(ppi['bus'], ppi['branch'])
+    t_ok(len(groups) == 3, [t, 'number of islands'])
+    t_is(r_[groups[0], groups[1], groups[2]], r_[main, 2, 4], 12,
+         [t, 'buses'])
+    ppi = ext2int(case9())
+    t_ok(len(find_islands(ppi['bus'], ppi['branch'])) == 1,
+         [t, 'connected network'])
+
+    for t, opt in [('AC PF : ', ppopt),
+                   ('DC PF : ', ppoption(ppopt, PF_DC=True))]:
+        r, success = runpf_islands(ppc, opt)
+        rr, _ = runpf(ref, opt)
+        t_ok(success, [t, 'success'])
+        t_is(r['bus'][main][:, [VM, VA]], rr['bus'][main][:, [VM, VA]], 8,
+             [t, 'main island voltages'])
+        t_is(r['gen'][:2, [PG, QG]], rr['gen'][:2, [PG, QG]], 8,
+             [t, 'main island generation'])
+        t_is(r['branch'][lmain][:, flows], rr['branch'][lmain][:, flows], 8,
+             [t, 'main island flows'])
+
+    t = 'islands : '
+    isl = r['islands']
+    t_is(r_[isl['buses'][1], isl['buses'][2]], [3, 5], 12, [t, 'bus numbers'])
+    t_ok(list(isl['energized']) == [True, True, False] and
+         list(isl['success']) == [True, True, False], [t, 'flags'])
+    r, success = runpf_islands(ppc, ppopt)
+    t_ok(r['bus'][2, BUS_TYPE] == REF and r['bus'][2, VM] == r['gen'][2, VG]
+         and r['gen'][2, PG] == 0, [t, 'generator bus becomes reference'])
+    t_ok(r['bus'][4, VM] == 0 and not r['branch'][[1, 2]][:, flows].any(),
+         [t, 'island without generator de-energized'])
+
+    ## two copies of case9, the reference bus of the second made a PV bus
+    t = 'two networks : '
+    ppc = _float(case9())
+    ppc1 = _float(case9())
+    ppc1['bus'][0, BUS_TYPE] = PV
+    ppc1['bus'][:, BUS_I] += 9
+    ppc1['branch'][:, [F_BUS, T_BUS]] += 9
+    ppc1['gen'][:, GEN_BUS] += 9
+    for key in ('bus', 'gen', 'branch', 'gencost'):
+        ppc[key] = r_[ppc[key], ppc1[key]]
+
+    ## reference at the bus of the largest generator, bus 2
+    ref = _float(case9())
+    ref['bus'][[0, 1], BUS_TYPE] = [PV, REF]
+    rr, _ = runpf(ref, ppopt)
+    r, success = runpf_islands(ppc, ppopt)
+    t_ok(success and r['bus'][10, BUS_TYPE] == REF, [t, 'new reference'])
+    t_is(r['bus'][9:, [VM, VA]], rr['bus'][:, [VM, VA]], 8, [t, 'voltages'])
+    r2, _ = runpf_islands(ppc, ppopt, nproc=2)
+    t_is(r2['bus'][:, [VM, VA]], r['bus'][:, [VM, VA]], 12,
+         [t, 'solved in parallel'])
+
+    t_end()
+
+
+def _float(ppc):
+    for key in ('bus', 'gen', 'branch'):
+        ppc[key] = ppc[key].astype(float)
+    return ppc
+
+
+if __name__ == '__main__':
+    t_runpf_islands(quiet=False)
@@ -0,0 +1,82 @@
+# Copyright (C) 2011 Richard Lincoln
+#
+# PYPOWER is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published
+# by the Free Software Foundation, either version 3 of the License,
+# or (at your option) any later version.
+#
+# PYPOWER is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with PYPOWER. If not, see <http://www.gnu.org/licenses/>.
+
+"""Tests for C{scenario_pool}.
+"""
+
+from numpy import c_
+
+from pypower.case30 import case30
+from pypower.loadcase import loadcase
+from pypower.ppoption import ppoption
+from pypower.runpf import runpf
+from pypower.scenario_pool import scenario_pool
+
+from pypower.idx_bus import PD, QD, VM, VA
+from pypower.idx_gen import PG, QG
+from pypower.idx_brch import PF, QF, PT, QT, BR_STATUS
+
+from pypower.t.t_begin import t_begin
+from pypower.t.t_is import t_is
+from pypower.t.t_ok import t_ok
+from pypower.t.t_end import t_end
+
+
+def t_scenario_pool(quiet=False):
+    """Tests for C{scenario_pool}.
+    """
+    scale = [1.0, 0.8, 1.1, 1.2, 0.9]
+    ns = len(scale)
+    t_begin(4 * ns + 3, quiet)
+
+    ppopt = ppoption(VERBOSE=0, OUT_ALL=0)
+    ppc = loadcase(case30())
+    ppc['branch'][5, BR_STATUS] = 0      ## take a branch out of service
+
+    scenarios = [{'PD': s * ppc['bus'][:, PD], 'QD': s * ppc['bus'][:, QD],
+                  'PG': s * ppc['gen'][:, PG]} for s in scale]
+
+    pool = scenario_pool(ppc, ppopt, nproc=2)
+    out = dict(pool.run(scenarios))
+    t_ok(sorted(out.keys()) == range(ns), 'one result per scenario')
+    t_ok(sum([s['scenarios'] for s in pool.stats.values()]) == ns,
+         'worker stats')
+
+    for k in range(ns):
+        t = 'scenario %d : ' % k
+        ppck = loadcase(ppc)
+        ppck['bus'][:, PD] = scenarios[k]['PD']
+        ppck['bus'][:, QD] = scenarios[k]['QD']
+        ppck['gen'][:, PG] = scenarios[k]['PG']
+        expected, _ = runpf(ppck, ppopt)
+        r = out[k]
+        t_ok(r['success'], [t, 'success'])
+        t_is(r['bus'][:, [VM, VA]], expected['bus'][:, [VM, VA]], 8,
+             [t, 'bus voltages'])
+        t_is(r['gen'][:, [PG, QG]], expected['gen'][:, [PG, QG]], 6,
+             [t, 'gen dispatch'])
+        t_is(r['branch'][:, [PF, QF, PT, QT]],
+             expected['branch'][:, [PF, QF, PT, QT]], 6, [t, 'branch flows'])
+
+    ## pool can be reused for another batch
+    out = list(pool.run(scenarios[:2]))
+    t_ok(len(out) == 2 and all([r['success'] for _, r in out]), 'second run')
+    pool.close()
+
+    t_end()
+
+
+if __name__ == '__main__':
+    t_scenario_pool(quiet=False)
@@ -0,0 +1,120 @@
+# Copyright (C) 2011 Richard Lincoln
+#
+# PYPOWER is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published
+# by the Free Software Foundation, either version 3 of the License,
+# or (at your option) any later version.
+#
+# PYPOWER is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with PYPOWER. If not, see <http://www.gnu.org/licenses/>.
+
+"""Tests for C{screen_n2}.
+"""
+
+from os import close, remove
+from tempfile import mkstemp
+
+from numpy import array, pi, lexsort, flatnonzero as find
+
+from pypower.case30 import case30
+from pypower.ext2int import ext2int
+from pypower.bustypes import bustypes
+from pypower.makeBdc import makeBdc
+from pypower.makeSbus import makeSbus
+from pypower.dcpf import dcpf
+from pypower.lodf_chunks import lodf_chunks
+from pypower.screen_n2 import screen_n2
+
+from pypower.idx_bus import VA, GS
+from pypower.idx_brch import BR_STATUS, RATE_A
+
+from pypower.t.t_begin import t_begin
+from pypower.t.t_is import t_is
+from pypower.t.t_ok import t_ok
+from pypower.t.t_end import t_end
+
+
+def t_screen_n2(quiet=False):
+    """Tests for C{screen_n2}.
+    """
+    t_begin(7, quiet)
+
+    ppc = ext2int(case30())
+    baseMVA = ppc['baseMVA']
+    bus, gen, branch = [ppc[k].astype(float) for k in ('bus', 'gen', 'branch')]
+    nl = branch.shape[0]
+    rate = branch[:, RATE_A]
+
+    t = 'all pairs : '
+    viol, isl = screen_n2(baseMVA, bus, gen, branch, threshold=0.9, block=7)
+    _, bridge = lodf_chunks(baseMVA, bus, branch)
+    b = find(bridge)
+    t_ok(all([((isl[:, 0] == k) | (isl[:, 1] == k)).sum() == nl - 1
+              for k in b]), [t, 'pairs with bridges are islands'])
+
+    ## compare with DC power flows with both branches out
+    isl = set(map(tuple, isl))
+    found, flows = True, True
+    for k in range(nl):
+        for m in range(k + 1, nl):
+            if (k, m) in isl:
+                continue
+            br = branch.copy()
+            br[[k, m], BR_STATUS] = 0
+            F = _dcflows(baseMVA, bus, gen, br)
+            v = viol[(viol[:, 0] == k) & (viol[:, 1] == m)]
+            l = find((rate > 0) & (abs(F) > 0.9 * rate))
+            found = found and set(v[:, 2]) == set(l)
+            flows = flows and (abs(v[:, 3] - F[v[:, 2].astype(int)]) <
+                               1e-6).all()
+    t_ok(len(viol) > 0 and found, [t, 'overloaded pairs and branches'])
+    t_ok(flows, [t, 'post-outage flows'])
+    t_is(viol[:, 4], rate[viol[:, 2].astype(int)], 12, [t, 'ratings'])
+
+    t = 'selected outages : '
+    outages = [9, 4, 27, 30, 1]
+    v2, _ = screen_n2(baseMVA, bus, gen, branch, outages, 0.9, block=2)
+    sel = [(v[0] in outages and v[1] in outages) for v in viol]
+    v1 = viol[array(sel, bool)]
+    v2[:, :2].sort(1)
+    t_is(_sorted(v2), _sorted(v1), 10, [t, 'overloads'])
+
+    t = 'process pool : '
+    v3, _ = screen_n2(baseMVA, bus, gen, branch, threshold=0.9, block=9,
+                      nproc=2)
+    t_is(_sorted(v3), _sorted(viol), 10, [t, 'overloads'])
+
+    t = 'memmap : '
+    fd, fname = mkstemp()
+    close(fd)
+    try:
+        v4, _ = screen_n2(baseMVA, bus, gen, branch, threshold=0.9,
+                          lodf=fname)
+        t_is(_sorted(v4), _sorted(viol), 10, [t, 'overloads'])
+    finally:
+        remove(fname)
+
+    t_end()
+
+
+def _dcflows(baseMVA, bus, gen, branch):
+    """DC power flow branch flows in MW.
+    """
+    ref, pv, pq = bustypes(bus, gen)
+    B, Bf, Pbusinj, Pfinj = makeBdc(baseMVA, bus, branch)
+    Pbus = makeSbus(baseMVA, bus, gen).real - Pbusinj - bus[:, GS] / baseMVA
+    Va = dcpf(B, Pbus, bus[:, VA] * (pi / 180), ref, pv, pq)
+    return (Bf * Va + Pfinj) * baseMVA
+
+
+def _sorted(v):
+    return v[lexsort(v[:, 2::-1].T)]
+
+
+if __name__ == '__main__':
+    t_screen_n2(quiet=False)
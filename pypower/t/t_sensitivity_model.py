@@ -0,0 +1,96 @@
+# Copyright (C) 2011 Richard Lincoln
+#
+# PYPOWER is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published
+# by the Free Software Foundation, either version 3 of the License,
+# or (at your option) any later version.
+#
+# PYPOWER is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with PYPOWER. If not, see <http://www.gnu.org/licenses/>.
+
+"""Tests for C{sensitivity_model}.
+"""
+
+from numpy import array, ones, ix_
+
+from pypower.case30 import case30
+from pypower.ext2int import ext2int
+from pypower.makePTDF import makePTDF
+from pypower.lodf_chunks import lodf_chunks
+from pypower.sensitivity_model import sensitivity_model
+
+from pypower.idx_bus import PD
+from pypower.idx_brch import BR_STATUS
+from pypower.idx_gen import GEN_BUS
+
+from pypower.t.t_begin import t_begin
+from pypower.t.t_is import t_is
+from pypower.t.t_ok import t_ok
+from pypower.t.t_end import t_end
+
+
+def t_sensitivity_model(quiet=False):
+    """Tests for C{sensitivity_model}.
+    """
+    t_begin(14, quiet)
+
+    ppc = ext2int(case30())
+    baseMVA = ppc['baseMVA']
+    bus, gen, branch = [ppc[k].astype(float) for k in ('bus', 'gen', 'branch')]
+    nb = bus.shape[0]
+    w = bus[:, PD]
+    ib = array([3, 17, 8])
+    il = array([12, 0, 25, 7])
+
+    sm = sensitivity_model(baseMVA, bus, gen, branch)
+
+    t = 'ptdf : '
+    t_is(sm.ptdf(), makePTDF(baseMVA, bus, branch), 10, [t, 'reference bus'])
+    t_is(sm.ptdf(5), makePTDF(baseMVA, bus, branch, 5), 10, [t, 'slack bus'])
+    t_is(sm.ptdf(w), makePTDF(baseMVA, bus, branch, w), 10,
+         [t, 'distributed slack'])
+    t_is(sm.ptdf(w, ib, il), makePTDF(baseMVA, bus, branch, w, ib, il), 10,
+         [t, 'selected rows & columns'])
+    t_ok(sm.misses == 1 and sm.hits == 3, [t, 'PTDF computed once'])
+
+    t = 'lodf : '
+    L, bridge = lodf_chunks(baseMVA, bus, branch)
+    Ls, bs = sm.lodf()
+    t_is(Ls, L, 10, [t, 'all outages'])
+    t_ok((bs == bridge).all(), [t, 'bridges'])
+    t_is(sm.lodf([4, 9], il)[0], L[ix_(il, [4, 9])], 10, [t, 'selected'])
+
+    t = 'otdf : '
+    k = 9
+    br = branch.copy()
+    br[k, BR_STATUS] = 0
+    t_is(sm.otdf(k, w), makePTDF(baseMVA, bus, br, w), 8,
+         [t, 'PTDF without the branch'])
+    t_is(sm.otdf(k, None, ib, il), makePTDF(baseMVA, bus, br, None, ib, il),
+         8, [t, 'selected rows & columns'])
+
+    t = 'gsdf : '
+    gbus = gen[:, GEN_BUS].astype(int)
+    t_is(sm.gsdf(ones(nb)), makePTDF(baseMVA, bus, branch, ones(nb))[:, gbus],
+         10, [t, 'uniform slack'])
+
+    t = 'topology : '
+    hits, misses = sm.hits, sm.misses
+    sm.set_branch_status(k, 0)
+    t_is(sm.ptdf(w), makePTDF(baseMVA, bus, br, w), 10, [t, 'branch out'])
+    sm.set_branch_status(k, 1)
+    H = sm.ptdf(w)
+    t_ok(sm.misses == misses + 1 and sm.hits == hits + 1,
+         [t, 'restored topology cached'])
+    t_is(H, makePTDF(baseMVA, bus, branch, w), 10, [t, 'branch restored'])
+
+    t_end()
+
+
+if __name__ == '__main__':
+    t_sensitivity_model(quiet=False)
@@ -0,0 +1,103 @@
+# Copyright (C) 2011 Richard Lincoln
+#
+# PYPOWER is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published
+# by the Free Software Foundation, either version 3 of the License,
+# or (at your option) any later version.
+#
+# PYPOWER is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with PYPOWER. If not, see <http://www.gnu.org/licenses/>.
+
+"""Tests for C{warmstart_cache}.
+"""
+
+from numpy import ones, exp, pi
+
+from pypower.case30 import case30
+from pypower.loadcase import loadcase
+from pypower.ext2int import ext2int
+from pypower.ppoption import ppoption
+from pypower.runpf import runpf
+from pypower.bustypes import bustypes
+from pypower.makeYbus import makeYbus
+from pypower.makeSbus import makeSbus
+from pypower.newtonpf import newtonpf
+from pypower.warmstart_cache import warmstart_cache, runpf_cache
+
+from pypower.idx_bus import PD, QD, VM, VA
+from pypower.idx_brch import BR_STATUS, BR_X
+
+from pypower.t.t_begin import t_begin
+from pypower.t.t_is import t_is
+from pypower.t.t_ok import t_ok
+from pypower.t.t_end import t_end
+
+
+def t_warmstart_cache(quiet=False):
+    """Tests for C{warmstart_cache}.
+    """
+    t_begin(12, quiet)
+
+    ppc = loadcase(case30())
+    ppci = ext2int(ppc)
+
+    t = 'key : '
+    wc = warmstart_cache(2)
+    key = wc.key(ppci)
+    ppc2 = loadcase(ppci)
+    ppc2['bus'][:, PD] = 1.1 * ppc2['bus'][:, PD]
+    t_ok(wc.key(ppc2) == key, [t, 'independent of loads'])
+    ppc2['branch'][3, BR_STATUS] = 0
+    t_ok(wc.key(ppc2) != key, [t, 'depends on branch status'])
+    ppc2 = loadcase(ppci)
+    ppc2['branch'][3, BR_X] = 1.1 * ppc2['branch'][3, BR_X]
+    t_ok(wc.key(ppc2) != key, [t, 'depends on branch impedance'])
+
+    t = 'LRU : '
+    V = ones(3, complex)
+    wc.put('a', V)
+    wc.put('b', 2 * V)
+    t_is(wc.get('a'), V, 12, [t, 'get'])
+    wc.put('c', 3 * V)
+    t_ok(len(wc) == 2 and wc.get('b') is None, [t, 'least recent evicted'])
+    t_ok(wc.get('a') is not None and wc.get('c') is not None, [t, 'kept'])
+    t_ok(wc.hits == 3 and wc.misses == 1, [t, 'hits and misses'])
+
+    t = 'runpf : '
+    runpf_cache.clear()
+    ppopt = ppoption(VERBOSE=0, OUT_ALL=0, PF_WARM_START=4)
+    r1, success = runpf(ppc, ppopt)
+    t_ok(success and len(runpf_cache) == 1, [t, 'solution cached'])
+    ppc2 = loadcase(ppc)
+    ppc2['bus'][:, [PD, QD]] = 1.05 * ppc2['bus'][:, [PD, QD]]
+    r2, success = runpf(ppc2, ppopt)
+    r0, _ = runpf(ppc2, ppoption(ppopt, PF_WARM_START=0))
+    t_ok(success and runpf_cache.hits == 1, [t, 'warm started'])
+    t_is(r2['bus'][:, [VM, VA]], r0['bus'][:, [VM, VA]], 6, [t, 'V'])
+    t_is(r2['branch'], r0['branch'], 6, [t, 'branch'])
+
+    t = 'newtonpf : '
+    ppci = ext2int(ppc2)
+    baseMVA, bus, gen, branch = \
+        ppci['baseMVA'], ppci['bus'], ppci['gen'], ppci['branch']
+    ref, pv, pq = bustypes(bus, gen)
+    Ybus, _, _ = makeYbus(baseMVA, bus, branch)
+    Sbus = makeSbus(baseMVA, bus, gen)
+    V0 = bus[:, VM] * exp(1j * pi / 180 * bus[:, VA])
+    _, _, i0, _ = newtonpf(Ybus, Sbus, V0, ref, pv, pq, ppopt)
+    V1 = r1['bus'][:, VM] * exp(1j * pi / 180 * r1['bus'][:, VA])
+    _, _, i1, _ = newtonpf(Ybus, Sbus, V1, ref, pv, pq, ppopt)
+    t_ok(i1 < i0, [t, 'fewer iterations from previous solution'])
+
+    runpf_cache.clear()
+
+    t_end()
+
+
+if __name__ == '__main__':
+    t_warmstart_cache(quiet=False)
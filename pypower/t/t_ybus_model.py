@@ -0,0 +1,94 @@
+# Copyright (C) 2011 Richard Lincoln
+#
+# PYPOWER is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published
+# by the Free Software Foundation, either version 3 of the License,
+# or (at your option) any later version.
+#
+# PYPOWER is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with PYPOWER. If not, see <http://www.gnu.org/licenses/>.
+
+"""Tests for C{ybus_model}.
+"""
+
+from numpy import array
+
+from pypower.case30 import case30
+from pypower.loadcase import loadcase
+from pypower.ext2int import ext2int
+from pypower.makeYbus import makeYbus
+from pypower.ybus_model import ybus_model
+
+from pypower.idx_bus import GS, BS
+from pypower.idx_brch import BR_STATUS, TAP, SHIFT
+
+from pypower.t.t_begin import t_begin
+from pypower.t.t_is import t_is
+from pypower.t.t_ok import t_ok
+from pypower.t.t_end import t_end
+
+
+def t_ybus_model(quiet=False):
+    """Tests for C{ybus_model}.
+    """
+    t_begin(20, quiet)
+
+    ppc = ext2int(loadcase(case30()))
+    baseMVA, bus, branch = ppc['baseMVA'], ppc['bus'], ppc['branch']
+    branch[3, BR_STATUS] = 0
+
+    def check(ym, t):
+        Ybus, Yf, Yt = makeYbus(baseMVA, bus, branch)
+        t_is(ym.Ybus.todense(), Ybus.todense(), 12, [t, 'Ybus'])
+        t_is(ym.Yf.todense(), Yf.todense(), 12, [t, 'Yf'])
+        t_is(ym.Yt.todense(), Yt.todense(), 12, [t, 'Yt'])
+
+    ym = ybus_model(baseMVA, bus, branch)
+    check(ym, 'initial : ')
+    indptr, indices = ym.Ybus.indptr.copy(), ym.Ybus.indices.copy()
+
+    t = 'set_branch_status : '
+    branch[[3, 7], BR_STATUS] = [1, 0]
+    ym.set_branch_status([3, 7], [1, 0])
+    check(ym, t)
+
+    t = 'set_tap : '
+    branch[10, TAP] = 0.95
+    ym.set_tap(10, 0.95)
+    check(ym, t)
+
+    t = 'set_shift : '
+    branch[[10, 12], SHIFT] = [3.0, -2.0]
+    ym.set_shift([10, 12], [3.0, -2.0])
+    check(ym, t)
+
+    t = 'set_shunt : '
+    bus[[4, 9], GS] = [1.5, 0.0]
+    bus[[4, 9], BS] = [10.0, -5.0]
+    ym.set_shunt([4, 9], bus[[4, 9], GS], bus[[4, 9], BS])
+    check(ym, t)
+
+    ## the last value given for a repeated index is used, once
+    t = 'repeated indices : '
+    branch[5, BR_STATUS] = 0
+    ym.set_branch_status([5, 5, 5], [1, 1, 0])
+    branch[10, TAP] = 0.9
+    ym.set_tap([10, 10], 0.9)
+    bus[4, GS], bus[4, BS] = 2.0, 3.0
+    ym.set_shunt([4, 4], array([0.5, 2.0]), array([1.0, 3.0]))
+    check(ym, t)
+
+    t_ok(ym.version == 7, 'version counter')
+    t_ok((ym.Ybus.indptr == indptr).all() and
+         (ym.Ybus.indices == indices).all(), 'pattern unchanged')
+
+    t_end()
+
+
+if __name__ == '__main__':
+    t_ybus_model(quiet=False)
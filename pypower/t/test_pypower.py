@@ -35,16 +35,29 @@ def test_pypower(verbose=False):
     ## PYPOWER base test
     tests.append('t_loadcase')
     tests.append('t_ext2int2ext')
+    tests.append('t_ybus_model')
     tests.append('t_jacobian')
+    tests.append('t_lufactor')
     tests.append('t_hessian')
+    tests.append('t_opf_considx')
+    tests.append('t_opf_hessidx')
     tests.append('t_totcost')
     tests.append('t_modcost')
     tests.append('t_hasPQcap')
 
     tests.append('t_pips')
+    tests.append('t_pips_kkt')
+    tests.append('t_pips_linsolver')
 
     tests.append('t_qps_pypower')
     tests.append('t_pf')
+    tests.append('t_runpf_batch')
+    tests.append('t_rundcpf_series')
+    tests.append('t_memmap_sink')
+    tests.append('t_scenario_pool')
+    tests.append('t_warmstart_cache')
+    tests.append('t_fdpf_cache')
+    tests.append('t_runcontingency')
 
     if have_fcn('gurobipy'):
         tests.append('t_opf_dc_gurobi')
@@ -67,6 +80,12 @@ def test_pypower(verbose=False):
     tests.append('t_dcline')
     tests.append('t_makePTDF')
     tests.append('t_makeLODF')
+    tests.append('t_lodf_chunks')
+    tests.append('t_screen_n2')
+    tests.append('t_sensitivity_model')
+    tests.append('t_ac_sensitivity')
+    tests.append('t_cpf')
+    tests.append('t_runpf_islands')
     tests.append('t_total_load')
     tests.append('t_scale_load')
 
@@ -83,8 +102,17 @@ def test_pf(verbose=False):
 
     tests.append('t_loadcase')
     tests.append('t_ext2int2ext')
+    tests.append('t_ybus_model')
     tests.append('t_jacobian')
+    tests.append('t_lufactor')
     tests.append('t_pf')
+    tests.append('t_runpf_batch')
+    tests.append('t_rundcpf_series')
+    tests.append('t_memmap_sink')
+    tests.append('t_scenario_pool')
+    tests.append('t_warmstart_cache')
+    tests.append('t_fdpf_cache')
+    tests.append('t_runcontingency')
 
     return t_run_tests(tests, verbose)
 
@@ -95,6 +123,8 @@ def test_opf(verbose=False, *others):
     tests.append('t_loadcase')
     tests.append('t_ext2int2ext')
     tests.append('t_hessian')
+    tests.append('t_opf_considx')
+    tests.append('t_opf_hessidx')
     tests.append('t_totcost')
     tests.append('t_modcost')
     tests.append('t_hasPQcap')
@@ -108,6 +138,8 @@ def test_opf(verbose=False, *others):
     tests.append('t_opf_dc_pips_sc')
 
     tests.append('t_pips')
+    tests.append('t_pips_kkt')
+    tests.append('t_pips_linsolver')
 
     tests.append('t_opf_pips')
     tests.append('t_opf_pips_sc')
@@ -123,6 +155,12 @@ def test_opf(verbose=False, *others):
 
     tests.append('t_makePTDF')
     tests.append('t_makeLODF')
+    tests.append('t_lodf_chunks')
+    tests.append('t_screen_n2')
+    tests.append('t_sensitivity_model')
+    tests.append('t_ac_sensitivity')
+    tests.append('t_cpf')
+    tests.append('t_runpf_islands')
     tests.append('t_total_load')
     tests.append('t_scale_load')
 
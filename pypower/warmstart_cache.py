@@ -0,0 +1,88 @@
+# Copyright (C) 2011 Richard Lincoln
+#
+# PYPOWER is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published
+# by the Free Software Foundation, either version 3 of the License,
+# or (at your option) any later version.
+#
+# PYPOWER is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with PYPOWER. If not, see <http://www.gnu.org/licenses/>.
+
+"""Cache of converged bus voltages used to warm start power flows.
+"""
+
+from collections import OrderedDict
+
+from pypower.casehash import casehash
+
+
+class warmstart_cache(object):
+    """Cache of converged bus voltages used to warm start power flows.
+
+    Stores the last converged complex bus voltage vector for each network,
+    identified by L{key}, a hash of the topology and parameters of a case
+    in internal indexing computed by L{casehash}. Loads and generator set
+    points are not part of the key, so successive snapshots of the same
+    network share an entry.
+
+    At most C{maxsize} entries are kept, the least recently used being
+    evicted first.
+
+    L{runpf} uses the module level C{runpf_cache} when the C{PF_WARM_START}
+    option is set to the number of entries to keep.
+
+    @see: L{runpf}
+    """
+
+    def __init__(self, maxsize=16):
+        #: maximum number of entries
+        self.maxsize = maxsize
+
+        #: numbers of lookups that found and did not find an entry
+        self.hits = 0
+        self.misses = 0
+
+        self._V = OrderedDict()
+
+    def __len__(self):
+        return len(self._V)
+
+    def key(self, ppc):
+        """Returns the key of a case in internal indexing (see L{casehash}).
+        """
+        return casehash(ppc['baseMVA'], ppc['bus'], ppc['gen'], ppc['branch'])
+
+    def get(self, key):
+        """Returns the voltages stored for C{key}, or C{None}.
+        """
+        V = self._V.pop(key, None)
+        if V is None:
+            self.misses += 1
+            return None
+        self._V[key] = V            ## most recently used
+        self.hits += 1
+        return V.copy()
+
+    def put(self, key, V):
+        """Stores the voltages C{V} for C{key}.
+        """
+        self._V.pop(key, None)
+        self._V[key] = V.copy()
+        while len(self._V) > max(self.maxsize, 0):
+            self._V.popitem(last=False)
+
+    def clear(self):
+        """Removes all entries.
+        """
+        self._V.clear()
+        self.hits = 0
+        self.misses = 0
+
+
+#: cache used by L{runpf} when the C{PF_WARM_START} option is set
+runpf_cache = warmstart_cache()
@@ -0,0 +1,192 @@
+# Copyright (C) 2011 Richard Lincoln
+#
+# PYPOWER is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published
+# by the Free Software Foundation, either version 3 of the License,
+# or (at your option) any later version.
+#
+# PYPOWER is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with PYPOWER. If not, see <http://www.gnu.org/licenses/>.
+
+"""Bus and branch admittance matrices that can be updated in place.
+"""
+
+from sys import stderr
+
+from numpy import ones, zeros, conj, exp, pi, r_, arange, unique, \
+    bincount, cumsum, atleast_1d, add, any
+from scipy.sparse import csr_matrix
+
+from pypower.idx_bus import BUS_I, GS, BS
+from pypower.idx_brch import F_BUS, T_BUS, BR_R, BR_X, BR_B, BR_STATUS, \
+    SHIFT, TAP
+
+
+class ybus_model(object):
+    """Bus and branch admittance matrices that can be updated in place.
+
+    Builds the same C{Ybus}, C{Yf} and C{Yt} matrices as L{makeYbus}, but
+    keeps the branch and shunt parameters and the position of every branch
+    and shunt element in the C{data} arrays of the matrices. Branch
+    status, tap ratio and phase shift changes and bus shunt changes then
+    patch only the affected nonzeros::
+
+        ym = ybus_model(baseMVA, bus, branch)
+        ym.set_branch_status(l, 0)
+        V, success, i, _ = newtonpf(ym.Ybus, Sbus, V0, ref, pv, pq)
+        ym.set_branch_status(l, 1)
+
+    The sparsity patterns include every branch, whether in service or not,
+    so they never change. Out-of-service branches are stored as explicit
+    zeros. Index maps built from the patterns, such as those of
+    L{makeJidx} and L{lufactor}, therefore stay valid after an update.
+
+    The C{version} attribute is incremented by every update so that
+    cached results derived from the matrices can be invalidated.
+
+    @see: L{makeYbus}
+    """
+
+    def __init__(self, baseMVA, bus, branch):
+        nb = bus.shape[0]          ## number of buses
+        nl = branch.shape[0]       ## number of lines
+
+        ## check that bus numbers are equal to indices to bus
+        if any(bus[:, BUS_I] != range(nb)):
+            stderr.write('buses must appear in order by bus number\n')
+
+        #: system MVA base
+        self.baseMVA = baseMVA
+
+        #: number of updates applied to the matrices
+        self.version = 0
+
+        ## branch & shunt parameters
+        self.f = branch[:, F_BUS].astype(int)
+        self.t = branch[:, T_BUS].astype(int)
+        self.status = branch[:, BR_STATUS].copy()
+        self.zs = branch[:, BR_R] + 1j * branch[:, BR_X]
+        self.b = branch[:, BR_B].copy()
+        self.tap = branch[:, TAP].copy()
+        self.shift = branch[:, SHIFT].copy()
+        self.Ysh = (bus[:, GS] + 1j * bus[:, BS]) / baseMVA
+
+        ## Ybus pattern: (f,f), (f,t), (t,f), (t,t) of each branch and
+        ## the diagonal, in CSR order
+        f, t, d = self.f, self.t, arange(nb)
+        key = r_[f, f, t, t, d] * nb + r_[f, t, f, t, d]
+        k, pos = unique(key, return_inverse=True)
+        self._pos = pos[:4 * nl].reshape(4, nl)     ## positions of branch
+        self._dpos = pos[4 * nl:]                    ## and shunt elements
+        indptr = r_[0, cumsum(bincount(k // nb, minlength=nb))]
+
+        ## Yf and Yt have the "from" and "to" elements of each branch in row
+        ## l at positions 2l and 2l + 1, with sorted column indices
+        lo = (t < f).astype(int)
+        self._pf = 2 * arange(nl) + lo           ## position of column f
+        self._pt = 2 * arange(nl) + 1 - lo       ## position of column t
+        cols = zeros(2 * nl, int)
+        cols[self._pf] = f
+        cols[self._pt] = t
+
+        Y = self._branch_elements(arange(nl))
+        data = zeros(len(k), complex)
+        add.at(data, pos, r_[Y[0], Y[1], Y[2], Y[3], self.Ysh])
+        self._Y = Y
+
+        #: bus admittance matrix
+        self.Ybus = csr_matrix((data, k % nb, indptr), (nb, nb))
+        self.Ybus.has_sorted_indices = True
+
+        yf = zeros(2 * nl, complex)
+        yt = zeros(2 * nl, complex)
+        yf[self._pf], yf[self._pt] = Y[0], Y[1]
+        yt[self._pf], yt[self._pt] = Y[2], Y[3]
+
+        #: "from" end branch admittance matrix
+        self.Yf = csr_matrix((yf, cols, 2 * arange(nl + 1)), (nl, nb))
+        self.Yf.has_sorted_indices = True
+
+        #: "to" end branch admittance matrix
+        self.Yt = csr_matrix((yt, cols.copy(), 2 * arange(nl + 1)), (nl, nb))
+        self.Yt.has_sorted_indices = True
+
+    def set_branch_status(self, l, status):
+        """Puts branches C{l} in (C{status = 1}) or out of (C{0}) service.
+        """
+        l, status = _last(l, status)
+        self.status[l] = status
+        self._update(l)
+
+    def set_tap(self, l, tap):
+        """Sets the tap ratio of branches C{l} (0 for a line).
+        """
+        l, tap = _last(l, tap)
+        self.tap[l] = tap
+        self._update(l)
+
+    def set_shift(self, l, shift):
+        """Sets the phase shift angle of branches C{l} in degrees.
+        """
+        l, shift = _last(l, shift)
+        self.shift[l] = shift
+        self._update(l)
+
+    def set_shunt(self, i, Gs, Bs):
+        """Sets the shunt conductance and susceptance of buses C{i}, in MW
+        and MVAr demanded at V = 1.0 p.u., like the C{GS} and C{BS} columns
+        of C{bus}.
+        """
+        i, Ysh = _last(i, (Gs + 1j * Bs) / self.baseMVA)
+        add.at(self.Ybus.data, self._dpos[i], Ysh - self.Ysh[i])
+        self.Ysh[i] = Ysh
+        self.version += 1
+
+    def _branch_elements(self, l):
+        """Returns the elements C{Yff, Yft, Ytf, Ytt} of branches C{l}
+        as in L{makeYbus}.
+        """
+        stat = self.status[l]                    ## ones at in-service branches
+        Ys = stat / self.zs[l]                   ## series admittance
+        Bc = stat * self.b[l]                    ## line charging susceptance
+        tap = ones(len(l))                       ## default tap ratio = 1
+        i = self.tap[l] != 0                     ## non-zero tap ratios
+        tap[i] = self.tap[l][i]
+        tap = tap * exp(1j * pi / 180 * self.shift[l]) ## add phase shifters
+
+        Ytt = Ys + 1j * Bc / 2
+        Yff = Ytt / (tap * conj(tap))
+        Yft = - Ys / conj(tap)
+        Ytf = - Ys / tap
+
+        return r_[[Yff, Yft, Ytf, Ytt]]
+
+    def _update(self, l):
+        """Patches the matrix elements of the distinct branches C{l}.
+        """
+        Y = self._branch_elements(l)
+        add.at(self.Ybus.data, self._pos[:, l].ravel(),
+               (Y - self._Y[:, l]).ravel())
+        self._Y[:, l] = Y
+
+        self.Yf.data[self._pf[l]] = Y[0]
+        self.Yf.data[self._pt[l]] = Y[1]
+        self.Yt.data[self._pf[l]] = Y[2]
+        self.Yt.data[self._pt[l]] = Y[3]
+        self.version += 1
+
+
+def _last(i, x):
+    """Returns the distinct indices in C{i}, sorted, and the last of the
+    values C{x} (a scalar or one per index) given for each, so that each
+    element is patched only once.
+    """
+    i = atleast_1d(i)
+    x = x * ones(len(i))
+    u, k = unique(i[::-1], return_index=True)
+    return u, x[::-1][k]